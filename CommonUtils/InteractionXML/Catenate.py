@@ -5,6 +5,7 @@ except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
 import RecalculateIds
+import RouteDocuments
 
 def catenate(input1, input2, output):
     print >> sys.stderr, "##### Catenate interaction XML #####"
@@ -42,6 +43,24 @@ def catenate(input1, input2, output):
         ETUtils.write(c1Root, output)
     return c1
 
+def catenateFiles(inputs, output):
+    """
+    Catenate corpora like catenate, for any number of inputs. The
+    documents are read and written one at a time, so the corpora don't
+    need to fit in memory.
+    
+    Keyword arguments:
+    inputs -- (list) corpus file names
+    output -- (string) output file name
+    
+    Returns the number of documents written
+    """
+    print >> sys.stderr, "##### Catenate interaction XML #####"
+    counts = RouteDocuments.routeDocuments(inputs, lambda document, inputIndex: ["output"], {"output":output}, 
+                                           recalculateIds=True, checkIds=True)
+    print >> sys.stderr, "Wrote", counts.get("output", 0), "documents to", output
+    return counts.get("output", 0)
+
 if __name__=="__main__":
     import sys
     
@@ -54,7 +73,7 @@ if __name__=="__main__":
     except ImportError:
         print >> sys.stderr, "Psyco not installed"
 
-    optparser = OptionParser(usage="%prog [options]\n")
+    optparser = OptionParser(usage="%prog [options] [more inputs]\n")
     optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
     optparser.add_option("-j", "--input2", default=None, dest="input2", help="Corpus in interaction xml format", metavar="FILE")
     optparser.add_option("-o", "--output", default=None, dest="output", help="Output file in interaction xml format.")
@@ -73,4 +92,4 @@ if __name__=="__main__":
         optparser.print_help()
         sys.exit(1)
     
-    catenate(options.input, options.input2, options.output)
+    catenateFiles([options.input, options.input2] + args, options.output)
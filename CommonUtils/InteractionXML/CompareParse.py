@@ -5,8 +5,41 @@ except ImportError:
 import cElementTreeUtils as ETUtils
 import sys
 import CorpusElements
+import SentenceElements
+import CorpusIndex
 from optparse import OptionParser
 
+def compareSentences(sourceSentence, targetSentence):
+    """ Print the differing tokens and dependencies of two SentenceElements """
+    sId = sourceSentence.sentence.get("origId")
+    for sourceToken, targetToken in zip(sourceSentence.tokens, targetSentence.tokens):
+        if sourceToken.attrib != targetToken.attrib:
+            print >> sys.stderr, sId + ": tok diff " + sourceToken.get("id") + "/" + targetToken.get("id")
+    for sourceDep, targetDep in zip(sourceSentence.dependencies, targetSentence.dependencies):
+        if sourceDep.attrib != targetDep.attrib:
+            print >> sys.stderr, sId + ": dep diff " + sourceDep.get("id") + "/" + targetDep.get("id")
+
+def compareSentencesById(source, target, sentenceIds, parse, tokenization):
+    """
+    Compare only the sentences with the given ids, reading them from the
+    corpora through corpus indices (see CorpusIndex).
+    """
+    sourceIndex = CorpusIndex.CorpusIndex(source, True)
+    targetIndex = CorpusIndex.CorpusIndex(target, True)
+    count = 0
+    for sentenceId in sentenceIds:
+        sourceSentence = sourceIndex.getSentence(sentenceId)
+        targetSentence = targetIndex.getSentence(sentenceId)
+        if sourceSentence == None or targetSentence == None:
+            print >> sys.stderr, "Warning, sentence", sentenceId, "not found"
+            continue
+        compareSentences(SentenceElements.SentenceElements(sourceSentence, parse, tokenization),
+                         SentenceElements.SentenceElements(targetSentence, parse, tokenization))
+        count += 1
+    sourceIndex.close()
+    targetIndex.close()
+    return count
+
 if __name__=="__main__":
     print >> sys.stderr, "##### Compare Parse #####"
     # Import Psyco if available
@@ -24,11 +57,17 @@ if __name__=="__main__":
     #optparser.add_option("-o", "--output", default=None, dest="output", help="Corpus in analysis format", metavar="FILE")
     optparser.add_option("-t", "--tokenization", default="split-McClosky", dest="tokenization", help="Tokenization element name")
     optparser.add_option("-p", "--parse", default="split-McClosky", dest="parse", help="Parse element name")
+    optparser.add_option("-e", "--sentences", default=None, dest="sentences", help="Comma-separated list of sentence ids. Only these sentences are read and compared.")
     (options, args) = optparser.parse_args()
     assert(options.source != None)
     assert(options.target != None)
     #assert(options.output != None)
     
+    if options.sentences != None:
+        count = compareSentencesById(options.source, options.target, options.sentences.split(","), options.parse, options.tokenization)
+        print >> sys.stderr, "Done, compared", count, "sentences"
+        sys.exit(0)
+    
     print >> sys.stderr, "Loading source:",
     sourceElements = CorpusElements.loadCorpus(options.source, options.parse, options.tokenization)
     print >> sys.stderr, "Loading target:",
@@ -49,12 +88,6 @@ if __name__=="__main__":
         targetSentence = origIdToSentences[key][1]
         #for sourceSentence, targetSentence in zip(sourceElements.sentences, targetElements.sentences):
         assert sourceSentence.sentence.get("origId") == targetSentence.sentence.get("origId"), (sourceSentence.sentence.get("origId"), targetSentence.sentence.get("origId"))
-        sId = sourceSentence.sentence.get("origId")
-        for sourceToken, targetToken in zip(sourceSentence.tokens, targetSentence.tokens):
-            if sourceToken.attrib != targetToken.attrib:
-                print >> sys.stderr, sId + ": tok diff " + sourceToken.get("id") + "/" + targetToken.get("id")
-        for sourceDep, targetDep in zip(sourceSentence.dependencies, targetSentence.dependencies):
-            if sourceDep.attrib != targetDep.attrib:
-                print >> sys.stderr, sId + ": dep diff " + sourceDep.get("id") + "/" + targetDep.get("id")
+        compareSentences(sourceSentence, targetSentence)
         count += 1
     print >> sys.stderr, "Done, compared", count, "sentences"
\ No newline at end of file
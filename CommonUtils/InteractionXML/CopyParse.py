@@ -5,69 +5,96 @@ except ImportError:
 import cElementTreeUtils as ETUtils
 import sys
 import CorpusElements
+import SentenceElements
+import SentenceIndex
 from optparse import OptionParser
 
-def copyParse(input, source, output, parse, tokenization):
+def copySentenceParse(sentence, sourceSentence, parse, parsesCopied, tokenizationsCopied):
+    """
+    Copy the parse and tokenization of a source sentence (SentenceElements)
+    to a target sentence element, unless it already has them.
+    """
+    # Create analyses element (if needed)
+    targetAnalysesElement = sentence.find("sentenceanalyses")
+    if targetAnalysesElement == None:
+        targetAnalysesElement = ET.Element("sentenceanalyses")
+        sentence.append(targetAnalysesElement)
+    # Create parses element (if needed)
+    targetParsesElement = targetAnalysesElement.find("parses")
+    if targetParsesElement == None:
+        targetParsesElement = ET.Element("parses")
+        targetAnalysesElement.append(targetParsesElement)
+    # Check whether parse already exists
+    targetParseElements = targetParsesElement.findall("parse")
+    newParse = None
+    for parseElement in targetParseElements:
+        if parseElement.get("parser") == parse:
+            newParse = parseElement
+            break
+    # Copy parse if it doesn't
+    if newParse == None and sourceSentence.parseElement != None:
+        targetParsesElement.append(sourceSentence.parseElement)
+        parsesCopied[0] += 1
+    
+    # Create tokenizations element (if needed)
+    targetTokenizationsElement = targetAnalysesElement.find("tokenizations")
+    if targetTokenizationsElement == None:
+        targetTokenizationsElement = ET.Element("tokenizations")
+        targetAnalysesElement.append(targetTokenizationsElement)
+    # Check whether tokenization already exists
+    targetTokenizationElements = targetTokenizationsElement.findall("tokenization")
+    newTokenization = None
+    for tokenizationElement in targetTokenizationElements:
+        if tokenizationElement.attrib["tokenizer"] == newParse.attrib["tokenizer"]:
+            newTokenization = tokenizationElement
+            break
+    # Copy parse if it doesn't
+    if newTokenization == None and sourceSentence.tokenizationElement != None:
+        targetTokenizationsElement.append(sourceSentence.tokenizationElement)
+        tokenizationsCopied[0] += 1
+
+def copyParse(input, source, output, parse, tokenization, stream=False):
+    """
+    Copy a parse and its tokenization from the sentences of a source corpus
+    to the sentences of the input corpus with the same text.
+
+    Keyword arguments:
+    input -- (string) corpus file name, or an ElementTree
+    source -- (string) corpus file with the parse
+    output -- (string) output file name
+    parse -- (string) parser name
+    tokenization -- (string) tokenizer name
+    stream -- (boolean) read the input one document at a time. If the
+              source is uncompressed or block gzip compressed, read only
+              the matching sentences of the source using a SentenceIndex
+              (built next to the source if needed), otherwise load the
+              source into memory.
+    """
+    if stream:
+        return copyParseStreaming(input, source, output, parse, tokenization)
     print >> sys.stderr, "Loading input file", input
     inputTree = ETUtils.ETFromObj(input)
     inputRoot = inputTree.getroot()
     print >> sys.stderr, "Loading source:",
     sourceElements = CorpusElements.loadCorpus(source, parse, tokenization)
-    sourceSentencesByText = {}
-    for sentence in sourceElements.sentences:
-        sentenceText = sentence.sentence.get("text")
-        #assert not sourceSentencesByText.has_key(sentenceText)
-        if sourceSentencesByText.has_key(sentenceText):
-            print >> sys.stderr, "Duplicate text", sentence.sentence.get("id"), sourceSentencesByText[sentenceText].sentence.get("id") 
-        sourceSentencesByText[sentenceText] = sentence
+    sourceIndex = ETUtils.ElementIndex([("sentence", ("text",))], sourceElements.rootElement)
+    for key in sourceIndex.getKeys("sentence", ("text",)):
+        duplicates = sourceIndex.getAll("sentence", ("text",), key)
+        #assert len(duplicates) == 1
+        for i in range(1, len(duplicates)):
+            print >> sys.stderr, "Duplicate text", duplicates[i].get("id"), duplicates[i-1].get("id")
     parsesCopied = [0,0]
     tokenizationsCopied = [0,0]
     for sentence in inputRoot.getiterator("sentence"):
         parsesCopied[1] += 1
         tokenizationsCopied[1] += 1
         #sourceSentence = sourceElements.sentencesByOrigId[sentence.attrib["origId"]]
-        if not sourceSentencesByText.has_key(sentence.get("text")):
+        sourceSentences = sourceIndex.getAll("sentence", ("text",), (sentence.get("text"),))
+        if len(sourceSentences) == 0:
             print >> sys.stderr, "Warning, no text found for sentence", sentence.get("id")
             continue
-        sourceSentence = sourceSentencesByText[sentence.get("text")]
-        # Create analyses element (if needed)
-        targetAnalysesElement = sentence.find("sentenceanalyses")
-        if targetAnalysesElement == None:
-            targetAnalysesElement = ET.Element("sentenceanalyses")
-            sentence.append(targetAnalysesElement)
-        # Create parses element (if needed)
-        targetParsesElement = targetAnalysesElement.find("parses")
-        if targetParsesElement == None:
-            targetParsesElement = ET.Element("parses")
-            targetAnalysesElement.append(targetParsesElement)
-        # Check whether parse already exists
-        targetParseElements = targetParsesElement.findall("parse")
-        newParse = None
-        for parseElement in targetParseElements:
-            if parseElement.get("parser") == parse:
-                newParse = parseElement
-                break
-        # Copy parse if it doesn't
-        if newParse == None and sourceSentence.parseElement != None:
-            targetParsesElement.append(sourceSentence.parseElement)
-            parsesCopied[0] += 1
-        
-        # Create tokenizations element (if needed)
-        targetTokenizationsElement = targetAnalysesElement.find("tokenizations")
-        if targetTokenizationsElement == None:
-            targetTokenizationsElement = ET.Element("tokenizations")
-            targetAnalysesElement.append(targetTokenizationsElement)
-        # Check whether tokenization already exists
-        targetTokenizationElements = targetTokenizationsElement.findall("tokenization")
-        newTokenization = None
-        for tokenizationElement in targetTokenizationElements:
-            if tokenizationElement.attrib["tokenizer"] == newParse.attrib["tokenizer"]:
-                newTokenization = tokenizationElement
-                break
-        # Copy parse if it doesn't
-        if newTokenization == None and sourceSentence.tokenizationElement != None:
-            targetTokenizationsElement.append(sourceSentence.tokenizationElement)
-            tokenizationsCopied[0] += 1
+        # Only the sentences that are copied from are processed
+        copySentenceParse(sentence, sourceElements.getSentence(sourceSentences[-1]), parse, parsesCopied, tokenizationsCopied)
     
     print >> sys.stderr, "Copied parse elements", parsesCopied
     print >> sys.stderr, "Copied tokenization elements", tokenizationsCopied
@@ -76,6 +103,52 @@ def copyParse(input, source, output, parse, tokenization):
         print >> sys.stderr, "Writing output to", output
         ETUtils.write(inputTree, output)
     return inputTree
+
+def copyParseStreaming(input, source, output, parse, tokenization):
+    if ETUtils.canReadByOffset(source):
+        sourceIndex = SentenceIndex.SentenceIndex(source, ("text",))
+        duplicateCount = sourceIndex.getDuplicateCount()
+        getSourceSentence = sourceIndex.get
+    else:
+        print >> sys.stderr, "Loading source file", source, "(can't be read by offset)"
+        sourceIndex = None
+        elementIndex = ETUtils.ElementIndex([("sentence", ("text",))], ETUtils.ETFromObj(source).getroot())
+        duplicateCount = len([x for x in elementIndex.getKeys("sentence", ("text",)) if len(elementIndex.getAll("sentence", ("text",), x)) > 1])
+        def getSourceSentence(sentence):
+            sourceSentences = elementIndex.getAll("sentence", ("text",), (sentence.get("text"),))
+            if len(sourceSentences) == 0:
+                return None
+            return sourceSentences[-1]
+    if duplicateCount > 0:
+        print >> sys.stderr, "Warning,", duplicateCount, "duplicate texts in source, using the last sentence for each"
+    print >> sys.stderr, "Copying parses to", input
+    inputStream = ETUtils.ElementStream(input, "document")
+    writer = None
+    if output != None:
+        print >> sys.stderr, "Writing output to", output
+        writer = ETUtils.ElementWriter(output, inputStream.root)
+    parsesCopied = [0,0]
+    tokenizationsCopied = [0,0]
+    for document in inputStream:
+        for sentence in document.getiterator("sentence"):
+            parsesCopied[1] += 1
+            tokenizationsCopied[1] += 1
+            sourceSentence = getSourceSentence(sentence)
+            if sourceSentence == None:
+                print >> sys.stderr, "Warning, no text found for sentence", sentence.get("id")
+                continue
+            sourceSentence = SentenceElements.SentenceElements(sourceSentence, parse, tokenization)
+            copySentenceParse(sentence, sourceSentence, parse, parsesCopied, tokenizationsCopied)
+        if writer != None:
+            writer.write(document)
+    if writer != None:
+        writer.close()
+    if sourceIndex != None:
+        sourceIndex.close()
+    
+    print >> sys.stderr, "Copied parse elements", parsesCopied
+    print >> sys.stderr, "Copied tokenization elements", tokenizationsCopied
+    return None
         
 if __name__=="__main__":
     print >> sys.stderr, "##### Copy Parse #####"
@@ -93,8 +166,9 @@ if __name__=="__main__":
     optparser.add_option("-o", "--output", default=None, dest="output", help="Corpus in analysis format", metavar="FILE")
     optparser.add_option("-t", "--tokenization", default=None, dest="tokenization", help="Tokenization element name")
     optparser.add_option("-p", "--parse", default=None, dest="parse", help="Parse element name")
+    optparser.add_option("--stream", default=False, action="store_true", dest="stream", help="Process the input one document at a time, reading source sentences through an index")
     (options, args) = optparser.parse_args()
     assert(options.input != None)
     assert(options.source != None)
     assert(options.output != None)
-    copyParse(options.input, options.source, options.output, options.parse, options.tokenization)
\ No newline at end of file
+    copyParse(options.input, options.source, options.output, options.parse, options.tokenization, options.stream)
\ No newline at end of file
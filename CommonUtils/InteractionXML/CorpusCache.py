@@ -0,0 +1,467 @@
+"""
+Binary cache for Interaction XML corpora.
+
+  Program:    Corpus Cache
+  Author:     Jari Bjoerne
+
+  Description: Compiles an interaction XML corpus into a binary side file
+  that can be memory mapped, so that an immutable corpus used by several
+  jobs needs to be parsed only once. All elements are stored in pre-order
+  in integer columns (tag, parent, first child, next sibling, attribute
+  and span ranges). Tags, attribute names and values are interned into a
+  single string table. Character offsets are stored as integer spans, and
+  the e1/e2 endpoints of interactions and pairs and the t1/t2 endpoints of
+  dependencies are resolved to element indices.
+
+  The elements are read through CachedElement views, which provide the
+  parts of the ElementTree element interface used by CorpusElements and
+  SentenceElements, so loadCorpus returns a normal CorpusElements object.
+
+  The cache records the size, modification time and SHA-1 hash of its
+  source file, and is rebuilt automatically when the source changes.
+"""
+
+import sys, os
+import mmap
+import array
+import struct
+import marshal
+import hashlib
+import tempfile
+import cElementTreeUtils as ETUtils
+import Range
+import CorpusElements
+
+MAGIC = "IXMLCACHE1\n"
+VERSION = 1
+# Integer columns, one value per element, except the attribute, span and
+# endpoint columns, which are indexed through attrStart and spanStart
+ELEMENT_COLUMNS = ["tag", "text", "parent", "firstChild", "nextSibling", "attrStart", "spanStart", "endpoint1", "endpoint2"]
+COLUMNS = ELEMENT_COLUMNS + ["attrName", "attrValue", "spans", "stringOffsets"]
+
+def getCachePath(filename):
+    return filename + ".bincache"
+
+def getSourceInfo(filename, computeHash=True):
+    stat = os.stat(filename)
+    info = {"size":stat.st_size, "mtime":stat.st_mtime, "hash":None}
+    if computeHash:
+        sha = hashlib.sha1()
+        f = open(filename, "rb")
+        while True:
+            block = f.read(1 << 20)
+            if len(block) == 0:
+                break
+            sha.update(block)
+        f.close()
+        info["hash"] = sha.hexdigest()
+    return info
+
+def isSourceUnchanged(filename, sourceInfo):
+    """
+    True if the file has the same size and modification time, or the
+    same size and content hash, as recorded in sourceInfo (see getSourceInfo).
+    The hash is computed only if the modification time differs.
+    """
+    currentInfo = getSourceInfo(filename, False)
+    if currentInfo["size"] != sourceInfo["size"]:
+        return False
+    if currentInfo["mtime"] == sourceInfo["mtime"]:
+        return True
+    return getSourceInfo(filename)["hash"] == sourceInfo["hash"]
+
+def writeFile(filename, write):
+    """
+    Calls write with a temporary file opened in the directory of filename,
+    and renames it to filename when done. The temporary file has a unique
+    name, so processes building the same cache or index at the same time
+    don't write into each other's files. If write raises an exception, the
+    temporary file is removed.
+    
+    Keyword arguments:
+    write -- (function) called with the open temporary file
+    """
+    fd, tempFilename = tempfile.mkstemp(prefix="." + os.path.basename(filename) + ".",
+                                        dir=os.path.dirname(os.path.abspath(filename)))
+    # mkstemp creates the file readable only by the user
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tempFilename, 0666 & ~umask)
+    out = os.fdopen(fd, "wb")
+    try:
+        write(out)
+        out.close()
+    except:
+        out.close()
+        os.remove(tempFilename)
+        raise
+    os.rename(tempFilename, filename)
+
+###############################################################################
+# Compiling
+###############################################################################
+
+class CacheBuilder:
+    def __init__(self):
+        self.strings = {}
+        self.stringList = []
+        self.columns = {}
+        for name in COLUMNS:
+            self.columns[name] = array.array("i")
+        assert self.columns["tag"].itemsize == 4
+        self.lastChild = {}
+
+    def intern(self, string):
+        if string not in self.strings:
+            self.strings[string] = len(self.stringList)
+            self.stringList.append(string)
+        return self.strings[string]
+
+    def addElement(self, element, parent):
+        c = self.columns
+        index = len(c["tag"])
+        c["tag"].append(self.intern(element.tag))
+        if element.text != None and element.text.strip() != "":
+            c["text"].append(self.intern(element.text))
+        else:
+            c["text"].append(-1)
+        c["parent"].append(parent)
+        c["firstChild"].append(-1)
+        c["nextSibling"].append(-1)
+        c["attrStart"].append(len(c["attrName"]))
+        for key in sorted(element.attrib.keys()):
+            c["attrName"].append(self.intern(key))
+            c["attrValue"].append(self.intern(element.attrib[key]))
+        c["spanStart"].append(len(c["spans"]) / 2)
+        charOffset = element.get("charOffset")
+        if charOffset != None and charOffset != "":
+            for span in Range.charOffsetToTuples(charOffset):
+                c["spans"].extend(span)
+        c["endpoint1"].append(-1)
+        c["endpoint2"].append(-1)
+        # Link to parent
+        if parent != -1:
+            if parent in self.lastChild:
+                c["nextSibling"][self.lastChild[parent]] = index
+            else:
+                c["firstChild"][parent] = index
+            self.lastChild[parent] = index
+        return index
+
+    def addDocument(self, document, parent=0):
+        """
+        Add a document subtree, and resolve the endpoints of its
+        interactions, pairs and dependencies.
+        """
+        entities = {}
+        tokens = {}
+        references = []
+        # Elements are added in pre-order. Each stack item carries the index of
+        # the enclosing sentence and the tokenizer of the enclosing tokenization
+        # or parse, the scope within which token ids are unique.
+        stack = [(document, parent, None, None)]
+        while len(stack) > 0:
+            element, parentIndex, sentence, tokenizer = stack.pop()
+            index = self.addElement(element, parentIndex)
+            tag = element.tag
+            if tag == "sentence":
+                sentence = index
+            elif tag == "tokenization" or tag == "parse":
+                tokenizer = element.get("tokenizer")
+            if tag == "entity":
+                entities[element.get("id")] = index
+            elif tag == "token":
+                tokens[(sentence, tokenizer, element.get("id"))] = index
+            elif tag == "interaction" or tag == "pair":
+                references.append( (index, entities, element.get("e1"), element.get("e2")) )
+            elif tag == "dependency":
+                references.append( (index, tokens, (sentence, tokenizer, element.get("t1")), (sentence, tokenizer, element.get("t2"))) )
+            for child in reversed(element.getchildren()):
+                stack.append( (child, index, sentence, tokenizer) )
+        for index, idMap, ref1, ref2 in references:
+            self.columns["endpoint1"][index] = idMap.get(ref1, -1)
+            self.columns["endpoint2"][index] = idMap.get(ref2, -1)
+        # Only the parent of the document can get more children
+        self.lastChild = {parent:self.lastChild[parent]}
+
+    def write(self, filename, sourceInfo):
+        c = self.columns
+        # Close the ranges
+        c["attrStart"].append(len(c["attrName"]))
+        c["spanStart"].append(len(c["spans"]) / 2)
+        stringBlob = []
+        length = 0
+        for string in self.stringList:
+            c["stringOffsets"].append(length)
+            encoded = string.encode("utf-8")
+            stringBlob.append(encoded)
+            length += len(encoded)
+        c["stringOffsets"].append(length)
+        # Write sections, followed by the header and its position
+        def writeSections(out):
+            out.write(MAGIC)
+            sections = []
+            for name in COLUMNS + ["strings"]:
+                offset = out.tell()
+                if offset % 8 != 0:
+                    out.write("\0" * (8 - offset % 8))
+                    offset = out.tell()
+                if name == "strings":
+                    out.write("".join(stringBlob))
+                    sections.append( (name, offset, length) )
+                else:
+                    c[name].tofile(out)
+                    sections.append( (name, offset, len(c[name])) )
+            header = dict(sourceInfo)
+            header["version"] = VERSION
+            header["byteorder"] = sys.byteorder
+            header["sections"] = sections
+            headerOffset = out.tell()
+            out.write(marshal.dumps(header))
+            out.write(struct.pack("<Q", headerOffset))
+        writeFile(filename, writeSections)
+
+def compileCorpus(input, output=None):
+    """
+    Compile an interaction XML corpus file into a binary cache. The input
+    is read one document at a time.
+    """
+    if output == None:
+        output = getCachePath(input)
+    print >> sys.stderr, "Compiling corpus", input, "to", output
+    sourceInfo = getSourceInfo(input)
+    builder = CacheBuilder()
+    stream = ETUtils.ElementStream(input, "document")
+    builder.addElement(stream.root, -1)
+    for document in stream:
+        builder.addDocument(document)
+    builder.write(output, sourceInfo)
+    return output
+
+###############################################################################
+# Loading
+###############################################################################
+
+def readHeader(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise IOError("Not a corpus cache file")
+    headerOffset = struct.unpack("<Q", data[-8:])[0]
+    return marshal.loads(data[headerOffset:-8])
+
+def isCacheValid(filename, cachePath=None):
+    """
+    A cache is valid if its source file has the same size and
+    modification time, or the same size and content hash, as when
+    the cache was compiled.
+    """
+    if cachePath == None:
+        cachePath = getCachePath(filename)
+    if not os.path.exists(cachePath):
+        return False
+    try:
+        f = open(cachePath, "rb")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        header = readHeader(data)
+        data.close()
+    except (IOError, ValueError, EOFError, TypeError, struct.error, mmap.error):
+        return False
+    if header.get("version") != VERSION or header.get("byteorder") != sys.byteorder:
+        return False
+    return isSourceUnchanged(filename, header)
+
+class IntColumn:
+    """ A read-only integer array in a memory mapped file """
+    unpacker = struct.Struct("=i").unpack_from
+
+    def __init__(self, data, offset, length):
+        self.data = data
+        self.offset = offset
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0 or index >= self.length:
+            raise IndexError(index)
+        return self.unpacker(self.data, self.offset + 4 * index)[0]
+
+class CachedCorpus:
+    """ A memory mapped corpus cache file """
+    def __init__(self, cachePath):
+        f = open(cachePath, "rb")
+        self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        self.header = readHeader(self.data)
+        self.columns = {}
+        for name, offset, length in self.header["sections"]:
+            if name == "strings":
+                self.stringsOffset = offset
+            else:
+                self.columns[name] = IntColumn(self.data, offset, length)
+        self.stringCache = {}
+        self.elements = {}
+        self.root = self.getElement(0)
+
+    def getroot(self):
+        return self.root
+
+    def getString(self, index):
+        if index not in self.stringCache:
+            offsets = self.columns["stringOffsets"]
+            begin = self.stringsOffset + offsets[index]
+            end = self.stringsOffset + offsets[index + 1]
+            string = self.data[begin:end].decode("utf-8")
+            try:
+                string = str(string) # ElementTree returns ascii-strings as str
+            except UnicodeEncodeError:
+                pass
+            self.stringCache[index] = string
+        return self.stringCache[index]
+
+    def getElement(self, index):
+        """ Element views are memoized, so that changes made with set() persist """
+        if index == -1:
+            return None
+        if index not in self.elements:
+            self.elements[index] = CachedElement(self, index)
+        return self.elements[index]
+
+    def close(self):
+        self.data.close()
+
+class CachedElement:
+    """
+    A view of one element in a CachedCorpus, implementing the read
+    methods of an ElementTree element. Attributes can be changed with
+    set(), but the changes are not stored in the cache.
+    """
+    def __init__(self, corpus, index):
+        self.corpus = corpus
+        self.index = index
+        columns = corpus.columns
+        self.tag = corpus.getString(columns["tag"][index])
+        text = columns["text"][index]
+        if text != -1:
+            self.text = corpus.getString(text)
+        else:
+            self.text = None
+        self.tail = None
+        self.attrib = {}
+        names = columns["attrName"]
+        values = columns["attrValue"]
+        for i in range(columns["attrStart"][index], columns["attrStart"][index + 1]):
+            self.attrib[corpus.getString(names[i])] = corpus.getString(values[i])
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    def set(self, key, value):
+        self.attrib[key] = value
+
+    def keys(self):
+        return self.attrib.keys()
+
+    def items(self):
+        return self.attrib.items()
+
+    def getchildren(self):
+        children = []
+        firstChild = self.corpus.columns["firstChild"]
+        nextSibling = self.corpus.columns["nextSibling"]
+        child = firstChild[self.index]
+        while child != -1:
+            children.append(self.corpus.getElement(child))
+            child = nextSibling[child]
+        return children
+
+    def __iter__(self):
+        return iter(self.getchildren())
+
+    def __len__(self):
+        return len(self.getchildren())
+
+    def __getitem__(self, index):
+        return self.getchildren()[index]
+
+    def findall(self, path):
+        """ Supports paths of tag names (or "*") separated by "/" """
+        elements = [self]
+        for tag in path.split("/"):
+            matches = []
+            for element in elements:
+                for child in element.getchildren():
+                    if tag == "*" or child.tag == tag:
+                        matches.append(child)
+            elements = matches
+        return elements
+
+    def find(self, path):
+        matches = self.findall(path)
+        if len(matches) > 0:
+            return matches[0]
+        return None
+
+    def getiterator(self, tag=None):
+        elements = []
+        stack = [self]
+        while len(stack) > 0:
+            element = stack.pop()
+            if tag == None or tag == "*" or element.tag == tag:
+                elements.append(element)
+            stack.extend(reversed(element.getchildren()))
+        return elements
+
+    def getCharOffsets(self):
+        """ The charOffset-attribute as a list of (begin, end)-tuples """
+        columns = self.corpus.columns
+        spans = columns["spans"]
+        offsets = []
+        for i in range(columns["spanStart"][self.index], columns["spanStart"][self.index + 1]):
+            offsets.append( (spans[2 * i], spans[2 * i + 1]) )
+        return offsets
+
+    def getEndpoints(self):
+        """
+        The elements referred to by the e1/e2 attributes of an interaction or pair,
+        or the t1/t2 attributes of a dependency. Unresolved endpoints are None.
+        """
+        columns = self.corpus.columns
+        return (self.corpus.getElement(columns["endpoint1"][self.index]),
+                self.corpus.getElement(columns["endpoint2"][self.index]))
+
+def loadCorpus(filename, parse=None, tokenization=None, removeIntersentenceInteractions=True, removeNameInfo=False, cachePath=None):
+    """
+    Like CorpusElements.loadCorpus, but the corpus is read from its binary cache,
+    which is compiled first if it doesn't exist or its source has changed.
+    """
+    if cachePath == None:
+        cachePath = getCachePath(filename)
+    if not isCacheValid(filename, cachePath):
+        compileCorpus(filename, cachePath)
+    print >> sys.stderr, "Loading corpus cache", cachePath
+    corpus = CachedCorpus(cachePath)
+    return CorpusElements.CorpusElements(corpus.root, parse, tokenization, removeIntersentenceInteractions, corpus, removeNameInfo)
+
+if __name__=="__main__":
+    from optparse import OptionParser
+    # Import Psyco if available
+    try:
+        import psyco
+        psyco.full()
+        print >> sys.stderr, "Found Psyco, using"
+    except ImportError:
+        print >> sys.stderr, "Psyco not installed"
+
+    optparser = OptionParser(usage="%prog [options]\nCompile an interaction XML corpus into a binary cache.")
+    optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
+    optparser.add_option("-o", "--output", default=None, dest="output", help="Cache file (default input + .bincache)")
+    (options, args) = optparser.parse_args()
+
+    if options.input == None:
+        print >> sys.stderr, "Error, input file not defined."
+        optparser.print_help()
+        sys.exit(1)
+
+    compileCorpus(options.input, options.output)
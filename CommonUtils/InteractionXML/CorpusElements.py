@@ -16,23 +16,110 @@ def loadCorpus(filename, parse=None, tokenization=None, removeIntersentenceInter
     return CorpusElements(corpusRoot, parse, tokenization, removeIntersentenceInteractions, corpusTree, removeNameInfo)
 
 class CorpusElements:
+    """
+    Indexes the documents and sentences of a corpus. The SentenceElements
+    objects are built only when a sentence is first accessed through
+    sentences, sentencesById, sentencesByOrigId or documentSentences,
+    and are then reused.
+    """
     def __init__(self, rootElement, parse, tokenization=None, removeIntersentenceInteractions=True, tree=None, removeNameInfo=False):
         self.tree = tree
         self.rootElement = rootElement
+        self.parse = parse
+        self.tokenization = tokenization
+        self.removeIntersentenceInteractions = removeIntersentenceInteractions
+        self.sentenceObjects = {} # SentenceElements by sentence element
         self.documents = rootElement.findall("document")
         self.documentsById = {}
-        self.sentencesById = {}
-        self.sentencesByOrigId = {}
-        self.sentences = []
+        sentencesById = {}
+        sentencesByOrigId = {}
+        sentences = []
         self.documentSentences = []
         for documentElement in self.documents:
             self.documentsById[documentElement.attrib["id"]] = documentElement
             sentenceElements = documentElement.findall("sentence")
-            self.documentSentences.append([])
             for sentenceElement in sentenceElements:
-                sentenceObj = SentenceElements(sentenceElement, parse, tokenization, removeIntersentenceInteractions)
-                self.sentencesById[sentenceElement.attrib["id"]] = sentenceObj
+                sentencesById[sentenceElement.attrib["id"]] = sentenceElement
                 if sentenceElement.attrib.has_key("origId"):
-                    self.sentencesByOrigId[sentenceElement.attrib["origId"]] = sentenceObj
-                self.sentences.append(sentenceObj)
-                self.documentSentences[-1].append(sentenceObj)
+                    sentencesByOrigId[sentenceElement.attrib["origId"]] = sentenceElement
+                sentences.append(sentenceElement)
+            self.documentSentences.append(SentenceList(self, sentenceElements))
+        self.sentencesById = SentenceDict(self, sentencesById)
+        self.sentencesByOrigId = SentenceDict(self, sentencesByOrigId)
+        self.sentences = SentenceList(self, sentences)
+    
+    def getSentence(self, sentenceElement):
+        """ Returns the (memoized) SentenceElements object for a sentence element """
+        if sentenceElement not in self.sentenceObjects:
+            self.sentenceObjects[sentenceElement] = SentenceElements(sentenceElement, self.parse, self.tokenization, self.removeIntersentenceInteractions)
+        return self.sentenceObjects[sentenceElement]
+
+class SentenceList:
+    """ A read-only list of sentence elements, accessed as SentenceElements objects """
+    def __init__(self, corpusElements, elements):
+        self.corpusElements = corpusElements
+        self.elements = elements
+    
+    def __len__(self):
+        return len(self.elements)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.corpusElements.getSentence(x) for x in self.elements[index]]
+        return self.corpusElements.getSentence(self.elements[index])
+    
+    def __getslice__(self, i, j):
+        return self[max(0, i):max(0, j):]
+    
+    def __iter__(self):
+        for element in self.elements:
+            yield self.corpusElements.getSentence(element)
+    
+    def __add__(self, other):
+        return list(self) + list(other)
+
+class SentenceDict:
+    """ A read-only dictionary of sentence elements, accessed as SentenceElements objects """
+    def __init__(self, corpusElements, elements):
+        self.corpusElements = corpusElements
+        self.elements = elements
+    
+    def __len__(self):
+        return len(self.elements)
+    
+    def __getitem__(self, key):
+        return self.corpusElements.getSentence(self.elements[key])
+    
+    def __contains__(self, key):
+        return key in self.elements
+    
+    def __iter__(self):
+        return iter(self.elements)
+    
+    def has_key(self, key):
+        return key in self.elements
+    
+    def get(self, key, default=None):
+        if key in self.elements:
+            return self[key]
+        return default
+    
+    def keys(self):
+        return self.elements.keys()
+    
+    def values(self):
+        return [self.corpusElements.getSentence(x) for x in self.elements.itervalues()]
+    
+    def items(self):
+        return [(k, self.corpusElements.getSentence(v)) for k, v in self.elements.iteritems()]
+    
+    def iterkeys(self):
+        return self.elements.iterkeys()
+    
+    def itervalues(self):
+        for element in self.elements.itervalues():
+            yield self.corpusElements.getSentence(element)
+    
+    def iteritems(self):
+        for key, element in self.elements.iteritems():
+            yield key, self.corpusElements.getSentence(element)
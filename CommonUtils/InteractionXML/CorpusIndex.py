@@ -0,0 +1,220 @@
+"""
+Random access to the documents and sentences of a corpus by id.
+
+  Description: Records the byte offsets of the document elements (and
+  optionally the sentence elements) of an interaction XML corpus in a side
+  file next to the corpus. The index is built in a single pass without
+  building a tree (see cElementTreeUtils.scanElements), and is rebuilt
+  automatically when the corpus changes. The elements are then read by
+  seeking to their offsets and parsing only them, so getting a few
+  documents out of a large corpus doesn't require parsing the whole file.
+  The corpus must be uncompressed or block gzip compressed (the default
+  for .gz files written by cElementTreeUtils).
+
+  Example:
+  index = CorpusIndex("corpus.xml.gz", sentences=True)
+  document = index.getDocument("GENIA.d12")
+  sentence = index.getSentence("GENIA.d12.s3")
+"""
+import sys, os
+import marshal
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+import cElementTreeUtils as ETUtils
+import CorpusCache
+
+VERSION = 1
+
+def getIndexPath(filename):
+    return filename + ".offsets"
+
+def buildIndex(input, output=None, sentences=False):
+    """
+    Index the documents, and optionally the sentences, of a corpus file by
+    their ids. Returns the name of the index file.
+    """
+    if output == None:
+        output = getIndexPath(input)
+    print >> sys.stderr, "Indexing corpus", input, "to", output
+    header = CorpusCache.getSourceInfo(input)
+    header["version"] = VERSION
+    header["sentences"] = sentences
+    tags = ["document"]
+    if sentences:
+        tags.append("sentence")
+    # Ids in corpus order, and (begin, end) for each id
+    ids = {}
+    offsets = {}
+    for tag in tags:
+        ids[tag] = []
+        offsets[tag] = {}
+    documentIds = {}
+    sentencesInDocument = []
+    def addElement(tag, attrs, begin, end):
+        id = attrs.get("id")
+        if offsets[tag].has_key(id):
+            print >> sys.stderr, "Warning, duplicate", tag, "id", id
+            return
+        ids[tag].append(id)
+        offsets[tag][id] = (begin, end)
+        # A document ends after its sentences
+        if tag == "sentence":
+            sentencesInDocument.append(id)
+        else:
+            for sentenceId in sentencesInDocument:
+                documentIds[sentenceId] = id
+            del sentencesInDocument[:]
+    ETUtils.scanElements(input, tags, addElement)
+    stream = ETUtils.ElementStream(input, "document")
+    header["root"] = (stream.root.tag, dict(stream.root.attrib))
+    stream.close()
+    def writeIndex(out):
+        for data in [header, ids, offsets, documentIds]:
+            marshal.dump(data, out)
+    CorpusCache.writeFile(output, writeIndex)
+    return output
+
+def isIndexValid(filename, indexPath, sentences=False):
+    """
+    An index is valid if its source file is unchanged (see
+    CorpusCache.isSourceUnchanged) and it has the sentences if they are
+    needed.
+    """
+    if not os.path.exists(indexPath):
+        return False
+    try:
+        f = open(indexPath, "rb")
+        header = marshal.load(f)
+        f.close()
+    except (IOError, ValueError, EOFError, TypeError):
+        return False
+    if header.get("version") != VERSION or (sentences and not header.get("sentences")):
+        return False
+    return CorpusCache.isSourceUnchanged(filename, header)
+
+class CorpusIndex:
+    """
+    Read documents and sentences from a corpus file by their ids.
+
+    Keyword arguments:
+    filename -- (string) corpus file, uncompressed or block gzip compressed
+    sentences -- (boolean) also index the sentences
+    indexPath -- (string) index file. If it doesn't exist or its corpus has
+                 changed, it is built. By default next to the corpus file.
+    """
+    def __init__(self, filename, sentences=False, indexPath=None):
+        if not ETUtils.canReadByOffset(filename):
+            raise IOError("%s: Only uncompressed and block gzip compressed files can be indexed, use ETUtils.canReadByOffset to check"%filename)
+        if indexPath == None:
+            indexPath = getIndexPath(filename)
+        if not isIndexValid(filename, indexPath, sentences):
+            buildIndex(filename, indexPath, sentences)
+        print >> sys.stderr, "Loading corpus index", indexPath
+        f = open(indexPath, "rb")
+        self.header = marshal.load(f)
+        self.ids = marshal.load(f)
+        self.offsets = marshal.load(f)
+        self.documentIds = marshal.load(f)
+        f.close()
+        self.root = ET.Element(self.header["root"][0], self.header["root"][1])
+        self.reader = ETUtils.OffsetReader(filename)
+
+    def getIds(self, tag="document"):
+        """ Returns the ids of the indexed elements in corpus order """
+        if not self.ids.has_key(tag):
+            raise KeyError("No index for " + str(tag) + " elements")
+        return list(self.ids[tag])
+
+    def has_key(self, id, tag="document"):
+        return self.offsets[tag].has_key(id)
+
+    def getElement(self, id, tag="document"):
+        """ Returns the element with the id, or None """
+        if not self.offsets.has_key(tag):
+            raise KeyError("No index for " + str(tag) + " elements")
+        offsets = self.offsets[tag].get(id)
+        if offsets == None:
+            return None
+        return self.reader.readElement(offsets[0], offsets[1])
+
+    def getElements(self, ids, tag="document"):
+        """ Returns the elements with the ids in corpus order, skipping
+        missing ids. Reading in corpus order minimizes seeking.
+        """
+        offsets = [self.offsets[tag][x] for x in ids if self.offsets[tag].has_key(x)]
+        offsets.sort()
+        return [self.reader.readElement(x[0], x[1]) for x in offsets]
+
+    def getDocumentId(self, sentenceId):
+        """ Returns the id of the document of a sentence, or None """
+        if not self.header["sentences"]:
+            raise KeyError("No index for sentence elements")
+        return self.documentIds.get(sentenceId)
+
+    def getDocument(self, id):
+        return self.getElement(id, "document")
+
+    def getSentence(self, id):
+        return self.getElement(id, "sentence")
+
+    def close(self):
+        self.reader.close()
+
+def extract(input, output, documentIds=[], sentenceIds=[]):
+    """
+    Write the documents with the given ids, and the documents with the
+    given sentence ids, into a new corpus file.
+    """
+    index = CorpusIndex(input, len(sentenceIds) > 0)
+    ids = set(documentIds)
+    for sentenceId in sentenceIds:
+        documentId = index.getDocumentId(sentenceId)
+        if documentId == None:
+            print >> sys.stderr, "Warning, sentence", sentenceId, "not found"
+            continue
+        ids.add(documentId)
+    for id in ids:
+        if not index.has_key(id):
+            print >> sys.stderr, "Warning, document", id, "not found"
+    print >> sys.stderr, "Writing", len(ids), "documents to", output
+    writer = ETUtils.ElementWriter(output, index.root)
+    for document in index.getElements(ids):
+        writer.write(document)
+    writer.close()
+    index.close()
+
+if __name__=="__main__":
+    from optparse import OptionParser
+    # Import Psyco if available
+    try:
+        import psyco
+        psyco.full()
+        print >> sys.stderr, "Found Psyco, using"
+    except ImportError:
+        print >> sys.stderr, "Psyco not installed"
+
+    optparser = OptionParser(usage="%prog [options]\nIndex the documents of an interaction XML corpus, or extract documents from it by id.")
+    optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
+    optparser.add_option("-o", "--output", default=None, dest="output", help="Corpus file for the extracted documents. If not defined, only the index is built.")
+    optparser.add_option("-s", "--sentences", default=False, action="store_true", dest="sentences", help="Index also the sentences")
+    optparser.add_option("-d", "--documents", default=None, dest="documents", help="Comma-separated list of document ids to extract")
+    optparser.add_option("-e", "--sentenceIds", default=None, dest="sentenceIds", help="Comma-separated list of sentence ids, whose documents are extracted")
+    (options, args) = optparser.parse_args()
+
+    if options.input == None:
+        print >> sys.stderr, "Error, input file not defined."
+        optparser.print_help()
+        sys.exit(1)
+
+    if options.output == None:
+        buildIndex(options.input, None, options.sentences)
+    else:
+        documentIds = []
+        if options.documents != None:
+            documentIds = options.documents.split(",")
+        sentenceIds = []
+        if options.sentenceIds != None:
+            sentenceIds = options.sentenceIds.split(",")
+        extract(options.input, options.output, documentIds, sentenceIds)
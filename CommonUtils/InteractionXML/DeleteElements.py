@@ -1,63 +1,106 @@
-import sys, os, copy
-extraPath = os.path.dirname(os.path.abspath(__file__))+"/../.."
-#IF LOCAL
-extraPath = os.path.dirname(os.path.abspath(__file__))+"/../../JariSandbox/ComplexPPI/Source"
-#ENDIF
-sys.path.append(extraPath)
-from Utils.ProgressCounter import ProgressCounter
+import sys, os, copy, ast
 try:
     import xml.etree.cElementTree as ET
 except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
+import Pipeline
     
-def removeElements(parent, elementName, attributes, countsByType):
-    toRemove = []
-    for element in parent.getchildren():
-        if element.tag == elementName:
-            remove = True
-            for k,v in attributes.iteritems():
-                if element.get(k) != v:
-                    remove = False
-            if remove:
-                toRemove.append(element)
-        else:
-            removeElements(element, elementName, attributes, countsByType)
-    for element in toRemove:
-        parent.remove(element)
-        countsByType[elementName] += 1
-            
+class RuleSet:
+    """
+    Deletion rules compiled into a table by element tag.
+
+    The rules are a dictionary from element tag to a dictionary of attribute
+    values, e.g. {"pair":{}, "entity":{"isName":"False"}}. An element is
+    removed if its tag has a rule and it has all the attribute values of the
+    rule. All rules are applied in a single traversal, with the same result
+    (and counts) as applying them one at a time in sorted order of the tags,
+    not looking inside elements that have a rule but don't match it.
+    """
+    def __init__(self, rules):
+        self.rules = rules
+        self.tags = sorted(rules.keys())
+        self.order = {}
+        self.attributes = {}
+        for i in range(len(self.tags)):
+            self.order[self.tags[i]] = i
+            self.attributes[self.tags[i]] = tuple(rules[self.tags[i]].items())
+        self.allTags = frozenset(self.tags)
+
+    def matches(self, element):
+        for k, v in self.attributes[element.tag]:
+            if element.get(k) != v:
+                return False
+        return True
+
+    def apply(self, parent, countsByType, active=None):
+        """ Removes matching elements under parent and adds them to countsByType """
+        if active == None:
+            active = self.allTags
+        toRemove = []
+        for element in parent:
+            tag = element.tag
+            subActive = active
+            if tag in active:
+                if self.matches(element):
+                    toRemove.append(element)
+                    countsByType[tag] += 1
+                    # The rules applied before this one have also removed
+                    # their matches from inside this element
+                    subActive = frozenset([x for x in active if self.order[x] < self.order[tag]])
+                else:
+                    subActive = active - frozenset([tag])
+            if len(subActive) > 0 and len(element) > 0:
+                self.apply(element, countsByType, subActive)
+        for element in toRemove:
+            parent.remove(element)
+
+def parseRules(rulesString):
+    """ Parse rules given as a python dictionary literal """
+    rules = ast.literal_eval(rulesString)
+    assert isinstance(rules, dict), rules
+    for k, v in rules.iteritems():
+        assert isinstance(v, dict), (k, v)
+    return rules
+
 # Splits entities/edges with merged types into separate elements
 def processSentence(sentence, rules, countsByType):
-    for key in sorted(rules.keys()):
-        #print key, rules[key]
-        removeElements(sentence, key, rules[key], countsByType)
+    if isinstance(rules, dict): # not compiled
+        rules = RuleSet(rules)
+    rules.apply(sentence, countsByType)
 
-def processCorpus(inputFilename, outputFilename, rules):
-    print >> sys.stderr, "Loading corpus file", inputFilename
-    if inputFilename.rsplit(".",1)[-1] == "gz":
-        import gzip
-        corpusTree = ET.parse(gzip.open(inputFilename))
-    else:
-        corpusTree = ET.parse(inputFilename)
-    corpusRoot = corpusTree.getroot()
-    
-    documents = corpusRoot.findall("document")
-    counter = ProgressCounter(len(documents), "Documents")
+def processDocument(document, rules):
+    if isinstance(rules, dict): # not compiled
+        rules = RuleSet(rules)
     countsByType = {}
-    for k in sorted(rules.keys()):
+    for k in rules.tags:
         countsByType[k] = 0
-    for document in documents:
-        counter.update()
-        for sentence in document.findall("sentence"):
-            processSentence(sentence, rules, countsByType)
+    for sentence in document.findall("sentence"):
+        processSentence(sentence, rules, countsByType)
+    return countsByType
+
+def printResults(countsByType):
     print >> sys.stderr, "Removed"
     for k in sorted(countsByType.keys()):
         print >> sys.stderr, "  " + k + ":", countsByType[k]
+
+def processCorpus(inputFilename, outputFilename, rules, workers=None, stream=False):
+    """
+    Keyword arguments:
+    inputFilename -- (string) corpus file name
+    outputFilename -- (string) output file name
+    rules -- (dictionary) element tags and attributes, see RuleSet
+    workers -- (int) process documents one at a time in this many processes
+    stream -- (boolean) process documents one at a time in this process
     
-    if outputFilename != None:
-        print >> sys.stderr, "Writing output to", outputFilename
-        ETUtils.write(corpusRoot, outputFilename)
+    Returns the processed corpus tree. With workers or stream, the documents
+    are only written to the output file and None is returned. Without an
+    output file they are processed in memory.
+    """
+    if stream and workers == None:
+        workers = 1
+    corpusTree, countsByType = Pipeline.processCorpus(inputFilename, outputFilename, "deleteElements", (RuleSet(rules),), workers)
+    printResults(countsByType)
     return corpusTree
 
 if __name__=="__main__":
@@ -76,6 +119,8 @@ if __name__=="__main__":
     optparser = OptionParser(usage="%prog [options]\nPath generator.")
     optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
     optparser.add_option("-o", "--output", default=None, dest="output", help="Output file in interaction xml format.")
+    optparser.add_option("-w", "--workers", type="int", default=None, dest="workers", help="Process documents one at a time in this many processes (0 for one per core).")
+    optparser.add_option("-s", "--stream", default=False, action="store_true", dest="stream", help="Process documents one at a time, without loading the corpus.")
     optparser.add_option("-r", "--rules", default=None, dest="rules", help="dictionary of python dictionaries with attribute:value pairs.")    
     (options, args) = optparser.parse_args()
     
@@ -89,6 +134,6 @@ if __name__=="__main__":
         sys.exit(1)
 
     # Rules e.g. "{\"pair\":{},\"interaction\":{},\"entity\":{\"isName\":\"False\"}}"
-    rules = eval(options.rules)
+    rules = parseRules(options.rules)
     print >> sys.stderr, "Rules:", rules
-    processCorpus(options.input, options.output, rules)
+    processCorpus(options.input, options.output, rules, options.workers, options.stream)
@@ -1,66 +1,43 @@
 import sys, os
-extraPath = os.path.dirname(os.path.abspath(__file__))+"/../.."
-#IF LOCAL
-extraPath = os.path.dirname(os.path.abspath(__file__))+"/../../JariSandbox/ComplexPPI/Source"
-#ENDIF
-sys.path.append(extraPath)
-from Utils.ProgressCounter import ProgressCounter
 try:
     import xml.etree.cElementTree as ET
 except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
+import RouteDocuments
 
 def processCorpus(input, outDir, stem, tail, mergedSets=[]):
-    newCorpora = {}
-    print >> sys.stderr, "Loading corpus file", input
-    corpusRoot = ETUtils.ETFromObj(input).getroot()
-    
-    documents = corpusRoot.findall("document")
-    counter = ProgressCounter(len(documents), "Documents")
+    """
+    Write the documents of each set to a separate file. Documents are read
+    and written one at a time. Documents of a merged set are written in
+    corpus order.
+    """
     countsByType = {}
-    for document in documents:
-        counter.update()
+    def route(document, inputIndex):
         docSet = document.get("set")
         if docSet == None:
             print >> sys.stderr, "Warning, no set defined for document", document.get("id")
             if not countsByType.has_key(None):
                 countsByType[None] = 0
             countsByType[docSet] += 1
-            continue
-        if not newCorpora.has_key(docSet):
-            newCorpora[docSet] = ET.Element("corpus")
-            for k, v in corpusRoot.attrib.iteritems():
-                newCorpora[docSet].set(k, v)
-            countsByType[docSet] = 0
-        newCorpora[docSet].append(document)
-        countsByType[docSet] += 1
-        
-    # Make merged sets
-    for mergedSet in mergedSets:
-        tag = "-and-".join(sorted(mergedSet))
-        if not newCorpora.has_key(tag):
-            newCorpora[tag] = ET.Element("corpus")
-            for k, v in corpusRoot.attrib.iteritems():
-                newCorpora[tag].set(k, v)
-            countsByType[tag] = 0    
-        for componentSet in mergedSet:
-            for element in newCorpora[componentSet].findall("document"):
-                newCorpora[tag].append(element)
-                countsByType[tag] += 1
-        
-    print >> sys.stderr, "New Sets"
-    for k in sorted(countsByType.keys()):
-        print >> sys.stderr, "  " + str(k) + ":", countsByType[k]
+            return []
+        names = [docSet]
+        # Make merged sets
+        for mergedSet in mergedSets:
+            if docSet in mergedSet:
+                names.append("-and-".join(sorted(mergedSet)))
+        return names
     
     if not os.path.exists(outDir):
         os.makedirs(outDir)
     
     print >> sys.stderr, "Writing output files to directory", outDir
-    for docSet in sorted(newCorpora.keys()):
-        outFilename = os.path.join(outDir, stem + docSet + tail)
-        print >> sys.stderr, "Writing set", docSet, "to", outFilename
-        ETUtils.write(newCorpora[docSet], outFilename)
+    counts = RouteDocuments.routeDocuments([input], route, lambda docSet: os.path.join(outDir, stem + docSet + tail))
+    countsByType.update(counts)
+    
+    print >> sys.stderr, "New Sets"
+    for k in sorted(countsByType.keys()):
+        print >> sys.stderr, "  " + str(k) + ":", countsByType[k]
 
 if __name__=="__main__":
     import sys
@@ -1,78 +1,51 @@
-import sys, os
+import sys, os, re
+import bisect
 try:
     import xml.etree.cElementTree as ET
 except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
 import Range
+import Pipeline
 from collections import defaultdict
 extraPath = os.path.dirname(os.path.abspath(__file__))+"/../../JariSandbox/ComplexPPI/Source"
 sys.path.append(extraPath)
 import ExampleBuilders.PhraseTriggerExampleBuilder 
 
+# Runs of whitespace and runs of other characters
+tokenPattern = re.compile(r"\s+|\S+", re.UNICODE)
+# Words that can be part of a bacterium name (also "species" and "phylum"
+# have been tried)
+extraWords = frozenset(["heliothrix", "caldicellulosiruptor", "genus", "bacterium", "bacteria", 
+                        "strain", "organisms", "fetus", "venerealis", "subsp", "subspecies", "ssp", 
+                        "-like", "sp", "serotope", "psjn"])
+# Endings of bacterium names, and common words with these endings (also
+# "es" has been tried)
+bacteriaSuffixes = ("lla", "ica", "us", "um", "ans", "bacter", "is", "ma", "ia", "ii", "li", 
+                    "nii", "plasma", "plasmas", "ae", "ri", "ni")
+notBacteriaWords = frozenset(["thus", "phylum", "humans", "is", "this"])
+
 def tokenize(text):
-    tokens = [""]
-    inText = False
-    for c in text:
-        if c.isspace():
-            if inText:
-                tokens.append(c)
-                inText = False
-            else:
-                tokens[-1] += c
-        else: # text
-            if inText:
-                tokens[-1] += c
-            else:
-                tokens.append(c)
-                inText = True
-    if tokens[0] == "" and len(tokens) > 1:
-        return tokens[1:]
-    else:
-        return tokens
+    """ Splits text into alternating runs of whitespace and other characters """
+    tokens = tokenPattern.findall(text)
+    if len(tokens) == 0:
+        return [""]
+    return tokens
+
+def getTokenStarts(tokens):
+    starts = []
+    position = 0
+    for token in tokens:
+        starts.append(position)
+        position += len(token)
+    return starts
 
 def isExtraWord(token, toLower=True, relPos = None):
     if token[-1] == ".":
         token = token[:-1]
     if toLower:
         token = token.lower()
-    
-    if token in ["heliothrix", "caldicellulosiruptor"]:
-        return True
-    
-    if token == "genus":
-        return True
-    if token == "bacterium":
-        return True
-    if token == "bacteria":
-        return True
-    elif token == "strain":
-        return True
-    elif token == "organisms":
-        return True
-    elif token == "fetus":
-        return True
-    elif token == "venerealis":
-        return True
-    elif token == "subsp":
-        return True
-    elif token == "subspecies":
-        return True
-    elif token == "ssp":
-        return True
-    elif token == "-like":
-        return True
-    elif token == "sp":
-        return True
-    #elif token == "species":
-    #    return True
-    elif token == "serotope":
-        return True
-    elif token == "psjn":
-        return True
-    #elif token == "phylum":
-    #    return True
-    return False
+    return token in extraWords
 
 def isBacteriaToken(token, bacteriaTokens, relPos):
     while len(token) > 0 and not token[0].isalnum():
@@ -113,41 +86,7 @@ def isBacteriaToken(token, bacteriaTokens, relPos):
     if token == "JIP":
         return True
     
-    if tokenLower.endswith("lla"):
-        return True
-    elif tokenLower.endswith("ica"):
-        return True
-    elif tokenLower.endswith("us") and tokenLower != "thus":
-        return True
-    elif tokenLower.endswith("um") and tokenLower not in ["phylum"]:
-        return True
-    elif tokenLower.endswith("ans") and tokenLower != "humans":
-        return True
-    elif tokenLower.endswith("bacter"):
-        return True
-    elif tokenLower.endswith("is") and tokenLower not in ["is", "this"]:
-        return True
-    #elif tokenLower.endswith("es"):
-    #    return True
-    elif tokenLower.endswith("ma"):
-        return True
-    elif tokenLower.endswith("ia"):
-        return True
-    elif tokenLower.endswith("ii"):
-        return True
-    elif tokenLower.endswith("li"):
-        return True
-    elif tokenLower.endswith("nii"):
-        return True
-    elif tokenLower.endswith("plasma"):
-        return True
-    elif tokenLower.endswith("plasmas"):
-        return True
-    elif tokenLower.endswith("ae"):
-        return True
-    elif tokenLower.endswith("ri"):
-        return True
-    elif tokenLower.endswith("ni"):
+    if tokenLower.endswith(bacteriaSuffixes) and tokenLower not in notBacteriaWords:
         return True
 
     if isExtraWord(token, toLower=True):
@@ -165,136 +104,176 @@ def isBacteriaToken(token, bacteriaTokens, relPos):
 
     return False
 
-def extend(input, output=None, entityTypes=["Bacterium"], verbose=False):
-    if not (ET.iselement(input) and input.tag == "sentence"):
-        print >> sys.stderr, "Loading corpus file", input
-        corpusTree = ETUtils.ETFromObj(input)
-        corpusRoot = corpusTree.getroot()
+class BacteriaTokenMatcher:
+    """
+    Caches the results of isBacteriaToken, which depend only on the token
+    and on whether it is after the head token.
+    """
+    def __init__(self, bacteriaTokens, cacheSize=100000):
+        self.bacteriaTokens = frozenset(bacteriaTokens)
+        self.cache = {}
+        self.cacheSize = cacheSize
     
-    bacteriaTokens = ExampleBuilders.PhraseTriggerExampleBuilder.getBacteriaTokens(ExampleBuilders.PhraseTriggerExampleBuilder.getBacteriaNames())
+    def isBacteriaToken(self, token, relPos):
+        key = (token, relPos > 0)
+        if not self.cache.has_key(key):
+            if len(self.cache) >= self.cacheSize:
+                self.cache = {}
+            self.cache[key] = isBacteriaToken(token, self.bacteriaTokens, relPos)
+        return self.cache[key]
+
+def extendSentence(sentence, matcher, entityTypes, verbose, counts):
+    """
+    Extends the entities of a sentence to cover the whole bacterium name.
     
-    if not (ET.iselement(input) and input.tag == "sentence"):
-        sentences = corpusRoot.getiterator("sentence")
-    else:
-        sentences = [input]
-    counts = defaultdict(int)
-    for sentence in sentences:
-        incorrectCount = 0
-        sentenceText = sentence.get("text")
-        tokens = tokenize(sentenceText)
-        for entity in sentence.findall("entity"):
-            counts["all-entities"] += 1
-            if entity.get("type") not in entityTypes:
-                continue
-            headOffset = entity.get("headOffset")
-            if headOffset == None:
-                if verbose: print "WARNING, no head offset for entity", entity.get("id")
-                headOffset = entity.get("charOffset")
-            headOffset = Range.charOffsetToTuples(headOffset)[0]
-            charOffset = entity.get("charOffset")
-            assert charOffset != None, "WARNING, no head offset for entity " + str(entity.get("id"))
-            charOffset = Range.charOffsetToTuples(charOffset)[0]
-            tokPos = [0,0]
-            tokIndex = None
-            # find main token
-            for i in range(len(tokens)):
+    Keyword arguments:
+    matcher -- (BacteriaTokenMatcher) or (set) bacteria tokens
+    """
+    if not isinstance(matcher, BacteriaTokenMatcher):
+        matcher = BacteriaTokenMatcher(matcher)
+    incorrectCount = 0
+    sentenceText = sentence.get("text")
+    tokens = None
+    for entity in sentence.findall("entity"):
+        counts["all-entities"] += 1
+        if entity.get("type") not in entityTypes:
+            continue
+        if tokens == None: # tokenized once for all entities, if there are any
+            tokens = tokenize(sentenceText)
+            tokenStarts = getTokenStarts(tokens)
+        headOffset = entity.get("headOffset")
+        if headOffset == None:
+            if verbose: print "WARNING, no head offset for entity", entity.get("id")
+            headOffset = entity.get("charOffset")
+        headOffset = Range.charOffsetToTuples(headOffset)[0]
+        charOffset = entity.get("charOffset")
+        assert charOffset != None, "WARNING, no head offset for entity " + str(entity.get("id"))
+        charOffset = Range.charOffsetToTuples(charOffset)[0]
+        tokIndex = None
+        # find main token, the one containing the beginning of the head
+        i = bisect.bisect_right(tokenStarts, headOffset[0]) - 1
+        if i >= 0 and tokenStarts[i] + len(tokens[i]) > headOffset[0]:
+            tokIndex = i
+            tokPos = [tokenStarts[i], tokenStarts[i] + len(tokens[i]) - 1]
+        assert tokIndex != None, (entity.get("id"), entity.get("text"), tokens)
+        skip = False
+        if tokPos[0] < headOffset[0]:
+            tokPos = headOffset
+            skip = True
+        if not skip:
+            # Extend before
+            beginIndex = tokIndex
+            for i in range(tokIndex-1, -1, -1):
                 token = tokens[i]
-                tokPos[1] = tokPos[0] + len(token) - 1
-                if Range.overlap(headOffset, tokPos):
-                    tokIndex = i
+                if token.isspace():
+                    continue
+                if not matcher.isBacteriaToken(token, i - tokIndex):
+                    beginIndex = i + 1
                     break
-                tokPos[0] += len(token)
-            assert tokIndex != None, (entity.get("id"), entity.get("text"), tokens)
-            skip = False
-            if tokPos[0] < headOffset[0]:
-                tokPos = headOffset
-                skip = True
-            if not skip:
-                # Extend before
-                beginIndex = tokIndex
-                for i in range(tokIndex-1, -1, -1):
+                if i == 0:
+                    beginIndex = i
+            while tokens[beginIndex].isspace() or isExtraWord(tokens[beginIndex], toLower=False):
+                beginIndex += 1
+                if beginIndex >= tokIndex:
+                    beginIndex = tokIndex
+                    break
+            # Extend after
+            endIndex = tokIndex
+            if tokens[tokIndex][-1] != ",":
+                endIndex = tokIndex
+                for i in range(tokIndex+1, len(tokens)):
                     token = tokens[i]
                     if token.isspace():
                         continue
-                    if not isBacteriaToken(token, bacteriaTokens, i - tokIndex):
-                        beginIndex = i + 1
-                        break
-                    if i == 0:
-                        beginIndex = i
-                while tokens[beginIndex].isspace() or isExtraWord(tokens[beginIndex], toLower=False):
-                    beginIndex += 1
-                    if beginIndex >= tokIndex:
-                        beginIndex = tokIndex
+                    if not matcher.isBacteriaToken(token, i - tokIndex):
+                        endIndex = i - 1
                         break
-                # Extend after
-                endIndex = tokIndex
-                if tokens[tokIndex][-1] != ",":
-                    endIndex = tokIndex
-                    for i in range(tokIndex+1, len(tokens)):
-                        token = tokens[i]
-                        if token.isspace():
-                            continue
-                        if not isBacteriaToken(token, bacteriaTokens, i - tokIndex):
-                            endIndex = i - 1
-                            break
-                        if i == len(tokens) - 1:
-                            endIndex = i
-                    while tokens[endIndex].isspace():
-                        endIndex -= 1
-                # Modify range
-                if tokIndex > beginIndex:
-                    for token in reversed(tokens[beginIndex:tokIndex]):
-                        tokPos[0] -= len(token)
-                if tokIndex < endIndex:
-                    for token in tokens[tokIndex+1:endIndex+1]:
-                        tokPos[1] += len(token)
-                # Attempt to remove trailing periods and commas
-                while not sentenceText[tokPos[1]].isalnum():
-                    tokPos[1] -= 1
-                    if tokPos[1] < tokPos[0]:
-                        tokPos[1] = tokPos[0]
-                        break
-                while not sentenceText[tokPos[0]].isalnum():
-                    tokPos[0] += 1
-                    if tokPos[0] > tokPos[1]:
-                        tokPos[1] = tokPos[0]
-                        break
-                # Split merged names
-                #newPos = [tokPos[0], tokPos[1]]
-                #for split in sentenceText[tokPos[0]:tokPos[1]+1].split("/"):
-                #    newPos[0] += len(split)
-                #    if                 
-            # Insert changed charOffset
-            counts["entities"] += 1
-            newOffset = tuple(tokPos)
-            newOffsetString = Range.tuplesToCharOffset([newOffset])
-            if verbose:
-                print "Entity", entity.get("id"), 
-                print [entity.get("text"), sentenceText[headOffset[0]:headOffset[1]+1], sentenceText[newOffset[0]:newOffset[1]+1]], 
-                print [entity.get("charOffset"), entity.get("headOffset"), newOffsetString], "Sent:", len(sentence.get("text")),
-            if newOffset != headOffset:
-                counts["extended"] += 1
-                if verbose: print "EXTENDED",
-            if newOffset == charOffset:
-                counts["correct"] += 1
-                if verbose: print "CORRECT"
-            else:
-                counts["incorrect"] += 1
-                incorrectCount += 1
-                if verbose: print "INCORRECT"
-            entity.set("charOffset", newOffsetString)
-            entity.set("text", sentenceText[newOffset[0]:newOffset[1]+1])
-        if incorrectCount > 0 and verbose:
-            print "TOKENS:", "|".join(tokens)
-            print "--------------------------------"
+                    if i == len(tokens) - 1:
+                        endIndex = i
+                while tokens[endIndex].isspace():
+                    endIndex -= 1
+            # Modify range
+            if tokIndex > beginIndex:
+                tokPos[0] = tokenStarts[beginIndex]
+            if tokIndex < endIndex:
+                tokPos[1] = tokenStarts[endIndex] + len(tokens[endIndex]) - 1
+            # Attempt to remove trailing periods and commas
+            while not sentenceText[tokPos[1]].isalnum():
+                tokPos[1] -= 1
+                if tokPos[1] < tokPos[0]:
+                    tokPos[1] = tokPos[0]
+                    break
+            while not sentenceText[tokPos[0]].isalnum():
+                tokPos[0] += 1
+                if tokPos[0] > tokPos[1]:
+                    tokPos[1] = tokPos[0]
+                    break
+            # Split merged names
+            #newPos = [tokPos[0], tokPos[1]]
+            #for split in sentenceText[tokPos[0]:tokPos[1]+1].split("/"):
+            #    newPos[0] += len(split)
+            #    if                 
+        # Insert changed charOffset
+        counts["entities"] += 1
+        newOffset = tuple(tokPos)
+        newOffsetString = Range.tuplesToCharOffset([newOffset])
+        if verbose:
+            print "Entity", entity.get("id"), 
+            print [entity.get("text"), sentenceText[headOffset[0]:headOffset[1]+1], sentenceText[newOffset[0]:newOffset[1]+1]], 
+            print [entity.get("charOffset"), entity.get("headOffset"), newOffsetString], "Sent:", len(sentence.get("text")),
+        if newOffset != headOffset:
+            counts["extended"] += 1
+            if verbose: print "EXTENDED",
+        if newOffset == charOffset:
+            counts["correct"] += 1
+            if verbose: print "CORRECT"
+        else:
+            counts["incorrect"] += 1
+            incorrectCount += 1
+            if verbose: print "INCORRECT"
+        entity.set("charOffset", newOffsetString)
+        entity.set("text", sentenceText[newOffset[0]:newOffset[1]+1])
+    if incorrectCount > 0 and verbose:
+        print "TOKENS:", "|".join(tokens)
+        print "--------------------------------"
+
+def extendDocument(document, entityTypes=["Bacterium"], verbose=False):
+    matcher = getBacteriaTokenMatcher()
+    counts = defaultdict(int)
+    for sentence in document.getiterator("sentence"):
+        extendSentence(sentence, matcher, entityTypes, verbose, counts)
+    return dict(counts)
+
+# Loaded once per process
+bacteriaTokens = None
+bacteriaTokenMatcher = None
+
+def getBacteriaTokens():
+    global bacteriaTokens
+    if bacteriaTokens == None:
+        bacteriaTokens = ExampleBuilders.PhraseTriggerExampleBuilder.getBacteriaTokens(ExampleBuilders.PhraseTriggerExampleBuilder.getBacteriaNames())
+    return bacteriaTokens
+
+def getBacteriaTokenMatcher():
+    global bacteriaTokenMatcher
+    if bacteriaTokenMatcher == None:
+        bacteriaTokenMatcher = BacteriaTokenMatcher(getBacteriaTokens())
+    return bacteriaTokenMatcher
+
+def extend(input, output=None, entityTypes=["Bacterium"], verbose=False, workers=None):
+    """ Returns the processed corpus tree, or None if the documents were
+    processed with workers (they are only written to the output file)
+    """
+    if ET.iselement(input) and input.tag == "sentence":
+        counts = defaultdict(int)
+        extendSentence(input, getBacteriaTokenMatcher(), entityTypes, verbose, counts)
+        if verbose:
+            print dict(counts)
+        return None
+    corpusTree, counts = Pipeline.processCorpus(input, output, "extendTriggers", (entityTypes, verbose), workers)
     if verbose:
         print counts
-    
-    if not (ET.iselement(input) and input.tag == "sentence"):
-        if output != None:
-            print >> sys.stderr, "Writing output to", output
-            ETUtils.write(corpusRoot, output)
-        return corpusTree                    
+    return corpusTree
 
 if __name__=="__main__":
     print >> sys.stderr, "##### Extend Triggers #####"
@@ -311,8 +290,9 @@ if __name__=="__main__":
     optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in analysis format", metavar="FILE")
     optparser.add_option("-o", "--output", default=None, dest="output", help="Corpus in analysis format", metavar="FILE")
     optparser.add_option("-d", "--debug", default=False, action="store_true", dest="debug", help="")
+    optparser.add_option("-w", "--workers", type="int", default=None, dest="workers", help="Process documents one at a time in this many processes (0 for one per core).")
     (options, args) = optparser.parse_args()
     assert(options.input != None)
     #assert(options.output != None)
     
-    extend(options.input, options.output, verbose=options.debug)
+    extend(options.input, options.output, verbose=options.debug, workers=options.workers)
@@ -10,13 +10,19 @@ try:
 except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
+import CorpusIndex
 
-def processCorpus(input, attrs=["text"]):
+def processCorpus(input, attrs=["text"], documentIds=None):
     print attrs
-    print >> sys.stderr, "Loading corpus file", input
-    corpusRoot = ETUtils.ETFromObj(input).getroot()
-    
-    documents = corpusRoot.findall("document")
+    if documentIds != None:
+        # Read only the requested documents
+        index = CorpusIndex.CorpusIndex(input)
+        documents = index.getElements(documentIds)
+        index.close()
+    else:
+        print >> sys.stderr, "Loading corpus file", input
+        corpusRoot = ETUtils.ETFromObj(input).getroot()
+        documents = corpusRoot.findall("document")
     counter = ProgressCounter(len(documents), "Documents")
     countsByType = {}
     interactors = {}
@@ -61,6 +67,7 @@ if __name__=="__main__":
     optparser = OptionParser(usage="%prog [options]\nPath generator.")
     optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
     optparser.add_option("-a", "--attr", default=None, dest="attr", help="Output file in interaction xml format.")
+    optparser.add_option("-d", "--documents", default=None, dest="documents", help="Comma-separated list of document ids. Only these documents are read, using a corpus index (see CorpusIndex).")
     (options, args) = optparser.parse_args()
     
     if options.input == None:
@@ -68,4 +75,7 @@ if __name__=="__main__":
         optparser.print_help()
         sys.exit(1)
 
-    processCorpus(options.input, eval(options.attr))
+    documentIds = None
+    if options.documents != None:
+        documentIds = options.documents.split(",")
+    processCorpus(options.input, eval(options.attr), documentIds)
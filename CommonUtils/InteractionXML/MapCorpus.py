@@ -0,0 +1,161 @@
+"""
+Apply a function to every document of a corpus using multiple processes.
+
+  Description: The documents of the input corpus are read one at a time and
+  grouped into chunks. With more than one worker, each chunk is serialized
+  and processed in a pool of processes, and the results are written in the
+  original document order as soon as they are ready. Only a bounded number
+  of chunks is kept in memory at any time.
+
+  The mapped function is called with a document element (and any extra
+  arguments) and may modify the document in place. It can return a
+  dictionary of counts, which are summed over the corpus. In a process pool
+  the function (and its arguments) must be picklable, i.e. defined at the
+  top level of a module.
+"""
+import sys
+from collections import deque
+from multiprocessing import Pool, cpu_count
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+import cElementTreeUtils as ETUtils
+import RecalculateIds
+
+def addCounts(total, counts):
+    """ Adds a dictionary of counts to total. Values can be numbers
+    or lists of numbers (added elementwise).
+    """
+    if counts == None:
+        return
+    for key, value in counts.iteritems():
+        if isinstance(value, list):
+            if not total.has_key(key):
+                total[key] = [0] * len(value)
+            for i in range(len(value)):
+                total[key][i] += value[i]
+        else:
+            total[key] = total.get(key, 0) + value
+
+def processChunk(job):
+    """ Process a chunk of documents. Documents given as strings are parsed
+    and the results are returned serialized, unless there is no output.
+    """
+    documents, func, args, docIndex, corpusName, recalculateIds, passIndex, compact, serialize = job
+    counts = {}
+    results = []
+    for document in documents:
+        if isinstance(document, basestring):
+            document = ET.fromstring(document)
+        if passIndex:
+            addCounts(counts, func(document, docIndex, corpusName, *args))
+        else:
+            addCounts(counts, func(document, *args))
+        if recalculateIds: # deterministic, as the index comes with the chunk
+            RecalculateIds.recalculateDocumentIds(document, docIndex, corpusName)
+        docIndex += 1
+        if serialize:
+            results.append(ETUtils.serializeElement(document, compact))
+    return results, counts
+
+def getChunks(stream, chunkSize, serialize):
+    chunk = []
+    for document in stream:
+        if serialize:
+            chunk.append(ET.tostring(document, "utf-8"))
+        else:
+            chunk.append(document)
+        if len(chunk) >= chunkSize:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+def canMap(input, output):
+    """ True if a corpus can be processed with mapCorpus by a tool that
+    otherwise returns the processed corpus tree. mapCorpus only writes
+    the documents to the output file, so the input must be a file and
+    there must be an output.
+    """
+    return isinstance(input, basestring) and output != None
+
+def mapCorpus(input, output, func, args=(), workers=1, chunkSize=50, recalculateIds=False, compact=False, passIndex=False):
+    """ Applies a function to all documents of a corpus
+
+    Keyword arguments:
+    input -- (string) corpus file name
+    output -- (string) output file name, or None to only compute the counts
+    func -- (function) called with a document and args, may modify the
+            document and may return a dictionary of counts
+    args -- (tuple) extra arguments for func
+    workers -- (int) number of processes. If 1, the documents are processed
+               in this process. If 0 or None, one per core.
+    chunkSize -- (int) number of documents sent to a process at a time
+    recalculateIds -- (boolean) recalculate the ids of the processed documents
+    compact -- (boolean) write the output without indentation
+    passIndex -- (boolean) call func with the index of the document and the
+                 corpus name after the document, before args
+
+    Returns:
+    The summed counts returned by func. If func raises an exception, the
+    processes are stopped and the output is not written.
+    """
+    if workers == None or workers == 0:
+        workers = cpu_count()
+    stream = ETUtils.ElementStream(input, "document")
+    corpusName = stream.root.get("source")
+    writer = None
+    if output != None:
+        print >> sys.stderr, "Writing output to", output
+        writer = ETUtils.ElementWriter(output, stream.root, compact)
+    counts = {}
+    docIndex = 0
+    pool = None
+    completed = False
+    try:
+        if workers <= 1:
+            for chunk in getChunks(stream, chunkSize, False):
+                results, chunkCounts = processChunk( (chunk, func, args, docIndex, corpusName, recalculateIds, passIndex, compact, writer != None) )
+                docIndex += len(chunk)
+                addCounts(counts, chunkCounts)
+                if writer != None:
+                    for result in results:
+                        writer.writeSerialized(result)
+        else:
+            print >> sys.stderr, "Processing documents with", workers, "processes"
+            pool = Pool(workers)
+            pending = deque()
+            chunks = getChunks(stream, chunkSize, True)
+            while True:
+                # Keep the pool busy while keeping memory bounded
+                while len(pending) < 2 * workers:
+                    chunk = next(chunks, None)
+                    if chunk == None:
+                        break
+                    pending.append( pool.apply_async(processChunk, ((chunk, func, args, docIndex, corpusName, recalculateIds, passIndex, compact, writer != None),)) )
+                    docIndex += len(chunk)
+                if len(pending) == 0:
+                    break
+                results, chunkCounts = pending.popleft().get()
+                addCounts(counts, chunkCounts)
+                if writer != None:
+                    for result in results:
+                        writer.writeSerialized(result)
+        completed = True
+    finally:
+        # If a document could not be processed, the remaining chunks are
+        # dropped and an existing output file is left as it was
+        if pool != None:
+            if completed:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+        if writer != None:
+            if completed:
+                writer.close()
+            else:
+                writer.abort()
+        stream.close()
+    return counts
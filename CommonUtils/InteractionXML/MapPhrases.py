@@ -12,6 +12,8 @@ except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
 import Range
+import RangeArrays
+from SpanIndex import SpanIndex
 
 def phraseToStr(phrase, indent = ""):
     s = indent
@@ -31,23 +33,27 @@ def filterPhrases(phrases, filter):
 def fixIndices(phrases, tokens):
     fixCount = 0
     phraseCount = 0
+    tokenIndex = SpanIndex()
+    for token in tokens:
+        tokenIndex.add(Range.getElementSingleTuple(token), token)
     for phrase in phrases:
         fixed = False
-        phraseOffset = Range.charOffsetToSingleTuple(phrase.get("charOffset"))
+        phraseOffset = Range.getElementSingleTuple(phrase)
         phraseBegin = int(phrase.get("begin"))
         phraseEnd = int(phrase.get("end"))
-        for i in range(len(tokens)):
-            token = tokens[i]
-            tokOffset = Range.charOffsetToSingleTuple(token.get("charOffset"))
-            if tokOffset[0] == phraseOffset[0]:
-                if phraseBegin != i:
-                    phrase.set("begin", str(i))
-                    fixed = True
-            if tokOffset[1] == phraseOffset[1]:
-                if phraseEnd != i:
-                    phrase.set("end", str(i))
-                    fixed = True
-                break
+        # The first token ending with the phrase is the end token, and the
+        # last token before it beginning with the phrase is the begin token
+        endTokens = tokenIndex.findEndingAt(phraseOffset[1])
+        beginTokens = tokenIndex.findBeginningAt(phraseOffset[0])
+        if len(endTokens) > 0:
+            beginTokens = [x for x in beginTokens if x <= endTokens[0]]
+        beginTokens = [x for x in beginTokens if x != phraseBegin]
+        if len(beginTokens) > 0:
+            phrase.set("begin", str(beginTokens[-1]))
+            fixed = True
+        if len(endTokens) > 0 and phraseEnd != endTokens[0]:
+            phrase.set("end", str(endTokens[0]))
+            fixed = True
         if fixed:
             fixCount += 1
         phraseCount += 1
@@ -87,7 +93,7 @@ def getPhraseDict(phrases):
     phraseDict = {}   
     # Define offsets
     for phrase in phrases:
-        phraseOffset = Range.charOffsetToSingleTuple(phrase.get("charOffset"))
+        phraseOffset = Range.getElementSingleTuple(phrase)
         if not phraseDict.has_key(phraseOffset):
             phraseDict[phraseOffset] = []
         phraseDict[phraseOffset].append(phrase)
@@ -115,14 +121,14 @@ def makeINSubPhrases(phrases, tokens, phraseDict, filter=None):
     for phrase in phrases:
         if filter != None and phrase.get("type") not in filter:
             continue
-        phraseOffset = Range.charOffsetToSingleTuple(phrase.get("charOffset"))
+        phraseOffset = Range.getElementSingleTuple(phrase)
         phraseBegin = int(phrase.get("begin"))
         phraseEnd = int(phrase.get("end"))
         prevToken = None
         tokCount = 0
         for token in tokens[phraseBegin:phraseEnd+1]:
             if token.get("POS") == "IN" and prevToken != None:
-                newPhraseOffset = (phraseOffset[0], Range.charOffsetToSingleTuple(prevToken.get("charOffset"))[-1])
+                newPhraseOffset = (phraseOffset[0], Range.getElementSingleTuple(prevToken)[-1])
                 newPhrase = makePhrase(phrase.get("type") + "-IN",
                           newPhraseOffset, 
                           phraseBegin, 
@@ -140,12 +146,12 @@ def makeDETSubPhrases(phrases, tokens, phraseDict, filter=None):
     for phrase in phrases:
         if filter != None and phrase.get("type") not in filter:
             continue
-        phraseOffset = Range.charOffsetToSingleTuple(phrase.get("charOffset"))
+        phraseOffset = Range.getElementSingleTuple(phrase)
         phraseBegin = int(phrase.get("begin"))
         phraseEnd = int(phrase.get("end"))
         # Drop DT
         if phraseBegin > 0 and tokens[phraseBegin].get("POS") == "DT":
-            newPhraseOffset = (Range.charOffsetToSingleTuple(tokens[phraseBegin+1].get("charOffset"))[0], phraseOffset[1])
+            newPhraseOffset = (Range.getElementSingleTuple(tokens[phraseBegin+1])[0], phraseOffset[1])
             newPhrase = makePhrase("DT(-)-" + phrase.get("type"),
                       newPhraseOffset, 
                       phraseBegin + 1, 
@@ -156,7 +162,7 @@ def makeDETSubPhrases(phrases, tokens, phraseDict, filter=None):
                 phraseDict[newPhraseOffset] = [newPhrase]
         # Add DT
         if phraseBegin > 0 and tokens[phraseBegin-1].get("POS") == "DT":
-            newPhraseOffset = (Range.charOffsetToSingleTuple(tokens[phraseBegin-1].get("charOffset"))[0], phraseOffset[1])
+            newPhraseOffset = (Range.getElementSingleTuple(tokens[phraseBegin-1])[0], phraseOffset[1])
             newPhrase = makePhrase("DT(+)-" + phrase.get("type"),
                       newPhraseOffset, 
                       phraseBegin - 1, 
@@ -173,7 +179,7 @@ def makeTokenSubPhrases(tokens, phraseDict, includePOS=["NN", "PRP$", "IN", "WP$
         token = tokens[i]
         tokPOS = token.get("POS")
         if includePOS == None or tokPOS in includePOS:
-            tokOffset = Range.charOffsetToSingleTuple(token.get("charOffset"))
+            tokOffset = Range.getElementSingleTuple(token)
             if not phraseDict.has_key(tokOffset):
                 newPhrase = makePhrase("TOK-t" + tokPOS, tokOffset, i, i)
                 newPhrases.append(newPhrase)
@@ -205,36 +211,45 @@ def makePhrases(parse, tokenization, entities=None):
     #phraseOffsets = phraseDict.keys()
 
 def getMatchingPhrases(entity, phraseOffsets, phraseDict):
+    """
+    Keyword arguments:
+    phraseOffsets -- (RangeArrays.OffsetArray) the keys of phraseDict (see RangeArrays.fromSpans)
+    """
     matches = []
     if entity.get("isName") == "True":
         return []
-    maxOffset = Range.charOffsetToSingleTuple(entity.get("charOffset"))
+    maxOffset = Range.getElementSingleTuple(entity)
     minOffset = entity.get("altOffset")
     if minOffset != None:
         minOffset = Range.charOffsetToSingleTuple(minOffset)
     else:
         if entity.get("type") in ["Host", "HostPart", "Geographical", "Environmental", "Food", "Medical", "Soil", "Water"]:
-            minOffset = Range.charOffsetToSingleTuple(entity.get("headOffset"))
+            minOffset = Range.getElementSingleTuple(entity, "headOffset")
         else:
             minOffset = maxOffset
-    for phraseOffset in phraseOffsets:
-        if Range.contains(maxOffset, phraseOffset) and Range.contains(phraseOffset, minOffset):
-            matches.extend(phraseDict[phraseOffset])
+    if len(phraseOffsets) == 0:
+        return []
+    insideMax = RangeArrays.contains(maxOffset[0], maxOffset[1], phraseOffsets.begin, phraseOffsets.end)
+    containsMin = RangeArrays.contains(phraseOffsets.begin, phraseOffsets.end, minOffset[0], minOffset[1])
+    for i in range(len(phraseOffsets)):
+        if insideMax[i] and containsMin[i]:
+            matches.extend(phraseDict[phraseOffsets.elements[i]])
     return matches
 
 def selectBestMatch(entity, phrases):
-    entOffset = Range.charOffsetToSingleTuple(entity.get("charOffset"))
+    entOffset = Range.getElementSingleTuple(entity)
     if entity.get("altOffset") != None:
-        entOffset = Range.charOffsetToSingleTuple(entity.get("altOffset"))
+        entOffset = Range.getElementSingleTuple(entity, "altOffset")
+    phraseOffsets = RangeArrays.OffsetArray(phrases)
+    assert len(phraseOffsets.begin) == len(phrases)
     best = (sys.maxint, None)
-    for phrase in phrases:
-        matchValue = Range.mismatch(entOffset, Range.charOffsetToSingleTuple(phrase.get("charOffset")))
+    for matchValue, phrase in zip(RangeArrays.mismatch(entOffset[0], entOffset[1], phraseOffsets.begin, phraseOffsets.end), phrases):
         if best[0] > matchValue:
             best = (matchValue, phrase)
     return best[1]
 
 def getPhraseEntityMapping(entities, phraseDict):
-    phraseOffsets = phraseDict.keys()
+    phraseOffsets = RangeArrays.fromSpans(phraseDict.keys())
     phraseToEntity = {}
     for entity in entities:
         if entity.get("isName") == "True":
@@ -254,14 +269,10 @@ def getPhraseEntityMapping(entities, phraseDict):
 
 def getNECounts(phrases, entities):
     counts = {}
+    names = RangeArrays.OffsetArray([x for x in entities if x.get("isName") == "True"]) # only check names
     for phrase in phrases:
-        phraseOffset = Range.charOffsetToSingleTuple(phrase.get("charOffset"))
-        counts[phrase] = 0
-        for entity in entities:
-            if entity.get("isName") != "True": # only check names
-                continue
-            if Range.contains(phraseOffset, Range.charOffsetToSingleTuple(entity.get("charOffset"))):
-                counts[phrase] += 1
+        phraseOffset = Range.getElementSingleTuple(phrase)
+        counts[phrase] = len(names.getContained(phraseOffset[0], phraseOffset[1]))
     return counts
 
 def processCorpus(input, parserName):
@@ -308,12 +319,13 @@ def processCorpus(input, parserName):
     for document in documents:
         for sentence in document.findall("sentence"):
             entities = sentence.findall("entity")
-            parse = ETUtils.getElementByAttrib(sentence.find("sentenceanalyses"), "parse", {"parser":parserName})
+            analyses = ETUtils.ElementIndex([("parse", ("parser",)), ("tokenization", ("tokenizer",))], sentence.find("sentenceanalyses"))
+            parse = analyses.get("parse", ("parser",), (parserName,))
             if parse == None:
                 continue
-            tokenization = ETUtils.getElementByAttrib(sentence.find("sentenceanalyses"), "tokenization", {"tokenizer":parse.get("tokenizer")})
+            tokenization = analyses.get("tokenization", ("tokenizer",), (parse.get("tokenizer"),))
             phrases, phraseDict = makePhrases(parse, tokenization, entities)
-            phraseOffsets = phraseDict.keys()
+            phraseOffsets = RangeArrays.fromSpans(phraseDict.keys())
             #phraseOffsets.sort()
             phraseNECounts = getNECounts(phrases, entities)
             
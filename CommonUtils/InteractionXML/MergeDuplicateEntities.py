@@ -1,4 +1,5 @@
 import CorpusElements
+import SentenceElements
 import cElementTreeUtils as ETUtils
 from optparse import OptionParser
 import sys
@@ -19,12 +20,55 @@ def compareInteractions(interaction1, interaction2):
     else:
         return False
 
+def getEntityKey(entity):
+    return (entity.get("charOffset"), entity.get("type"))
+
+def getInteractionKey(interaction):
+    return (interaction.get("e1"), interaction.get("e2"), interaction.get("type"))
+
+def markDuplicates(elements, getKey, compare, isDuplicateOf):
+    """
+    Marks each element as a duplicate of the first element with the same key.
+    Elements are grouped by their key in a dictionary, so only elements that
+    are duplicates are compared with each other.
+    
+    Keyword arguments:
+    elements -- (list) elements of one sentence, in document order
+    getKey -- (function) returns the key of an element, used for grouping
+    compare -- (function) the comparison function corresponding to the key
+    isDuplicateOf -- (dictionary) id to the id of the retained element, updated
+    """
+    firstByKey = {}
+    for element in elements:
+        key = getKey(element)
+        if not firstByKey.has_key(key):
+            firstByKey[key] = element
+        else:
+            assert compare(firstByKey[key], element)
+            isDuplicateOf[element.attrib["id"]] = firstByKey[key].attrib["id"]
+
+def getElementsById(elements):
+    elementsById = {}
+    for element in elements:
+        # Like a linear search, return the first element with the id
+        if not elementsById.has_key(element.attrib["id"]):
+            elementsById[element.attrib["id"]] = element
+    return elementsById
+
 def mergeDuplicateEntities(corpusElements, debug=False):
     print >> sys.stderr, "Merging duplicate entities"
+    entitiesByType, duplicatesRemovedByType = mergeEntities(corpusElements.sentences, debug)
+    printStats(entitiesByType, duplicatesRemovedByType)
+
+def mergeEntities(sentences, debug=False):
+    """ Removes duplicate entities from a list of SentenceElements objects and
+    remaps their pairs and interactions. Returns the entity counts and the
+    removed duplicate counts by type.
+    """
     entitiesByType = {}
     duplicatesRemovedByType = {}
     globalEntityIsDuplicateOf = {}
-    for sentence in corpusElements.sentences:
+    for sentence in sentences:
         entityIsDuplicateOf = {}
         for k in sentence.entitiesById.keys():
             assert k not in entityIsDuplicateOf
@@ -33,11 +77,7 @@ def mergeDuplicateEntities(corpusElements, debug=False):
                 entitiesByType[sentence.entitiesById[k].attrib["type"]] = 0
             entitiesByType[sentence.entitiesById[k].attrib["type"]] += 1
         # Mark entities for removal
-        for i in range(len(sentence.entities)-1):
-            if entityIsDuplicateOf[sentence.entities[i].attrib["id"]] == None:
-                for j in range(i+1,len(sentence.entities)):
-                    if compareEntities(sentence.entities[i], sentence.entities[j]):
-                        entityIsDuplicateOf[sentence.entities[j].attrib["id"]] = sentence.entities[i].attrib["id"]                    
+        markDuplicates(sentence.entities, getEntityKey, compareEntities, entityIsDuplicateOf)
         # Remove entities from sentence element
         for k,v in entityIsDuplicateOf.iteritems():
             assert k not in globalEntityIsDuplicateOf, k
@@ -50,31 +90,31 @@ def mergeDuplicateEntities(corpusElements, debug=False):
                 sentence.sentence.remove(entityToRemove)
                 if debug: print "Removing Entity", k, "duplicate of", v
     # Remap pairs and interactions that used the removed entities
-    for sentence in corpusElements.sentences:
+    for sentence in sentences:
         for pair in sentence.pairs + sentence.interactions:
-#            if pair.get("id") == "GE.d1.s13.i56":
-#                print "BEFORE"
-#                print pair.get("e1"), globalEntityIsDuplicateOf[pair.get("e1")]
-#                print pair.get("e2"), globalEntityIsDuplicateOf[pair.get("e2")]
-            if globalEntityIsDuplicateOf[pair.attrib["e1"]] != None:
-                pair.attrib["e1"] = globalEntityIsDuplicateOf[pair.attrib["e1"]]
-                if debug: print "Remapping", pair.get("id"), "arg e1 from", pair.get("e1"), "to", globalEntityIsDuplicateOf[pair.get("e1")]
-            if globalEntityIsDuplicateOf[pair.attrib["e2"]] != None:
-                pair.attrib["e2"] = globalEntityIsDuplicateOf[pair.attrib["e2"]]
-                if debug: print "Remapping", pair.get("id"), "arg e2 from", pair.get("e2"), "to", globalEntityIsDuplicateOf[pair.get("e2")]
-#            if pair.get("id") == "GE.d1.s13.i56":
-#                print "AFTER"
-#                print pair.get("e1"), globalEntityIsDuplicateOf[pair.get("e1")]
-#                print pair.get("e2"), globalEntityIsDuplicateOf[pair.get("e2")]
-#                pair.set("Processed", "True")
-    
-    printStats(entitiesByType, duplicatesRemovedByType)
+            for attr in ["e1", "e2"]:
+                entityId = pair.attrib[attr]
+                if not globalEntityIsDuplicateOf.has_key(entityId):
+                    # Not one of the merged entities (f.e. in another document), so it can't be remapped
+                    print >> sys.stderr, "Warning,", pair.tag, pair.get("id"), "refers to entity", entityId, "outside the merged sentences, not remapped"
+                    continue
+                if globalEntityIsDuplicateOf[entityId] != None:
+                    pair.attrib[attr] = globalEntityIsDuplicateOf[entityId]
+                    if debug: print "Remapping", pair.get("id"), "arg", attr, "from", entityId, "to", pair.attrib[attr]
+    return entitiesByType, duplicatesRemovedByType
 
 def mergeDuplicateInteractions(corpusElements, debug=False):
     print >> sys.stderr, "Merging duplicate interactions"
+    interactionsByType, duplicatesRemovedByType = mergeInteractions(corpusElements.sentences, debug)
+    printStats(interactionsByType, duplicatesRemovedByType)
+
+def mergeInteractions(sentences, debug=False):
+    """ Removes duplicate pairs and interactions from a list of SentenceElements
+    objects. Returns the counts and the removed duplicate counts by type.
+    """
     interactionsByType = {}
     duplicatesRemovedByType = {}
-    for sentence in corpusElements.sentences:
+    for sentence in sentences:
         interactions = sentence.pairs + sentence.interactions
         interactionIsDuplicateOf = {}
         for interaction in interactions:
@@ -83,33 +123,41 @@ def mergeDuplicateInteractions(corpusElements, debug=False):
                 interactionsByType[interaction.attrib["type"]] = 0
             interactionsByType[interaction.attrib["type"]] += 1
         # Mark entities for removal
-        for i in range(len(interactions)-1):
-            if interactionIsDuplicateOf[interactions[i].attrib["id"]] == None:
-                for j in range(i+1,len(interactions)):
-                    if compareInteractions(interactions[i], interactions[j]):
-                        interactionIsDuplicateOf[interactions[j].attrib["id"]] = interactions[i].attrib["id"]                    
+        markDuplicates(interactions, getInteractionKey, compareInteractions, interactionIsDuplicateOf)
         # Remove entities from sentence element
+        pairsById = getElementsById(sentence.pairs)
+        interactionsById = getElementsById(sentence.interactions)
         for k,v in interactionIsDuplicateOf.iteritems():
             if v != None:
                 elementToRemove = None
                 if k.rsplit(".",1)[-1][0] == "p":
-                    for pair in sentence.pairs:
-                        if pair.attrib["id"] == k:
-                            elementToRemove = pair
-                            break
+                    elementToRemove = pairsById.get(k)
                 elif k.rsplit(".",1)[-1][0] == "i":
-                    for interaction in sentence.interactions:
-                        if interaction.attrib["id"] == k:
-                            elementToRemove = interaction
-                            break
+                    elementToRemove = interactionsById.get(k)
 
                 if not duplicatesRemovedByType.has_key(elementToRemove.attrib["type"]):
                     duplicatesRemovedByType[elementToRemove.attrib["type"]] = 0
                 duplicatesRemovedByType[elementToRemove.attrib["type"]] += 1
                 sentence.sentence.remove(elementToRemove)
                 if debug: print "Removing Interaction", k, "duplicate of", v
+    return interactionsByType, duplicatesRemovedByType
+
+def processDocument(document, debug=False):
+    """ Merges duplicates within a document. Pairs and interactions referring
+    to entities outside the document are not remapped (with a warning).
     
-    printStats(interactionsByType, duplicatesRemovedByType)
+    Returns:
+    A dictionary of [removed, original] counts by element and type
+    """
+    sentences = []
+    for sentenceElement in document.findall("sentence"):
+        sentences.append(SentenceElements.SentenceElements(sentenceElement, removeIntersentenceInteractions=False))
+    counts = {}
+    for name, merge in [("entity", mergeEntities), ("interaction", mergeInteractions)]:
+        origItemsByType, duplicatesRemovedByType = merge(sentences, debug)
+        for key in origItemsByType:
+            counts[name + " " + key] = [duplicatesRemovedByType.get(key, 0), origItemsByType[key]]
+    return counts
 
 def printStats(origItemsByType, duplicatesRemovedByType):    
     print >> sys.stderr, "Removed duplicates (original count in parenthesis):"
@@ -9,6 +9,57 @@ import sys
 import CorpusElements
 from optparse import OptionParser
 
+def mergeParse(input, output, parse1Name, parse2Name, name):
+    """
+    Combine the dependencies of two parses with the same tokenization into
+    a new parse. The corpus is processed one document at a time.
+    """
+    print >> sys.stderr, "Loading input file", input
+    inputStream = ETUtils.ElementStream(input, "document")
+    print >> sys.stderr, "Writing output to", output
+    writer = ETUtils.ElementWriter(output, inputStream.root)
+    try:
+        for document in inputStream:
+            for sentence in document.getiterator("sentence"):
+                targetAnalysesElement = sentence.find("sentenceanalyses")
+                assert(targetAnalysesElement != None)
+                targetParsesElement = targetAnalysesElement.find("parses")
+                assert(targetParsesElement != None)
+                # Check whether parse already exists
+                targetParseElements = targetParsesElement.findall("parse")
+                parse1 = None
+                parse2 = None
+                for parseElement in targetParseElements:
+                    if parseElement.attrib["parser"] == parse1Name:
+                        parse1 = parseElement
+                    elif parseElement.attrib["parser"] == parse2Name:
+                        parse2 = parseElement
+                assert(parse1 != parse2 and parse1 != None and parse2 != None)
+
+                targetTokenizationsElement = targetAnalysesElement.find("tokenizations")
+                assert(targetTokenizationsElement != None)
+                tokenization1 = None
+                tokenization2 = None
+                for tokenizationElement in targetTokenizationsElement.findall("tokenization"):
+                    if tokenizationElement.attrib["tokenizer"] == parse1.attrib["tokenizer"]:
+                        tokenization1 = tokenizationElement
+                    if tokenizationElement.attrib["tokenizer"] == parse2.attrib["tokenizer"]:
+                        tokenization2 = tokenizationElement
+                assert(tokenization1 == tokenization2 and tokenization1 != None and tokenization2 != None)
+                newParse = ET.Element("parse")
+                newParse.attrib["parser"] = name
+                newParse.attrib["tokenizer"] = tokenization1.attrib["tokenizer"]
+                for dependency in parse1.findall("dependency"):
+                    newParse.append(dependency)
+                for dependency in parse2.findall("dependency"):
+                    newParse.append(dependency)
+                targetParsesElement.append(newParse)
+            writer.write(document)
+    except:
+        writer.abort()
+        raise
+    writer.close()
+
 if __name__=="__main__":
     print >> sys.stderr, "##### Merge Parse #####"
     # Import Psyco if available
@@ -29,46 +80,4 @@ if __name__=="__main__":
     assert(options.input != None)
     assert(options.output != None)
     
-    print >> sys.stderr, "Loading input file", options.input
-    inputRoot = ET.parse(options.input).getroot()
-    for sentence in inputRoot.getiterator("sentence"):
-        targetAnalysesElement = sentence.find("sentenceanalyses")
-        assert(targetAnalysesElement != None)
-        targetParsesElement = targetAnalysesElement.find("parses")
-        assert(targetParsesElement != None)
-        # Check whether parse already exists
-        targetParseElements = targetParsesElement.findall("parse")
-        parse1 = None
-        parse2 = None
-        for parseElement in targetParseElements:
-            if parseElement.attrib["parser"] == options.parse1:
-                parse1 = parseElement
-            elif parseElement.attrib["parser"] == options.parse2:
-                parse2 = parseElement
-        assert(parse1 != parse2 and parse1 != None and parse2 != None)
-
-        targetTokenizationsElement = targetAnalysesElement.find("tokenizations")
-        assert(targetTokenizationsElement != None)
-        tokenization1 = None
-        tokenization2 = None
-        for tokenizationElement in targetTokenizationsElement.findall("tokenization"):
-            if tokenizationElement.attrib["tokenizer"] == parse1.attrib["tokenizer"]:
-                tokenization1 = tokenizationElement
-            if tokenizationElement.attrib["tokenizer"] == parse2.attrib["tokenizer"]:
-                tokenization2 = tokenizationElement
-        assert(tokenization1 == tokenization2 and tokenization1 != None and tokenization2 != None)
-#        if tokenization1 != tokenization2:
-#            tokens1 = tokenization1.findall("token")
-#            tokens2 = tokenization1.findall("token")
-#            assert(len(tokens1) == len(tokens2))
-#            for i in range(len(tokens1)):
-        newParse = ET.Element("parse")
-        newParse.attrib["parser"] = options.name
-        newParse.attrib["tokenizer"] = tokenization1.attrib["tokenizer"]
-        for dependency in parse1.findall("dependency"):
-            newParse.append(dependency)
-        for dependency in parse2.findall("dependency"):
-            newParse.append(dependency)
-        targetParsesElement.append(newParse)
-    print >> sys.stderr, "Writing output to", options.output
-    ETUtils.write(inputRoot, options.output)
\ No newline at end of file
+    mergeParse(options.input, options.output, options.parse1, options.parse2, options.name)
@@ -5,9 +5,23 @@ except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
 import RecalculateIds
+import RouteDocuments
 
 def mixSets(input, output, docOrigIds, sourceSet, targetSet):
     print >> sys.stderr, "Mixing Sets", input
+    if output != None and docOrigIds != None:
+        # Move the documents one at a time
+        docOrigIds = set(docOrigIds)
+        def route(document, inputIndex):
+            if document.get("pmid") in docOrigIds:
+                assert document.get("set") == sourceSet
+                document.set("set", targetSet)
+                docOrigIds.remove(document.get("pmid"))
+            return ["output"]
+        RouteDocuments.routeDocuments([input], route, {"output":output})
+        assert len(docOrigIds) == 0, docOrigIds
+        return None
+    
     corpusTree = ETUtils.ETFromObj(input)
     corpusRoot = corpusTree.getroot()
     
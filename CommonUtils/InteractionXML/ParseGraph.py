@@ -17,6 +17,7 @@
 
 import Stemming.PorterStemmer as stemmer
 import Range
+from SpanIndex import SpanIndex
 import sys
         
 class ParseGraphNode:
@@ -74,8 +75,7 @@ class ParseGraph:
             node.id = int(tokenElement.attrib["id"].split("_")[1])
             node.pos = tokenElement.attrib["POS"]
             node.text = tokenElement.attrib["text"]
-            charFrom, charTo = tokenElement.attrib["charOffset"].split("-")
-            node.charOffset = (int(charFrom), int(charTo))
+            node.charOffset = Range.getElementSingleTuple(tokenElement)
             tokensById[node.id] = node
     
         #self.depByOrder = []
@@ -120,19 +120,20 @@ class ParseGraph:
     def markNamedEntities(self, entityElements):
         """ Marks tokens belonging to named entities
         """
+        tokenIndex = SpanIndex()
+        for token in self.tokensById.itervalues():
+            tokenIndex.add(token.charOffset, token)
         namedEntityTokens = []
         for entityElement in entityElements:
-            offsets = []
-            offsetStrings = entityElement.attrib["charOffset"].split(",")
-            for offsetString in offsetStrings:
-                charFrom, charTo = offsetString.split("-")
-                offset = (int(charFrom), int(charTo))
-                offsets.append(offset)
-            for k,v in self.tokensById.iteritems():
-                for offset in offsets:
-                    if Range.overlap(offset, v.charOffset):
-                        v.entities.append(entityElement.attrib["id"])
-                        namedEntityTokens.append(v.id)
+            # Item numbers follow the order of tokensById
+            matches = []
+            for offset in Range.getElementTuples(entityElement):
+                matches.extend(tokenIndex.findOverlapping(offset))
+            matches.sort()
+            for match in matches:
+                v = tokenIndex.values[match]
+                v.entities.append(entityElement.attrib["id"])
+                namedEntityTokens.append(v.id)
         return namedEntityTokens
 
     def getNamedEntityTokenIds(self, namedEntityIds):
@@ -3,17 +3,34 @@ try:
 except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
-import sys
-import CorpusElements
+import sys, time
+import MapCorpus
 from optparse import OptionParser
 from collections import defaultdict
 
-def parseStats(input):
-    print >> sys.stderr, "Loading input file", input
-    inputTree = ETUtils.ETFromObj(input)
-    inputRoot = inputTree.getroot()
-    counts = defaultdict(int)
-    for sentence in inputRoot.getiterator("sentence"):
+# Registered counters by name
+counters = {}
+counterNames = []
+
+def registerCounter(name, function, description=None):
+    """ Register a function for counting statistics
+    
+    Keyword arguments:
+    name -- (string) name of the counter
+    function -- (function) called with a document element and a
+                defaultdict(int) to which it adds its counts
+    description -- (string) shown in the list of counters
+    """
+    if name not in counters:
+        counterNames.append(name)
+    counters[name] = (function, description)
+
+def hasChild(element, tag):
+    """ Stops at the first matching child instead of finding all of them """
+    return element.find(tag) != None
+
+def countParses(document, counts):
+    for sentence in document.getiterator("sentence"):
         counts["sentence"] += 1
         analysesElement = sentence.find("sentenceanalyses")
         if analysesElement == None:
@@ -30,9 +47,9 @@ def parseStats(input):
             counts["parse:"+parserName] += 1
             if parseElement.get("pennstring") in ["", None]:
                 counts["parse:"+parserName+"(no penn)"] += 1
-            if len(parseElement.findall("dependency")) == 0:
+            if not hasChild(parseElement, "dependency"):
                 counts["parse:"+parserName+"(no dependencies)"] += 1
-            if len(parseElement.findall("phrase")) == 0:
+            if not hasChild(parseElement, "phrase"):
                 counts["parse:"+parserName+"(no phrases)"] += 1
         # Tokenizations
         tokenizationsElement = analysesElement.find("tokenizations")
@@ -43,12 +60,146 @@ def parseStats(input):
         for tokenizationElement in tokenizationsElement:
             tokenizerName = tokenizationElement.get("tokenizer")
             counts["tokenization:"+tokenizerName] += 1
-            if len(tokenizationElement.findall("token")) == 0:
+            if not hasChild(tokenizationElement, "token"):
                 counts["tokenization:"+tokenizerName+"(no tokens)"] += 1
+
+# Argument types of the relations, as in STFormat.ConvertXML.toSTFormat
+relationArgumentTypes = {"Protein-Component":("Arg1", "Arg2"),
+                         "Subunit-Complex":("Arg1", "Arg2"),
+                         "Renaming":("Former", "New"),
+                         "Coref":("Anaphora", "Antecedent")}
+
+def getRelationArgumentTypes(interactionType):
+    if interactionType.startswith("SR-"):
+        return ("Arg1", "Arg2")
+    return relationArgumentTypes.get(interactionType)
+
+def getSTArgumentType(interactionType):
+    if interactionType == "SiteArg": # convert back to actual sites
+        return "Site"
+    return interactionType
+
+def getAnnotationKey(entity):
+    """ Entities with the same key are one annotation in the shared task format """
+    if entity.get("isName") == "True":
+        return entity.get("id")
+    return (entity.get("id").split(".e", 1)[0], entity.get("charOffset"), entity.get("text"), entity.get("type"))
+
+def countAnnotations(document, counts):
+    """
+    Counts the same categories as STFormat.Compare.getCounts, for the
+    shared task annotation STFormat.ConvertXML.toSTFormat would convert
+    the document into. Named entities are proteins, and other entities
+    with the same span, text and type are one trigger. An event is the
+    non-name entity its argument interactions start from, or a triggerless
+    event interaction (type "Event(Arg1/Arg2)"). Speculation and negation
+    are counted per event.
+    """
+    counts["task3(spec)"] += 0
+    counts["task3(neg)"] += 0
+    entities = {}
+    triggerKeys = set()
+    events = set()
+    for entity in document.getiterator("entity"):
+        eType = entity.get("type")
+        if eType == "neg":
+            continue
+        entities[entity.get("id")] = entity
+        if entity.get("isName") == "True":
+            counts["protein("+eType+")"] += 1
+            counts["protein"] += 1
+            continue
+        key = getAnnotationKey(entity)
+        if key not in triggerKeys:
+            triggerKeys.add(key)
+            counts["trigger("+eType+")"] += 1
+            counts["trigger"] += 1
+        if eType == "Process": # these can have 0 interactions
+            events.add(entity.get("id"))
+    # Coref relations have the proteins linked to their antecedent as arguments
+    corefTargets = defaultdict(set)
+    for interaction in document.getiterator("interaction"):
+        if interaction.get("type") == "Target" and entities.has_key(interaction.get("e2")):
+            corefTargets[interaction.get("e1")].add(getAnnotationKey(entities[interaction.get("e2")]))
+    for interaction in document.getiterator("interaction"):
+        iType = interaction.get("type")
+        if iType in ["neg", "Target", "Site"]: # sites are not counted as arguments
+            continue
+        argTypes = None
+        if "/" in iType and "(" in iType: # triggerless event
+            iType, argTypes = iType.split("(")
+            argTypes = [getSTArgumentType(x) for x in argTypes[:-1].split("/")]
+            counts["event("+iType+")"] += 1
+            counts["event"] += 1
+        elif getRelationArgumentTypes(iType) != None:
+            argTypes = list(getRelationArgumentTypes(iType))
+            if iType == "Coref":
+                argTypes += ["Target"] * len(corefTargets.get(interaction.get("e2"), []))
+            counts["relation("+iType+")"] += 1
+            counts["relation"] += 1
+        else:
+            e1 = entities.get(interaction.get("e1"))
+            if e1 == None or e1.get("type") == "Entity": # "Entity"-type entities are never event roots
+                continue
+            events.add(e1.get("id"))
+            argTypes = [getSTArgumentType(iType)]
+        for argType in argTypes:
+            counts["arg("+argType+")"] += 1
+            counts["arg"] += 1
+    for eventId in events:
+        trigger = entities[eventId]
+        counts["event("+trigger.get("type")+")"] += 1
+        counts["event"] += 1
+        if trigger.get("speculation") == "True":
+            counts["task3(spec)"] += 1
+        if trigger.get("negation") == "True":
+            counts["task3(neg)"] += 1
+
+registerCounter("parse", countParses, "Parses and tokenizations of the sentences")
+registerCounter("annotation", countAnnotations, "Shared task annotation, as in STFormat.Compare")
+
+def countDocument(document, names):
+    counts = defaultdict(int)
+    counts["document"] += 1
+    for name in names:
+        counters[name][0](document, counts)
+    return dict(counts)
+
+def corpusStats(input, names=["parse"], workers=1, chunkSize=50):
+    """
+    Count statistics over a corpus, one document at a time. The counts of
+    the documents are summed, so the documents can be counted in parallel.
+    
+    Keyword arguments:
+    input -- (string) corpus file name
+    names -- (list) names of registered counters
+    workers -- (int) number of processes (see MapCorpus.mapCorpus)
+    chunkSize -- (int) number of documents sent to a process at a time
+    
+    Returns:
+    A defaultdict of the counts
+    """
+    for name in names:
+        if not counters.has_key(name):
+            raise Exception("Unknown counter " + str(name) + ", registered counters are " + ", ".join(counterNames))
+    print >> sys.stderr, "Counting", ", ".join(names), "statistics for", input
+    startTime = time.time()
+    counts = MapCorpus.mapCorpus(input, None, countDocument, (names,), workers, chunkSize)
+    elapsed = time.time() - startTime
+    counts = defaultdict(int, counts)
+    if elapsed > 0:
+        sentenceCount = counts.get("sentence", 0)
+        print >> sys.stderr, "Counted", counts["document"], "documents and", sentenceCount, "sentences in %.2f s (%.1f documents/s, %.1f sentences/s)" % (elapsed, counts["document"] / elapsed, sentenceCount / elapsed)
+    return counts
+
+def parseStats(input, workers=1):
+    counts = corpusStats(input, ["parse"], workers)
+    del counts["document"]
     
     print >> sys.stderr, "Parse statistics for", input
     for key in sorted(counts.keys()):
         print >> sys.stderr, " ", key + ":", counts[key]
+    return counts
         
 if __name__=="__main__":
     print >> sys.stderr, "##### Parse Statistics #####"
@@ -62,6 +213,19 @@ if __name__=="__main__":
 
     optparser = OptionParser(usage="%prog [options]\nCreate an html visualization for a corpus.")
     optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in analysis format", metavar="FILE")
+    optparser.add_option("-c", "--counters", default=None, dest="counters", help="Comma-separated list of counters. If not defined, parse statistics are shown.")
+    optparser.add_option("-w", "--workers", type="int", default=1, dest="workers", help="Number of processes (0 for one per core).")
+    optparser.add_option("-l", "--list", default=False, action="store_true", dest="list", help="List the registered counters.")
     (options, args) = optparser.parse_args()
+    if options.list:
+        for name in counterNames:
+            print name + ":", counters[name][1]
+        sys.exit(0)
     assert(options.input != None)
-    parseStats(options.input)
\ No newline at end of file
+    if options.counters == None:
+        parseStats(options.input, options.workers)
+    else:
+        counts = corpusStats(options.input, options.counters.split(","), options.workers)
+        print >> sys.stderr, "Statistics for", options.input
+        for key in sorted(counts.keys()):
+            print >> sys.stderr, " ", key + ":", counts[key]
\ No newline at end of file
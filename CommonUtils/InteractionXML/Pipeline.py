@@ -0,0 +1,189 @@
+"""
+Run several InteractionXML tools on a corpus in a single pass.
+
+  Description: Each document of the corpus is read once, passed through all
+  stages of the pipeline in memory, and written once, instead of each tool
+  reading and writing the whole corpus. The stages are the per-document
+  functions of the InteractionXML tools, registered by name. Documents can
+  be processed in parallel (see MapCorpus).
+
+  The tools registered as stages run their stage through processCorpus,
+  so a tool gives the same result alone and as a part of a pipeline.
+
+  Example:
+  Pipeline.py -i input.xml.gz -o output.xml.gz -s mergeDuplicates -s splitMerged
+      -s 'deleteElements {"pair":{}}' -s recalculateIds
+"""
+import sys
+import ast
+import cElementTreeUtils as ETUtils
+import MapCorpus
+
+# Registered stages by name
+stages = {}
+stageNames = []
+stageFunctions = {}
+
+def registerStage(name, module, function, passIndex=False, description=None):
+    """ Register a document processing function as a pipeline stage
+
+    The function is called with a document element and the arguments of
+    the stage, and may return a dictionary of counts. It is imported when
+    the stage is first used, so modules with dependencies that are not
+    installed can be registered.
+
+    Keyword arguments:
+    name -- (string) name of the stage
+    module -- (string) name of the module defining the function
+    function -- (string) name of the function
+    passIndex -- (boolean) also pass the index of the document and the
+                 corpus name (after the document), e.g. for recalculating ids
+    description -- (string) shown in the list of stages
+    """
+    if name not in stages:
+        stageNames.append(name)
+    stages[name] = (module, function, passIndex, description)
+
+registerStage("mergeDuplicates", "MergeDuplicateEntities", "processDocument", description="Merge duplicate entities and interactions (MergeDuplicateEntities)")
+registerStage("splitMerged", "SplitMergedElements", "processDocument", description="Split elements with merged types (SplitMergedElements)")
+registerStage("deleteElements", "DeleteElements", "processDocument", description="Delete elements, argument is a dictionary of rules (DeleteElements)")
+registerStage("recalculateIds", "RecalculateIds", "recalculateDocumentIds", True, description="Recalculate hierarchical ids (RecalculateIds)")
+registerStage("negateEvents", "ResolveEPITriggerTypes", "negateDocument", description="Resolve negated EPI trigger types (ResolveEPITriggerTypes)")
+registerStage("extendTriggers", "ExtendTriggers", "extendDocument", description="Extend bacterium triggers (ExtendTriggers)")
+registerStage("removeUnconnected", "RemoveUnconnectedEntities", "processDocument", description="Remove entities with no interactions (RemoveUnconnectedEntities)")
+
+def getStageFunction(name):
+    if not stageFunctions.has_key(name):
+        module, function = stages[name][0], stages[name][1]
+        stageFunctions[name] = getattr(__import__(module), function)
+    return stageFunctions[name]
+
+def parseStage(stage):
+    """ Parse a stage definition "name" or "name arguments", where the
+    arguments are a python literal (see ast.literal_eval). A tuple is
+    passed as multiple arguments, anything else as a single argument.
+    """
+    if isinstance(stage, tuple):
+        return stage
+    stage = stage.strip().split(None, 1)
+    if len(stage) == 1:
+        return (stage[0], ())
+    args = ast.literal_eval(stage[1])
+    if not isinstance(args, tuple):
+        args = (args,)
+    return (stage[0], args)
+
+def runStage(name, args, document, docIndex, corpusName):
+    if stages[name][2]:
+        return getStageFunction(name)(document, docIndex, corpusName, *args)
+    else:
+        return getStageFunction(name)(document, *args)
+
+def processDocument(document, docIndex, corpusName, pipeline):
+    """ Pass a document through all stages of a pipeline. The counts of
+    a stage used more than once are summed.
+    """
+    counts = {}
+    for name, args in pipeline:
+        result = runStage(name, args, document, docIndex, corpusName)
+        if result != None:
+            MapCorpus.addCounts(counts, dict([(name + ": " + str(key), value) for key, value in result.iteritems()]))
+    return counts
+
+def checkStage(name):
+    if not stages.has_key(name):
+        raise Exception("Unknown pipeline stage " + str(name) + ", registered stages are " + ", ".join(stageNames))
+
+def processCorpus(input, output, name, args=(), workers=None):
+    """ Run one stage on a corpus, as the tool of the stage does
+
+    With workers, a corpus file is processed one document at a time with
+    MapCorpus.mapCorpus and written to the output file. Otherwise (or if
+    there is no output file) the corpus is loaded and processed in memory.
+
+    Keyword arguments:
+    input -- (string) corpus file name, or (ElementTree) corpus
+    output -- (string) output file name, or None
+    name -- (string) name of a registered stage
+    args -- (tuple) arguments of the stage
+    workers -- (int) number of processes (see MapCorpus.mapCorpus), or
+               None to process the corpus in memory
+
+    Returns:
+    A tuple of the processed corpus tree (None if the documents were
+    only written to the output file) and the summed counts of the stage
+    """
+    checkStage(name)
+    if workers != None and MapCorpus.canMap(input, output):
+        return None, MapCorpus.mapCorpus(input, output, getStageFunction(name), args, workers, passIndex=stages[name][2])
+    print >> sys.stderr, "Loading corpus", input
+    corpusTree = ETUtils.ETFromObj(input)
+    corpusRoot = corpusTree.getroot()
+    counts = {}
+    docIndex = 0
+    for document in corpusRoot.findall("document"):
+        MapCorpus.addCounts(counts, runStage(name, args, document, docIndex, corpusRoot.get("source")))
+        docIndex += 1
+    if output != None:
+        print >> sys.stderr, "Writing output to", output
+        ETUtils.write(corpusRoot, output)
+    return corpusTree, counts
+
+def runPipeline(input, output, pipeline, workers=1, chunkSize=50, compact=False):
+    """ Run a pipeline of stages on a corpus
+
+    Keyword arguments:
+    input -- (string) corpus file name
+    output -- (string) output file name
+    pipeline -- (list) stage definitions, either strings (see parseStage)
+                or (name, argument tuple) pairs
+    workers -- (int) number of processes (see MapCorpus.mapCorpus)
+    chunkSize -- (int) number of documents sent to a process at a time
+    compact -- (boolean) write the output without indentation
+
+    Returns:
+    The counts returned by the stages, as "stage: key" -> value
+    """
+    print >> sys.stderr, "##### InteractionXML pipeline #####"
+    pipeline = [parseStage(x) for x in pipeline]
+    for name, args in pipeline:
+        checkStage(name)
+        print >> sys.stderr, "Stage", name, args
+    counts = MapCorpus.mapCorpus(input, output, processDocument, (pipeline,), workers, chunkSize, compact=compact, passIndex=True)
+    print >> sys.stderr, "Results"
+    for key in sorted(counts.keys()):
+        print >> sys.stderr, "  " + key + ":", counts[key]
+    return counts
+
+if __name__=="__main__":
+    from optparse import OptionParser
+    # Import Psyco if available
+    try:
+        import psyco
+        psyco.full()
+        print >> sys.stderr, "Found Psyco, using"
+    except ImportError:
+        print >> sys.stderr, "Psyco not installed"
+
+    optparser = OptionParser(usage="%prog [options]\nRun InteractionXML tools on a corpus in a single pass.")
+    optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
+    optparser.add_option("-o", "--output", default=None, dest="output", help="Output file in interaction xml format.")
+    optparser.add_option("-s", "--stage", default=[], action="append", dest="stages", help="A stage name optionally followed by its arguments as a python literal. Can be given multiple times, stages are run in the given order.")
+    optparser.add_option("-w", "--workers", type="int", default=1, dest="workers", help="Number of processes (0 for one per core).")
+    optparser.add_option("-l", "--list", default=False, action="store_true", dest="list", help="List the registered stages.")
+    (options, args) = optparser.parse_args()
+
+    if options.list:
+        for name in stageNames:
+            print name + ":", stages[name][3]
+        sys.exit(0)
+    if options.input == None:
+        print >> sys.stderr, "Error, input file not defined."
+        optparser.print_help()
+        sys.exit(1)
+    if options.output == None:
+        print >> sys.stderr, "Error, output file not defined."
+        optparser.print_help()
+        sys.exit(1)
+
+    runPipeline(options.input, options.output, options.stages, options.workers)
@@ -5,6 +5,67 @@ except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
 
+def recalculateEntityIds(document, corpusName, docIndex, onlyWithinSentence, entDictionary):
+    """ Recalculate ids for a document and its sentences and entities,
+    storing the new entity ids in entDictionary (old id -> new id)
+    """
+    if not onlyWithinSentence:
+        document.attrib["id"] = corpusName + ".d" + str(docIndex)
+    sentIndex = 0
+    sentences = document.findall("sentence")
+    for sentence in sentences:
+        if not onlyWithinSentence:
+            sentence.attrib["id"] = corpusName + ".d" + str(docIndex) + ".s" + str(sentIndex)
+        entIndex = 0
+        entities = sentence.findall("entity")
+        for entity in entities:
+            if not onlyWithinSentence:
+                entNewId = corpusName + ".d" + str(docIndex) + ".s" + str(sentIndex) + ".e" + str(entIndex)
+            else:
+                entNewId = sentence.attrib["id"] + ".e" + str(entIndex)
+            assert not entDictionary.has_key(entity.attrib["id"]),entity.get("id")
+            entDictionary[entity.attrib["id"]] = entNewId
+            entity.attrib["id"] = entNewId
+            entIndex += 1
+        sentIndex += 1
+
+def recalculateInteractionIds(document, corpusName, docIndex, onlyWithinSentence, entDictionary):
+    """ Recalculate ids for the pairs and interactions of a document
+    and map their endpoints to the new entity ids
+    """
+    sentences = document.findall("sentence")
+    sentIndex = 0
+    for sentence in sentences:
+        interactions = sentence.findall("interaction")
+        intIndex = 0
+        for interaction in interactions:
+            if onlyWithinSentence:
+                interaction.attrib["id"] = sentence.attrib["id"] + ".i" + str(intIndex)
+            else:
+                interaction.attrib["id"] = corpusName + ".d" + str(docIndex) + ".s" + str(sentIndex) + ".i" + str(intIndex)
+            interaction.attrib["e1"] = entDictionary[interaction.attrib["e1"]]
+            interaction.attrib["e2"] = entDictionary[interaction.attrib["e2"]]
+            intIndex += 1
+        pairs = sentence.findall("pair")
+        pairIndex = 0
+        for pair in pairs:
+            if onlyWithinSentence:
+                pair.attrib["id"] = sentence.attrib["id"] + ".p" + str(pairIndex)
+            else:
+                pair.attrib["id"] = corpusName + ".d" + str(docIndex) + ".s" + str(sentIndex) + ".p" + str(pairIndex)
+            pair.attrib["e1"] = entDictionary[pair.attrib["e1"]]
+            pair.attrib["e2"] = entDictionary[pair.attrib["e2"]]
+            pairIndex += 1
+        sentIndex += 1
+
+def recalculateDocumentIds(document, docIndex, corpusName, onlyWithinSentence=False):
+    """ Recalculate all ids of a document. Pairs and interactions may only
+    refer to entities in the same document.
+    """
+    entDictionary = {}
+    recalculateEntityIds(document, corpusName, docIndex, onlyWithinSentence, entDictionary)
+    recalculateInteractionIds(document, corpusName, docIndex, onlyWithinSentence, entDictionary)
+
 def recalculateIds(input, output=None, onlyWithinSentence=False, docIndexStart=0):
     print >> sys.stderr, "##### Recalculate hierarchical interaction XML ids #####"
     print >> sys.stderr, "Loading corpus", input
@@ -20,53 +81,12 @@ def recalculateIds(input, output=None, onlyWithinSentence=False, docIndexStart=0
     entDictionary = {}
     docIndex = docIndexStart
     for document in documents:
-        if not onlyWithinSentence:
-            document.attrib["id"] = corpusName + ".d" + str(docIndex)
-        sentIndex = 0
-        sentences = document.findall("sentence")
-        for sentence in sentences:
-            if not onlyWithinSentence:
-                sentence.attrib["id"] = corpusName + ".d" + str(docIndex) + ".s" + str(sentIndex)
-            entIndex = 0
-            entities = sentence.findall("entity")
-            for entity in entities:
-                if not onlyWithinSentence:
-                    entNewId = corpusName + ".d" + str(docIndex) + ".s" + str(sentIndex) + ".e" + str(entIndex)
-                else:
-                    entNewId = sentence.attrib["id"] + ".e" + str(entIndex)
-                assert not entDictionary.has_key(entity.attrib["id"]),entity.get("id")
-                entDictionary[entity.attrib["id"]] = entNewId
-                entity.attrib["id"] = entNewId
-                entIndex += 1
-            sentIndex += 1
+        recalculateEntityIds(document, corpusName, docIndex, onlyWithinSentence, entDictionary)
         docIndex += 1
     # Recalculate ids for pairs and interactions
     docIndex = docIndexStart
     for document in documents:
-        sentences = document.findall("sentence")
-        sentIndex = 0
-        for sentence in sentences:
-            interactions = sentence.findall("interaction")
-            intIndex = 0
-            for interaction in interactions:
-                if onlyWithinSentence:
-                    interaction.attrib["id"] = sentence.attrib["id"] + ".i" + str(intIndex)
-                else:
-                    interaction.attrib["id"] = corpusName + ".d" + str(docIndex) + ".s" + str(sentIndex) + ".i" + str(intIndex)
-                interaction.attrib["e1"] = entDictionary[interaction.attrib["e1"]]
-                interaction.attrib["e2"] = entDictionary[interaction.attrib["e2"]]
-                intIndex += 1
-            pairs = sentence.findall("pair")
-            pairIndex = 0
-            for pair in pairs:
-                if onlyWithinSentence:
-                    pair.attrib["id"] = sentence.attrib["id"] + ".p" + str(pairIndex)
-                else:
-                    pair.attrib["id"] = corpusName + ".d" + str(docIndex) + ".s" + str(sentIndex) + ".p" + str(pairIndex)
-                pair.attrib["e1"] = entDictionary[pair.attrib["e1"]]
-                pair.attrib["e2"] = entDictionary[pair.attrib["e2"]]
-                pairIndex += 1
-            sentIndex += 1
+        recalculateInteractionIds(document, corpusName, docIndex, onlyWithinSentence, entDictionary)
         docIndex += 1
     
     if output != None:
@@ -74,6 +94,51 @@ def recalculateIds(input, output=None, onlyWithinSentence=False, docIndexStart=0
         ETUtils.write(corpusRoot, output)
     return corpusTree
 
+def recalculateIdsStreaming(input, output, onlyWithinSentence=False, docIndexStart=0, corpusName=None):
+    """ Recalculate ids one document at a time
+    
+    Each document is renumbered as it is read and written out
+    immediately, so only one document is kept in memory. Unlike
+    recalculateIds, pairs and interactions may only refer to entities
+    in their own document.
+    
+    Keyword arguments:
+    input -- (string) corpus file name
+    output -- (string) output file name, or an open ETUtils.ElementWriter
+              to which the documents are added (it is not closed). After
+              an error, an existing output file is left as it was.
+    onlyWithinSentence -- (boolean) only recalculate within sentences
+    docIndexStart -- (int) index of the first document
+    corpusName -- (string) corpus name used in the ids. If None, the
+                  source attribute of the input corpus is used.
+    
+    Returns:
+    The number of documents processed
+    """
+    print >> sys.stderr, "##### Recalculate hierarchical interaction XML ids (streaming) #####"
+    print >> sys.stderr, "Reading corpus", input
+    stream = ETUtils.ElementStream(input, "document")
+    if corpusName == None:
+        corpusName = stream.root.attrib["source"]
+    if isinstance(output, ETUtils.ElementWriter):
+        writer = output
+    else:
+        print >> sys.stderr, "Writing output to", output
+        writer = ETUtils.ElementWriter(output, stream.root)
+    docIndex = docIndexStart
+    try:
+        for document in stream:
+            recalculateDocumentIds(document, docIndex, corpusName, onlyWithinSentence)
+            writer.write(document)
+            docIndex += 1
+    except:
+        if writer is not output:
+            writer.abort()
+        raise
+    if writer is not output:
+        writer.close()
+    return docIndex - docIndexStart
+
 if __name__=="__main__":
     import sys
     
@@ -93,6 +158,7 @@ if __name__=="__main__":
     optparser.add_option("-o", "--output", default=defaultOutputName, dest="output", help="Output file in interaction xml format.")
     optparser.add_option("-s", "--sentence", action="store_true", default=False, dest="sentence", help="Only recalculate within a sentence element.")
     optparser.add_option("-d", "--docIndexStart", type="int", default=0, dest="docIndexStart", help="Start document indexing from.")
+    optparser.add_option("-t", "--stream", action="store_true", default=False, dest="stream", help="Process one document at a time, without loading the corpus.")
     (options, args) = optparser.parse_args()
     
     if options.input == None:
@@ -104,4 +170,7 @@ if __name__=="__main__":
         optparser.print_help()
         sys.exit(1)
     
-    recalculateIds(options.input, options.output, options.sentence, options.docIndexStart)
+    if options.stream:
+        recalculateIdsStreaming(options.input, options.output, options.sentence, options.docIndexStart)
+    else:
+        recalculateIds(options.input, options.output, options.sentence, options.docIndexStart)
@@ -1,41 +1,41 @@
 import sys
 import cElementTreeUtils as ETUtils
+import Pipeline
 
-def removeUnconnectedEntities(input, output=None):
-    input = ETUtils.ETFromObj(input)
-    root = input.getroot()
+def processDocument(document):
     removed = 0
     preserved = 0
-    for document in root.findall("document"):
-        sentMap = {} # allow for intersentence interactions
-        for sentence in document.findall("sentence"):
-            sentMap[sentence.get("id")] = sentence
-        connected = set()
-        for interaction in document.getiterator("interaction"):
-            connected.add(interaction.get("e1"))
-            connected.add(interaction.get("e2"))
-        entities = []
-        for entity in document.getiterator("entity"):
-            entities.append(entity)
-        for entity in entities:
-            if entity.get("isName") == "True": # never remove named entities
-                continue
-            eId = entity.get("id")
-            if eId not in connected:
-                if eId.find(".s") != -1: # sentence level entity
-                    sentMap[eId.rsplit(".", 1)[0]].remove(entity)
-                else: # document level entity
-                    document.remove(entity)
-                removed += 1
-            else:
-                preserved += 1
-    
-    print >> sys.stderr, "Removed", removed, "entities, preserved", preserved, "entities"
-    
-    if output != None:
-        print >> sys.stderr, "Writing output to", output
-        ETUtils.write(root, output)
-    return input
+    sentMap = {} # allow for intersentence interactions
+    for sentence in document.findall("sentence"):
+        sentMap[sentence.get("id")] = sentence
+    connected = set()
+    for interaction in document.getiterator("interaction"):
+        connected.add(interaction.get("e1"))
+        connected.add(interaction.get("e2"))
+    entities = []
+    for entity in document.getiterator("entity"):
+        entities.append(entity)
+    for entity in entities:
+        if entity.get("isName") == "True": # never remove named entities
+            continue
+        eId = entity.get("id")
+        if eId not in connected:
+            if eId.find(".s") != -1: # sentence level entity
+                sentMap[eId.rsplit(".", 1)[0]].remove(entity)
+            else: # document level entity
+                document.remove(entity)
+            removed += 1
+        else:
+            preserved += 1
+    return {"removed":removed, "preserved":preserved}
+
+def removeUnconnectedEntities(input, output=None, workers=None):
+    """ Returns the processed corpus tree, or None if the documents were
+    processed with workers (they are only written to the output file)
+    """
+    corpusTree, counts = Pipeline.processCorpus(input, output, "removeUnconnected", workers=workers)
+    print >> sys.stderr, "Removed", counts.get("removed", 0), "entities, preserved", counts.get("preserved", 0), "entities"
+    return corpusTree
 
 if __name__=="__main__":
     import sys
@@ -52,6 +52,7 @@ if __name__=="__main__":
     optparser = OptionParser(usage="%prog [options]\n")
     optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
     optparser.add_option("-o", "--output", default=None, dest="output", help="Output file in interaction xml format.")
+    optparser.add_option("-w", "--workers", type="int", default=None, dest="workers", help="Process documents one at a time in this many processes (0 for one per core).")
     (options, args) = optparser.parse_args()
     
     if options.input == None:
@@ -63,4 +64,4 @@ if __name__=="__main__":
         optparser.print_help()
         sys.exit(1)
     
-    removeUnconnectedEntities(options.input, options.output)
+    removeUnconnectedEntities(options.input, options.output, options.workers)
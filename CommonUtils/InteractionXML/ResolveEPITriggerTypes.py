@@ -4,6 +4,7 @@ try:
 except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
+import Pipeline
 from collections import defaultdict
 
 def getEPIBaseType(eType):
@@ -73,54 +74,56 @@ def getNewType(eType, eText):
         eNewType = eBaseType
     return eNewType
 
-def negateEvents(input, output=None, verbose=False):
-    if not (ET.iselement(input) and input.tag == "sentence"):
-        print >> sys.stderr, "Loading corpus file", input
-        corpusTree = ETUtils.ETFromObj(input)
-        corpusRoot = corpusTree.getroot()
+def negateSentence(sentence, verbose, counts):
+    for entity in sentence.findall("entity"):
+        counts["all-entities"] += 1
+        eType = entity.get("type")
+        if not isNegatableEPITrigger(eType):
+            counts["out-of-scope"] += 1
+            continue
+        eBaseType = getEPIBaseType(eType)
+        eText = entity.get("text").lower()
+        eNewType = determineNewType(eType, eText)
     
-    if not (ET.iselement(input) and input.tag == "sentence"):
-        sentences = corpusRoot.getiterator("sentence")
-    else:
-        sentences = [input]
-    counts = defaultdict(int)
-    for sentence in sentences:
-        for entity in sentence.findall("entity"):
-            counts["all-entities"] += 1
-            eType = entity.get("type")
-            if not isNegatableEPITrigger(eType):
-                counts["out-of-scope"] += 1
-                continue
-            eBaseType = getEPIBaseType(eType)
-            eText = entity.get("text").lower()
-            eNewType = determineNewType(eType, eText)
-        
-            # Insert changed charOffset
-            counts["entities"] += 1
-            if verbose:
-                print "Entity", entity.get("id"), [entity.get("text")], [eType, eBaseType, eNewType],
-            if eNewType != eBaseType:
-                counts["negated"] += 1
-                if verbose: print "NEGATED",
-            if eNewType == eType:
-                counts["correct"] += 1
-                if verbose: print "CORRECT"
+        # Insert changed charOffset
+        counts["entities"] += 1
+        if verbose:
+            print "Entity", entity.get("id"), [entity.get("text")], [eType, eBaseType, eNewType],
+        if eNewType != eBaseType:
+            counts["negated"] += 1
+            if verbose: print "NEGATED",
+        if eNewType == eType:
+            counts["correct"] += 1
+            if verbose: print "CORRECT"
+        else:
+            counts["incorrect"] += 1
+            if eNewType == eBaseType:
+                counts["incorrect-pos"] += 1
             else:
-                counts["incorrect"] += 1
-                if eNewType == eBaseType:
-                    counts["incorrect-pos"] += 1
-                else:
-                    counts["incorrect-neg"] += 1
-                if verbose: print "INCORRECT"
-            entity.set("type", eNewType)
+                counts["incorrect-neg"] += 1
+            if verbose: print "INCORRECT"
+        entity.set("type", eNewType)
+
+def negateDocument(document, verbose=False):
+    counts = defaultdict(int)
+    for sentence in document.getiterator("sentence"):
+        negateSentence(sentence, verbose, counts)
+    return dict(counts)
+
+def negateEvents(input, output=None, verbose=False, workers=None):
+    """ Returns the processed corpus tree, or None if the documents were
+    processed with workers (they are only written to the output file)
+    """
+    if ET.iselement(input) and input.tag == "sentence":
+        counts = defaultdict(int)
+        negateSentence(input, verbose, counts)
+        if verbose:
+            print dict(counts)
+        return None
+    corpusTree, counts = Pipeline.processCorpus(input, output, "negateEvents", (verbose,), workers)
     if verbose:
         print counts
-    
-    if not (ET.iselement(input) and input.tag == "sentence"):
-        if output != None:
-            print >> sys.stderr, "Writing output to", output
-            ETUtils.write(corpusRoot, output)
-        return corpusTree                    
+    return corpusTree
 
 if __name__=="__main__":
     print >> sys.stderr, "##### Extend Triggers #####"
@@ -137,8 +140,9 @@ if __name__=="__main__":
     optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in analysis format", metavar="FILE")
     optparser.add_option("-o", "--output", default=None, dest="output", help="Corpus in analysis format", metavar="FILE")
     optparser.add_option("-d", "--debug", default=False, action="store_true", dest="debug", help="")
+    optparser.add_option("-w", "--workers", type="int", default=None, dest="workers", help="Process documents one at a time in this many processes (0 for one per core).")
     (options, args) = optparser.parse_args()
     assert(options.input != None)
     #assert(options.output != None)
     
-    negateEvents(options.input, options.output, verbose=options.debug)
+    negateEvents(options.input, options.output, verbose=options.debug, workers=options.workers)
@@ -0,0 +1,68 @@
+"""
+Copy documents from interaction XML corpora to one or more output files.
+
+  Description: The input corpora are read one document at a time, and each
+  document is written immediately to the output files chosen for it, so
+  memory use does not depend on the size of the corpora. Optionally the ids
+  are recalculated (numbering the documents of all inputs consecutively)
+  and checked for uniqueness as the documents are written.
+"""
+import sys
+import cElementTreeUtils as ETUtils
+import RecalculateIds
+
+def openOutput(name, filename, rootElement, writers, counts):
+    print >> sys.stderr, "Writing output", name, "to", filename
+    writers[name] = ETUtils.ElementWriter(filename, rootElement)
+    counts[name] = 0
+
+def routeDocuments(inputs, route, outputs, recalculateIds=False, checkIds=False):
+    """
+    Keyword arguments:
+    inputs -- (list) corpus file names, read in order
+    route -- (function) called with a document and the index of its input,
+             returns a list of output names for the document. The function
+             may modify the document before it is written.
+    outputs -- (dictionary) output file names by output name, or (function)
+               returning the file name for an output name. The files are
+               written with the corpus attributes of the first input. Files
+               in a dictionary are always written, files given by a function
+               only when a document is routed to them.
+    recalculateIds -- (boolean) recalculate the hierarchical ids
+    checkIds -- (boolean) check that all ids are unique
+
+    Returns:
+    A dictionary of the number of documents written by output name
+    """
+    writers = {}
+    counts = {}
+    ids = set()
+    rootElement = None
+    docIndex = 0
+    for inputIndex in range(len(inputs)):
+        print >> sys.stderr, "Reading corpus", inputs[inputIndex]
+        stream = ETUtils.ElementStream(inputs[inputIndex], "document")
+        if rootElement == None:
+            rootElement = stream.root
+            if not callable(outputs):
+                for name in sorted(outputs.keys()):
+                    openOutput(name, outputs[name], rootElement, writers, counts)
+        corpusName = stream.root.get("source")
+        for document in stream:
+            if recalculateIds:
+                RecalculateIds.recalculateDocumentIds(document, docIndex, corpusName)
+            docIndex += 1
+            if checkIds:
+                for tag in ["entity", "interaction", "sentence", "document"]:
+                    for element in document.getiterator(tag):
+                        id = element.get("id")
+                        assert not id in ids, id
+                        ids.add(id)
+            for name in route(document, inputIndex):
+                if not writers.has_key(name):
+                    openOutput(name, outputs(name), rootElement, writers, counts)
+                writers[name].write(document)
+                counts[name] += 1
+    for name in sorted(writers.keys()):
+        writers[name].close()
+    return counts
@@ -1,4 +1,6 @@
 import sys
+import Range
+from SpanIndex import SpanIndex
 
 class SentenceElements:
     def __init__(self, sentenceElement, parse=None, tokenization=None, removeIntersentenceInteractions=True, removeNameInfo=False):
@@ -12,6 +14,7 @@ class SentenceElements:
         
         self.parseElement = None
         self.tokenizationElement = None
+        self.spanIndices = {}
         
         sentenceId = sentenceElement.get("id")
         pairElements = sentenceElement.findall("pair")
@@ -95,37 +98,46 @@ class SentenceElements:
                 else:
                     print >> sys.stderr, "Warning, tokenization", tokenization, "not found"
 
-    def getEntity(self, offset, offsetList, entityIds):
-        index = 0
-        for i in offsetList:
-            if (offset[0] >= i[0] and offset[0] <= i[1]) or (i[0] >= offset[0] and i[0] <= offset[1]):
-                #print offset, "list:", i
-                return entityIds[index]
-            index += 1
+    def getSpanIndex(self, elements, name):
+        # Indices are cached until the list of elements is replaced. If the
+        # list or the offsets of its elements are changed in place, call
+        # invalidateSpanIndices.
+        if not self.spanIndices.has_key(name) or self.spanIndices[name][0] is not elements:
+            index = SpanIndex()
+            for element in elements:
+                index.addElement(element)
+            self.spanIndices[name] = (elements, index)
+        return self.spanIndices[name][1]
+    
+    def invalidateSpanIndices(self):
+        """ Rebuild the span indices on next use, after the entities or tokens have been changed """
+        self.spanIndices = {}
+    
+    def getEntityIndex(self):
+        """ Returns a SpanIndex of the entity offsets, with entity elements as values """
+        return self.getSpanIndex(self.entities, "entities")
+    
+    def getTokenIndex(self):
+        """ Returns a SpanIndex of the token offsets, with token elements as values """
+        return self.getSpanIndex(self.tokens, "tokens")
+    
+    def getEntity(self, offset):
+        """ Returns the id of the first entity overlapping with offset, or None """
+        entities = self.getEntityIndex().getOverlapping(offset)
+        if len(entities) > 0:
+            return entities[0].get("id")
         return None
     
     def getEntityTokens(self):
-        entityElements = self.entities
-        entityOffsets = []
-        entityOffsetIds = []
         entityTokens = {}
-        for entityElement in entityElements:
+        for entityElement in self.entities:
             if not entityTokens.has_key(entityElement.get("id")):
                 entityTokens[entityElement.get("id")] = []
-            offsets = entityElement.get("charOffset").split(",")
-            for i in offsets:
-                offset = i.split("-")
-                offset[0] = int(offset[0])
-                offset[1] = int(offset[1])
-                entityOffsets.append(offset)
-                entityOffsetIds.append(entityElement.get("id"))
         
         for tokenElement in self.tokens:
-            offset = tokenElement.get("charOffset").split("-")
-            offset[0] = int(offset[0])
-            offset[1] = int(offset[1])
+            offset = Range.getElementSingleTuple(tokenElement)
             id = tokenElement.get("id")
-            entityId = self.getEntity(offset, entityOffsets, entityOffsetIds)
+            entityId = self.getEntity(offset)
             if not entityTokens.has_key(entityId):
                 entityTokens[entityId] = []
             entityTokens[entityId].append(id)
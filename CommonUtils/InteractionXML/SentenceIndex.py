@@ -0,0 +1,171 @@
+"""
+Persistent index of the sentences of a corpus by key.
+
+  Description: Maps the sentences of an interaction XML corpus by the values
+  of a tuple of attributes, f.e. ("text",), ("id","text") or ("origId",), to
+  their byte offsets in the corpus file. The index is built in a single pass
+  over the corpus without building a tree, and is saved next to the corpus,
+  so that a corpus with parses needs to be indexed only once. Matching
+  sentences are then read by seeking to their offsets (see
+  cElementTreeUtils.OffsetReader), so copying parses from a corpus does
+  not require loading it into memory.
+
+  The keys are SHA-1 hashes of the attribute values. Like a corpus cache,
+  the index records the size, modification time and hash of its source
+  file, and is rebuilt automatically when the source changes.
+
+  Example:
+  index = SentenceIndex("parses.xml.gz", ("text",))
+  for sentence in ...:
+      sourceSentence = index.get(sentence)
+"""
+import sys, os
+import marshal
+import hashlib
+import cElementTreeUtils as ETUtils
+import CorpusCache
+
+VERSION = 1
+
+def getIndexPath(filename, keyAttributes, tag="sentence"):
+    return filename + "." + tag + "-" + "-".join(keyAttributes) + ".index"
+
+def getKey(values):
+    """ Returns the key for a list of attribute values (None for missing attributes) """
+    sha = hashlib.sha1()
+    for value in values:
+        if value == None:
+            sha.update("-")
+            continue
+        if isinstance(value, unicode):
+            value = value.encode("utf-8")
+        sha.update(str(len(value)) + ":" + value)
+    return sha.digest()
+
+def buildIndex(input, keyAttributes, output=None, tag="sentence"):
+    """
+    Index the elements of one tag in a corpus file by the values of
+    keyAttributes. Returns the name of the index file.
+    """
+    keyAttributes = tuple(keyAttributes)
+    if output == None:
+        output = getIndexPath(input, keyAttributes, tag)
+    print >> sys.stderr, "Indexing", tag, "elements of", input, "by", keyAttributes, "to", output
+    header = CorpusCache.getSourceInfo(input)
+    header["version"] = VERSION
+    header["tag"] = tag
+    header["keyAttributes"] = keyAttributes
+    offsets = {}
+    def addElement(name, attrs, begin, end):
+        offsets.setdefault(getKey([attrs.get(x) for x in keyAttributes]), []).extend( (begin, end) )
+    ETUtils.scanElements(input, [tag], addElement)
+    header["count"] = sum([len(x) for x in offsets.itervalues()]) / 2
+    def writeIndex(out):
+        marshal.dump(header, out)
+        marshal.dump(offsets, out)
+    CorpusCache.writeFile(output, writeIndex)
+    return output
+
+def readHeader(indexPath):
+    f = open(indexPath, "rb")
+    try:
+        header = marshal.load(f)
+    finally:
+        f.close()
+    return header
+
+def isIndexValid(filename, indexPath, keyAttributes, tag="sentence"):
+    """
+    An index is valid if it was built with the same tag and attributes
+    from a source file of the same size and modification time, or the
+    same size and content hash.
+    """
+    if not os.path.exists(indexPath):
+        return False
+    try:
+        header = readHeader(indexPath)
+    except (IOError, ValueError, EOFError, TypeError):
+        return False
+    if header.get("version") != VERSION or header.get("tag") != tag or header.get("keyAttributes") != tuple(keyAttributes):
+        return False
+    return CorpusCache.isSourceUnchanged(filename, header)
+
+class SentenceIndex:
+    """
+    Read the sentences of a corpus file that match a key. Sentences with the
+    same key are returned in corpus order.
+
+    Keyword arguments:
+    filename -- (string) corpus file, uncompressed or block gzip compressed
+    keyAttributes -- (tuple) names of the attributes used as the key
+    tag -- (string) the indexed elements
+    indexPath -- (string) index file. If it doesn't exist or its corpus has
+                 changed, it is built. By default next to the corpus file.
+    """
+    def __init__(self, filename, keyAttributes=("text",), tag="sentence", indexPath=None):
+        if not ETUtils.canReadByOffset(filename):
+            raise IOError("%s: Only uncompressed and block gzip compressed files can be indexed, use ETUtils.canReadByOffset to check"%filename)
+        self.keyAttributes = tuple(keyAttributes)
+        self.tag = tag
+        if indexPath == None:
+            indexPath = getIndexPath(filename, self.keyAttributes, tag)
+        if not isIndexValid(filename, indexPath, self.keyAttributes, tag):
+            buildIndex(filename, self.keyAttributes, indexPath, tag)
+        print >> sys.stderr, "Loading index", indexPath
+        f = open(indexPath, "rb")
+        self.header = marshal.load(f)
+        self.offsets = marshal.load(f)
+        f.close()
+        self.reader = ETUtils.OffsetReader(filename)
+
+    def __len__(self):
+        return self.header["count"]
+
+    def getKey(self, element):
+        return getKey([element.get(x) for x in self.keyAttributes])
+
+    def has_key(self, element):
+        return self.offsets.has_key(self.getKey(element))
+
+    def getDuplicateCount(self):
+        """ The number of keys shared by more than one element """
+        return len([x for x in self.offsets.itervalues() if len(x) > 2])
+
+    def getAll(self, element):
+        """ Returns all indexed elements with the same key attribute values as element """
+        offsets = self.offsets.get(self.getKey(element), [])
+        return [self.reader.readElement(offsets[i], offsets[i+1]) for i in range(0, len(offsets), 2)]
+
+    def get(self, element):
+        """ Returns the last indexed element with the same key attribute values as element, or None """
+        offsets = self.offsets.get(self.getKey(element))
+        if offsets == None:
+            return None
+        return self.reader.readElement(offsets[-2], offsets[-1])
+
+    def close(self):
+        self.reader.close()
+
+if __name__=="__main__":
+    from optparse import OptionParser
+    # Import Psyco if available
+    try:
+        import psyco
+        psyco.full()
+        print >> sys.stderr, "Found Psyco, using"
+    except ImportError:
+        print >> sys.stderr, "Psyco not installed"
+
+    optparser = OptionParser(usage="%prog [options]\nIndex the sentences of an interaction XML corpus by key.")
+    optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
+    optparser.add_option("-o", "--output", default=None, dest="output", help="Index file (default next to the input)")
+    optparser.add_option("-k", "--key", default="text", dest="key", help="Comma-separated list of the attributes used as the key")
+    optparser.add_option("-t", "--tag", default="sentence", dest="tag", help="Indexed element name")
+    (options, args) = optparser.parse_args()
+
+    if options.input == None:
+        print >> sys.stderr, "Error, input file not defined."
+        optparser.print_help()
+        sys.exit(1)
+
+    buildIndex(options.input, options.key.split(","), options.output, options.tag)
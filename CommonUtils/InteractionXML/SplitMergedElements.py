@@ -1,16 +1,11 @@
 import sys, os, copy
-extraPath = os.path.dirname(os.path.abspath(__file__))+"/../.."
-#IF LOCAL
-extraPath = os.path.dirname(os.path.abspath(__file__))+"/../../JariSandbox/ComplexPPI/Source"
-#ENDIF
-sys.path.append(extraPath)
-from Utils.ProgressCounter import ProgressCounter
 try:
     import xml.etree.cElementTree as ET
 except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
 import IDUtils
+import Pipeline
 
 # Splits merged types generated from overlapping entities/edges into their components
 def getElementTypes(element, separator="---"):
@@ -65,26 +60,24 @@ def processSentence(sentence, countsByType):
     splitMerged(sentence, "interaction", countsByType)
     splitMerged(sentence, "pair", countsByType)
 
-def splitMergedElements(inputFilename, outputFilename=None):
-    print >> sys.stderr, "##### Split elements with merged types #####"
-    print >> sys.stderr, "Loading corpus", inputFilename
-    corpusTree = ETUtils.ETFromObj(inputFilename)
-    corpusRoot = corpusTree.getroot()
-    
-    documents = corpusRoot.findall("document")
-    counter = ProgressCounter(len(documents), "Documents")
+def processDocument(document):
     countsByType = {"entity":[0,0], "interaction":[0,0], "pair":[0,0]}
-    for document in documents:
-        counter.update()
-        for sentence in document.findall("sentence"):
-            processSentence(sentence, countsByType)
+    for sentence in document.findall("sentence"):
+        processSentence(sentence, countsByType)
+    return countsByType
+
+def printResults(countsByType):
     print >> sys.stderr, "Results"
     for k in sorted(countsByType.keys()):
         print >> sys.stderr, "  " + k + ": removed", countsByType[k][0], "created", countsByType[k][1]
-    
-    if outputFilename != None:
-        print >> sys.stderr, "Writing output to", outputFilename
-        ETUtils.write(corpusRoot, outputFilename)
+
+def splitMergedElements(inputFilename, outputFilename=None, workers=None):
+    """ Returns the processed corpus tree, or None if the documents were
+    processed with workers (they are only written to the output file)
+    """
+    print >> sys.stderr, "##### Split elements with merged types #####"
+    corpusTree, countsByType = Pipeline.processCorpus(inputFilename, outputFilename, "splitMerged", workers=workers)
+    printResults(countsByType)
     return corpusTree
 
 if __name__=="__main__":
@@ -102,6 +95,7 @@ if __name__=="__main__":
     optparser = OptionParser(usage="%prog [options]\nPath generator.")
     optparser.add_option("-i", "--input", default=None, dest="input", help="Corpus in interaction xml format", metavar="FILE")
     optparser.add_option("-o", "--output", default=None, dest="output", help="Output file in interaction xml format.")
+    optparser.add_option("-w", "--workers", type="int", default=None, dest="workers", help="Process documents one at a time in this many processes (0 for one per core).")
     (options, args) = optparser.parse_args()
     
     if options.input == None:
@@ -113,4 +107,4 @@ if __name__=="__main__":
         optparser.print_help()
         sys.exit(1)
     
-    run(options.input, options.output)
+    splitMergedElements(options.input, options.output, options.workers)
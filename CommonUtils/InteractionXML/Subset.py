@@ -3,12 +3,14 @@ try:
 except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
+import RouteDocuments
 import random
+import sys
 
 # From Split.py, which should be moved to CommonUtils
 def getSample(popSize, sampleFraction, seed=0):
     random.seed(seed)
-    sample = random.sample( xrange(popSize), int(sampleFraction*float(popSize)) )
+    sample = set(random.sample( xrange(popSize), int(sampleFraction*float(popSize)) ))
     vector = []
     for i in range(popSize):
         if i in sample:
@@ -17,6 +19,66 @@ def getSample(popSize, sampleFraction, seed=0):
             vector.append(1)
     return vector
 
+def countDocuments(input):
+    count = 0
+    for document in ETUtils.ElementStream(input, "document"):
+        count += 1
+    return count
+
+def processCorpus(input, output, idList=None, fraction=1.0, seed=0, invert=False):
+    """
+    Write a subset of the documents of a corpus. Documents are read and
+    written one at a time.
+    
+    Keyword arguments:
+    input -- (string) corpus file name
+    output -- (string) output file name
+    idList -- (list) origIds of the sentences to keep. If None, a
+              pseudorandom subset is selected.
+    fraction -- (float) fraction of documents in the pseudorandom subset
+    seed -- (int) seed for the pseudorandom subset
+    invert -- (boolean) keep the documents that would be removed
+    """
+    if idList != None:
+        idList = set(idList)
+    else:
+        print >> sys.stderr, "No id-file, defining pseudorandom distribution"
+        documentSets = getSample(countDocuments(input), fraction, seed)
+
+    # Remove those documents not in subset
+    counts = {"keptDocuments":0, "keptSentences":0, "removedDocuments":0, "removedSentences":0}
+    def route(document, inputIndex):
+        sentences = document.findall("sentence")
+        if idList != None:
+            keep = None
+            for sentence in sentences:
+                selection = sentence.attrib["origId"] in idList
+                if invert:
+                    selection = not selection
+                assert(keep == None or keep == selection)
+                keep = selection
+        else:
+            selection = documentSets[counts["keptDocuments"] + counts["removedDocuments"]] != 0
+            if invert:
+                selection = not selection
+            keep = not selection
+        if not keep:
+            counts["removedDocuments"] += 1
+            counts["removedSentences"] += len(sentences)
+            return []
+        else:
+            counts["keptDocuments"] += 1
+            counts["keptSentences"] += len(sentences)
+            return ["subset"]
+    
+    print >> sys.stderr, "Writing subset to", output
+    RouteDocuments.routeDocuments([input], route, {"subset":output})
+    
+    print >> sys.stderr, "Corpus:", counts["keptDocuments"] + counts["removedDocuments"], "documents,", counts["keptSentences"] + counts["removedSentences"], "sentences."
+    print >> sys.stderr, "Removed:", counts["removedDocuments"], "documents,", counts["removedSentences"], "sentences."
+    print >> sys.stderr, "Subset:", counts["keptDocuments"], "documents,", counts["keptSentences"], "sentences."
+    return counts
+
 if __name__=="__main__":
     import sys
     print >> sys.stderr, "##### Create a subset of documents from an interaction XML-file #####"
@@ -50,62 +112,13 @@ if __name__=="__main__":
         optparser.print_help()
         sys.exit(1)
     
-    idList = []
+    idList = None
     if options.ids != None:
         print >> sys.stderr, "Loading set ids from file", options.ids
+        idList = []
         idListFile = open(options.ids)
         lines = idListFile.readlines()
         for line in lines:
             idList.append(line.strip())
             
-    print >> sys.stderr, "Loading corpus file", options.input
-    corpusTree = ET.parse(options.input)
-    print >> sys.stderr, "Corpus file loaded"
-    corpusRoot = corpusTree.getroot()
-
-    documents = corpusRoot.findall("document")
-    if options.ids == None:
-        print >> sys.stderr, "No id-file, defining pseudorandom distribution"
-        documentSets = getSample(len(documents), options.fraction, options.seed)
-
-    # Remove those documents not in subset
-    keptDocuments = 0
-    keptSentences = 0
-    removedDocuments = 0
-    removedSentences = 0
-    for i in range(len(documents)):
-        document = documents[i]
-        sentences = document.findall("sentence")
-        if options.ids != None:
-            keep = None
-            for sentence in sentences:
-                selection = sentence.attrib["origId"] in idList
-                if options.invert:
-                    selection = not selection
-                assert(keep == None or keep == selection)
-                keep = selection
-            if not keep:
-                corpusRoot.remove(document)
-                removedDocuments += 1
-                removedSentences += len(sentences)
-            else:
-                keptDocuments += 1
-                keptSentences += len(sentences)
-        else:
-            selection = documentSets[i] != 0
-            if options.invert:
-                selection = not selection
-            if selection:
-                corpusRoot.remove(document)
-                removedDocuments += 1
-                removedSentences += len(sentences)
-            else:
-                keptDocuments += 1
-                keptSentences += len(sentences)
-    
-    print >> sys.stderr, "Corpus:", keptDocuments + removedDocuments, "documents,", keptSentences + removedSentences, "sentences."
-    print >> sys.stderr, "Removed:", removedDocuments, "documents,", removedSentences, "sentences."
-    print >> sys.stderr, "Subset:", keptDocuments, "documents,", keptSentences, "sentences."
-    
-    print >> sys.stderr, "Writing subset to", options.output
-    ETUtils.write(corpusRoot, options.output)
+    processCorpus(options.input, options.output, idList, options.fraction, options.seed, options.invert)
@@ -30,6 +30,13 @@ Copy elements from one InteractionXML structure to another.
   -m (--match) "id,text" 
   -e (--element) "sentenceanalyses/parses/parse" 
   -i (--identifiers) "{'parser':'Charniak-Lease'}"
+  
+  With the --stream option the target is read one top level element (f.e. document) at a
+  time, and the source parents are indexed by all the match attributes (see SentenceIndex).
+  Only the source parents that match a target parent are read, so neither file needs to fit
+  in memory. The index is saved next to the source file and reused if the source doesn't change.
+  A source that can't be read by offset (f.e. compressed with bzip2 or ordinary gzip) is
+  loaded into memory instead.
 """
 __version__ = "$Revision: 1.4 $"
 
@@ -40,6 +47,9 @@ except ImportError:
     import cElementTree as ET
 import cElementTreeUtils as ETUtils
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__))+"/..")
+import SentenceIndex
+
 def getMatchConditions(matchString):
     """Split the match options string"""
     if matchString == None:
@@ -105,6 +115,33 @@ def getParentElements(root, pattern, match):
     print >> sys.stderr, "Found", str(len(elementsByKey)), "elements"
     return elementsByKey
 
+def copyElement(sourceParent, targetParent, elementPath, identifiers):
+    """
+    Copies the subelement that matches the conditions in 'identifiers'
+    from a source-parent to a target-parent.
+    """
+    # Locate the source element
+    sourceElements = sourceParent.findall(elementPath) # source element is under the source parent
+    sourceElement = None
+    for element in sourceElements:
+        if matchElement(element, identifiers):
+            assert(sourceElement==None) # The source element must be identified uniquely
+            sourceElement = element
+    assert(sourceElement != None) # The source element must be found for each source parent
+    #if sourceElement == None:
+    #    return
+    
+    # Locate the target element       
+    # The subelement is added to the same level in the target XML that it existed in the source XML
+    if elementPath.find("/") != -1:
+        targetPath = elementPath.rsplit("/",1)[0]
+        targetElements = targetParent.findall(targetPath) # Find the immediate parent for the copied element
+        assert(len(targetElements) == 1) # The place to add the element must be identified uniquely
+        targetElement = targetElements[0]
+    else:
+        targetElement = targetParent
+    targetElement.append(sourceElement)
+
 def copyElements(pairs, elementPath, identifiers):
     """
     Copies subelements that match the conditions in 'identifiers'
@@ -113,32 +150,59 @@ def copyElements(pairs, elementPath, identifiers):
     copied = 0
     # Loop through all matched parent-pairs
     for pair in pairs:
-        sourceParent = pair[0]
-        targetParent = pair[1]
-        # Locate the source element
-        sourceElements = sourceParent.findall(elementPath) # source element is under the source parent
-        sourceElement = None
-        for element in sourceElements:
-            if matchElement(element, identifiers):
-                assert(sourceElement==None) # The source element must be identified uniquely
-                sourceElement = element
-        assert(sourceElement != None) # The source element must be found for each source parent
-        #if sourceElement == None:
-        #    return
-        
-        # Locate the target element       
-        # The subelement is added to the same level in the target XML that it existed in the source XML
-        if elementPath.find("/") != -1:
-            targetPath = elementPath.rsplit("/",1)[0]
-            targetElements = targetParent.findall(targetPath) # Find the immediate parent for the copied element
-            assert(len(targetElements) == 1) # The place to add the element must be identified uniquely
-            targetElement = targetElements[0]
-        else:
-            targetElement = targetParent
-        targetElement.append(sourceElement)
+        copyElement(pair[0], pair[1], elementPath, identifiers)
         copied += 1
     print >> sys.stderr, "Copied", str(copied), "elements"
 
+def copyElementsStreaming(source, target, output, parentPath, match, elementPath, identifiers):
+    """
+    Copies subelements between matching parents of a source and a target file
+    without loading either into memory. The target is read one element of the
+    first level of parentPath at a time, and the source parents are read through
+    an index on the match attributes. Target parents with no source parent are
+    left as they are.
+    """
+    parentTags = parentPath.split("/")
+    if ETUtils.canReadByOffset(source):
+        sourceIndex = SentenceIndex.SentenceIndex(source, match, parentTags[-1])
+        getSourceParents = sourceIndex.getAll
+    else:
+        print >> sys.stderr, "Loading source file", source, "(can't be read by offset)"
+        sourceIndex = None
+        elementIndex = ETUtils.ElementIndex([(parentTags[-1], match)], ETUtils.ETFromObj(source).getroot())
+        getSourceParents = lambda x: elementIndex.getAll(parentTags[-1], match, [x.get(k) for k in match])
+    print >> sys.stderr, "Copying elements to", target
+    targetStream = ETUtils.ElementStream(target, parentTags[0])
+    print >> sys.stderr, "Saving output file to", output
+    writer = ETUtils.ElementWriter(output, targetStream.root)
+    targetKeys = set()
+    copied = 0
+    skipped = 0
+    for element in targetStream:
+        if len(parentTags) > 1:
+            targetParents = element.findall("/".join(parentTags[1:]))
+        else:
+            targetParents = [element]
+        for targetParent in targetParents:
+            key = tuple([targetParent.get(x) for x in match])
+            assert(key not in targetKeys)
+            targetKeys.add(key)
+            sourceParents = getSourceParents(targetParent)
+            if len(sourceParents) == 0:
+                skipped += 1
+                continue
+            assert(len(sourceParents) == 1)
+            copyElement(sourceParents[0], targetParent, elementPath, identifiers)
+            copied += 1
+        writer.write(element)
+    writer.close()
+    if sourceIndex != None:
+        sourceIndex.close()
+    print >> sys.stderr, "Copied", str(copied), "elements"
+    if skipped > 0:
+        print >> sys.stderr, "Skipped", str(skipped), "target parents with no matching source parent"
+    return copied, skipped
+
 if __name__=="__main__":
     from optparse import OptionParser
     optparser = OptionParser(usage="%prog [options]\nCopy elements from one interaction XML file to another.")
@@ -149,6 +213,7 @@ if __name__=="__main__":
     optparser.add_option("-m", "--match", default=None, dest="match", help="A comma-separated list of attributes by which 'parent'-elements are matched between source and target")
     optparser.add_option("-e", "--element", default=None, dest="element", help="The path of the subelements to copy from source to target. Relative to parent.")
     optparser.add_option("-i", "--identifiers", default=None, dest="identifiers", help="A python-dictionary of attributes and values that will be used to select copied elements.")
+    optparser.add_option("--stream", default=False, action="store_true", dest="stream", help="Read the target one element at a time and the source through an index.")
     (options, args) = optparser.parse_args()
     
     assert(options.source != None)
@@ -160,6 +225,10 @@ if __name__=="__main__":
     else:
         options.identifiers = {}
     
+    if options.stream:
+        copyElementsStreaming(options.source, options.target, options.output, options.parent, getMatchConditions(options.match), options.element, options.identifiers)
+        sys.exit(0)
+    
     print >> sys.stderr, "Loading source file", options.source
     sourceTree = ET.parse(options.source)
     sourceRoot = sourceTree.getroot()
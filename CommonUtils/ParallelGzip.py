@@ -0,0 +1,301 @@
+"""
+Block-parallel gzip compression and decompression.
+
+  Program:    Parallel gzip
+  Author:     Jari Bjoerne
+
+  Description: Files are written as a series of independent gzip members,
+  each holding at most BLOCK_SIZE bytes of uncompressed data. The members
+  are compressed in a pool of threads (zlib releases the interpreter lock
+  while compressing), so writing scales with the number of cores. The
+  result is a standard multi-member gzip stream that gzip, zcat and
+  GzipFile can read.
+
+  Each member stores its compressed size in the gzip header (the "BC"
+  extra field of the BGZF format), so when such a file is read, members
+  can be located without decompressing them, and decompressed in parallel.
+  Ordinary gzip files are read with GzipFile, as are the members following
+  the first one that doesn't record its size (f.e. an ordinary gzip file
+  appended to a block gzip file).
+"""
+
+import os
+import zlib
+import mmap
+import bisect
+import struct
+from gzip import GzipFile
+from collections import deque
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+# Uncompressed size of a member. Small enough that the compressed member
+# fits the 16-bit size field even for incompressible data.
+BLOCK_SIZE = 0xff00
+# gzip header with the FEXTRA flag and a BGZF "BC" subfield, followed by
+# the 16-bit (total member size - 1)
+HEADER = "\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+HEADER_SIZE = len(HEADER) + 2
+# An empty member marks the end of the file
+EOF_MEMBER = "\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00\x1b\x00\x03\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+
+def compressBlock(data, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compressor.compress(data) + compressor.flush()
+    return HEADER + struct.pack("<H", HEADER_SIZE + len(deflated) + 8 - 1) + deflated + \
+           struct.pack("<II", zlib.crc32(data) & 0xffffffff, len(data))
+
+def decompressBlock(member):
+    data = zlib.decompress(member[HEADER_SIZE:-8], -zlib.MAX_WBITS)
+    crc, size = struct.unpack("<II", member[-8:])
+    if size != len(data) or crc != zlib.crc32(data) & 0xffffffff:
+        raise IOError("CRC check failed for gzip member")
+    return data
+
+# Default maximum number of threads. Compressing a block takes about as
+# long as reading or writing it, so more threads rarely help and only use
+# memory for the pending blocks (4 per thread).
+MAX_DEFAULT_WORKERS = 8
+
+def getWorkerCount(workers):
+    if workers == None:
+        return min(cpu_count(), MAX_DEFAULT_WORKERS)
+    assert workers > 0, workers
+    return workers
+
+def isBlockGzip(filename):
+    """ True if the file starts with a gzip member that records its size.
+    Only the first member is checked, see BlockGzipReader for files where
+    later members don't record it.
+    """
+    f = open(filename, "rb")
+    header = f.read(HEADER_SIZE)
+    f.close()
+    return len(header) == HEADER_SIZE and header[:4] == HEADER[:4] and header[10:16] == HEADER[10:16]
+
+class BlockGzipWriter:
+    """ Write-only file object compressing blocks in parallel. The threads
+    are stopped when the writer is closed (also if closing fails), or when
+    it is garbage collected without closing, f.e. after an exception. An
+    unclosed file is left incomplete.
+    """
+    def __init__(self, filename, workers=None, level=6):
+        self.file = open(filename, "wb")
+        self.level = level
+        workers = getWorkerCount(workers)
+        self.pool = ThreadPool(workers)
+        self.maxPending = 4 * workers
+        self.pending = deque()
+        self.buffer = []
+        self.bufferSize = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.bufferSize += len(data)
+        if self.bufferSize >= BLOCK_SIZE:
+            data = "".join(self.buffer)
+            end = len(data) - len(data) % BLOCK_SIZE
+            for i in range(0, end, BLOCK_SIZE):
+                self.submit(data[i:i+BLOCK_SIZE])
+            self.buffer = [data[end:]]
+            self.bufferSize = len(data) - end
+
+    def submit(self, block):
+        self.pending.append( self.pool.apply_async(compressBlock, (block, self.level)) )
+        # Keep memory bounded by writing out the oldest finished members
+        while len(self.pending) > self.maxPending:
+            self.file.write(self.pending.popleft().get())
+
+    def flush(self):
+        if self.bufferSize > 0:
+            self.submit("".join(self.buffer))
+            self.buffer = []
+            self.bufferSize = 0
+        while len(self.pending) > 0:
+            self.file.write(self.pending.popleft().get())
+        self.file.flush()
+
+    def stopPool(self):
+        if self.pool != None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+    
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.flush()
+            self.file.write(EOF_MEMBER)
+        finally:
+            self.file.close()
+            self.stopPool()
+            self.closed = True
+    
+    def __del__(self):
+        if not self.closed:
+            self.file.close()
+            self.stopPool()
+            self.closed = True
+
+class BlockGzipReader:
+    """ Read-only file object decompressing members in parallel. The
+    threads are stopped at the end of the file, or when the reader is
+    closed or garbage collected. If a member doesn't record its size, it
+    and the rest of the file are read with GzipFile.
+    """
+    def __init__(self, filename, workers=None):
+        self.file = open(filename, "rb")
+        workers = getWorkerCount(workers)
+        self.pool = ThreadPool(workers)
+        self.maxPending = 4 * workers
+        self.pending = deque()
+        self.buffer = ""
+        self.offset = 0
+        self.eof = False
+        self.fallback = None
+        self.closed = False
+
+    def readMember(self):
+        header = self.file.read(HEADER_SIZE)
+        if len(header) == 0:
+            return None
+        if len(header) < HEADER_SIZE or header[:4] != HEADER[:4] or header[10:16] != HEADER[10:16]:
+            raise IOError("Not a block gzip member at offset " + str(self.file.tell() - len(header)))
+        size = struct.unpack("<H", header[-2:])[0] + 1
+        return header + self.file.read(size - HEADER_SIZE)
+
+    def fill(self):
+        while not self.eof and len(self.pending) < self.maxPending:
+            offset = self.file.tell()
+            try:
+                member = self.readMember()
+            except IOError:
+                self.file.seek(offset)
+                self.fallback = GzipFile(fileobj=self.file, mode="rb")
+                self.eof = True
+                break
+            if member == None:
+                self.eof = True
+            else:
+                self.pending.append( self.pool.apply_async(decompressBlock, (member,)) )
+
+    def read(self, size=-1):
+        chunks = []
+        while size != 0:
+            if self.offset >= len(self.buffer):
+                self.fill()
+                if len(self.pending) > 0:
+                    self.buffer = self.pending.popleft().get()
+                else:
+                    self.stopPool()
+                    if self.fallback == None:
+                        break
+                    self.buffer = self.fallback.read(BLOCK_SIZE)
+                    if len(self.buffer) == 0:
+                        break
+                self.offset = 0
+                continue
+            if size < 0:
+                end = len(self.buffer)
+            else:
+                end = min(len(self.buffer), self.offset + size)
+                size -= end - self.offset
+            chunks.append(self.buffer[self.offset:end])
+            self.offset = end
+        return "".join(chunks)
+
+    def stopPool(self):
+        if self.pool != None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def close(self):
+        if self.closed:
+            return
+        if self.fallback != None:
+            self.fallback.close()
+        self.file.close()
+        self.stopPool()
+        self.closed = True
+
+    def __del__(self):
+        self.close()
+
+def readMemberTable(filename):
+    """ Returns the compressed and the uncompressed start offsets of the
+    members of a block gzip file. Only the headers and the size fields
+    at the end of each member are read. The last items of the lists are
+    the total sizes.
+    """
+    f = open(filename, "rb")
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        f.close()
+        return [0], [0]
+    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.close()
+    compressed = [0]
+    uncompressed = [0]
+    offset = 0
+    while offset < size:
+        header = data[offset:offset+HEADER_SIZE]
+        if len(header) < HEADER_SIZE or header[:4] != HEADER[:4] or header[10:16] != HEADER[10:16]:
+            data.close()
+            raise IOError("Not a block gzip member at offset " + str(offset))
+        offset += struct.unpack("<H", header[-2:])[0] + 1
+        compressed.append(offset)
+        uncompressed.append(uncompressed[-1] + struct.unpack("<I", data[offset-4:offset])[0])
+    data.close()
+    return compressed, uncompressed
+
+class BlockGzipRangeReader:
+    """ Random access to the uncompressed content of a block gzip file.
+    Only the members overlapping the requested range are decompressed.
+    """
+    def __init__(self, filename):
+        self.file = open(filename, "rb")
+        self.compressed, self.uncompressed = readMemberTable(filename)
+        self.lastMember = None
+        self.lastData = None
+
+    def getMember(self, index):
+        if index != self.lastMember:
+            self.file.seek(self.compressed[index])
+            self.lastData = decompressBlock(self.file.read(self.compressed[index+1] - self.compressed[index]))
+            self.lastMember = index
+        return self.lastData
+
+    def read(self, begin, end):
+        """ Returns the uncompressed bytes from begin up to (not including) end """
+        end = min(end, self.uncompressed[-1])
+        chunks = []
+        index = bisect.bisect_right(self.uncompressed, begin) - 1
+        while begin < end:
+            data = self.getMember(index)
+            start = self.uncompressed[index]
+            chunks.append(data[begin-start:end-start])
+            begin = start + len(data)
+            index += 1
+        return "".join(chunks)
+
+    def close(self):
+        self.file.close()
+
+def openGzip(filename, mode="rb", workers=None):
+    """ Open a gzip-file for reading or writing
+
+    Keyword arguments:
+    filename -- (string) path to file
+    mode -- (string) "r" or "w", with optional "b" or "t"
+    workers -- (int) number of compression threads. If None, use one
+               per core, at most MAX_DEFAULT_WORKERS.
+    """
+    if "w" in mode:
+        return BlockGzipWriter(filename, workers)
+    elif isBlockGzip(filename):
+        return BlockGzipReader(filename, workers)
+    else:
+        return GzipFile(filename, "rb")
@@ -23,6 +23,39 @@ def charOffsetToSingleTuple(charOffset):
     assert(len(tuples) == 1)
     return tuples[0] 
 
+# Parsed offsets by element, see getElementTuples
+elementTupleCache = {}
+elementTupleCacheSize = 100000
+
+def getElementTuples(element, attribute="charOffset"):
+    """ Returns the character offsets of an element as a list of tuples
+    
+    The parsed offsets are cached by element, so the offset string of an
+    element is split only once as long as it does not change. The cache
+    is keyed by the id of the element and checked against the current
+    attribute value, so it does not keep elements alive. It is cleared
+    when it grows over elementTupleCacheSize entries.
+
+    Keyword arguments:
+    element -- an element with a character offset attribute
+    attribute -- the name of the attribute
+    """
+    charOffset = element.get(attribute)
+    key = (id(element), attribute)
+    cached = elementTupleCache.get(key)
+    if cached != None and cached[0] == charOffset:
+        return list(cached[1])
+    tuples = charOffsetToTuples(charOffset)
+    if len(elementTupleCache) >= elementTupleCacheSize:
+        elementTupleCache.clear()
+    elementTupleCache[key] = (charOffset, tuple(tuples))
+    return tuples
+
+def getElementSingleTuple(element, attribute="charOffset"):
+    tuples = getElementTuples(element, attribute)
+    assert(len(tuples) == 1)
+    return tuples[0]
+
 def charOffsetToTuples(charOffset):
     """ Splits a comma separated list of character offsets into tuples of integers.
 
@@ -0,0 +1,150 @@
+"""
+Character offsets of many elements as parallel lists.
+
+The offsets of a group of elements (f.e. the tokens or entities of a
+sentence) are parsed once into begin and end lists, so they can be
+compared with each other without splitting strings or calling the Range
+functions pair by pair. Offsets with multiple spans ("0-2,5-20") are
+stored as a ragged array: all spans are in the flat begin/end lists, and
+spanStart holds the index of the first span of each element. The
+comparison functions follow the semantics of the corresponding functions
+in Range.py.
+"""
+__version__ = "$Revision: 1.2 $"
+
+from itertools import izip, repeat
+import Range
+
+###############################################################################
+# Span comparison
+###############################################################################
+
+def getColumns(*columns):
+    """ Integer arguments are repeated to the length of the list arguments.
+    At least one of the arguments must be a list.
+    """
+    lengths = [len(x) for x in columns if not isinstance(x, (int, long))]
+    assert len(lengths) > 0, "At least one argument must be a list"
+    assert min(lengths) == max(lengths), "Lists must have the same length"
+    return [(isinstance(x, (int, long)) and repeat(x, lengths[0])) or x for x in columns]
+
+def overlap(begin1, end1, begin2, end2):
+    """ Elementwise Range.overlap. Each argument is a list or an integer.
+
+    Returns:
+    A list of booleans
+    """
+    return [not (e1 < b2 or e2 < b1) for b1, e1, b2, e2 in izip(*getColumns(begin1, end1, begin2, end2))]
+
+def contains(begin1, end1, begin2, end2):
+    """ Elementwise Range.contains (range1 contains range2)
+    """
+    return [b1 <= b2 and e1 >= e2 for b1, e1, b2, e2 in izip(*getColumns(begin1, end1, begin2, end2))]
+
+def merge(begin1, end1, begin2, end2):
+    """ Elementwise Range.merge. Unlike Range.merge, the ranges are not
+    required to overlap.
+
+    Returns:
+    A tuple of (begin, end) lists
+    """
+    begins = []
+    ends = []
+    for b1, e1, b2, e2 in izip(*getColumns(begin1, end1, begin2, end2)):
+        begins.append(min(b1, b2))
+        ends.append(max(e1, e2))
+    return begins, ends
+
+def mismatch(begin1, end1, begin2, end2):
+    """ Elementwise Range.mismatch
+    """
+    mismatches = []
+    for b1, e1, b2, e2 in izip(*getColumns(begin1, end1, begin2, end2)):
+        if b1 <= b2 and e1 >= e2: # range1 contains range2
+            mismatches.append((e1 - b1) - (e2 - b2))
+        elif b2 <= b1 and e2 >= e1: # range2 contains range1
+            mismatches.append((e2 - b2) - (e1 - b1))
+        elif not (e1 < b2 or e2 < b1):
+            # Range.mismatch always takes the range1[1] >= range2[0] branch here
+            mismatches.append(e2 - b1 + 1)
+        else:
+            mismatches.append((e1 - b1 + 1) + (e2 - b2 + 1))
+    return mismatches
+
+###############################################################################
+# Offsets of a group of elements
+###############################################################################
+
+class OffsetArray:
+    """ The character offsets of a list of elements
+
+    Keyword arguments:
+    elements -- a list of elements with a character offset attribute
+    attribute -- the name of the attribute
+    """
+    def __init__(self, elements=[], attribute="charOffset"):
+        self.elements = []
+        self.begin = []
+        self.end = []
+        # spanStart[i]:spanStart[i+1] are the spans of element i
+        self.spanStart = [0]
+        # owner[j] is the index of the element of span j
+        self.owner = []
+        for element in elements:
+            self.add(element, Range.getElementTuples(element, attribute))
+
+    def add(self, element, spans):
+        index = len(self.elements)
+        self.elements.append(element)
+        for span in spans:
+            self.begin.append(span[0])
+            self.end.append(span[1])
+            self.owner.append(index)
+        self.spanStart.append(len(self.begin))
+
+    def __len__(self):
+        return len(self.elements)
+
+    def getSpans(self, index):
+        """ Returns the spans of an element as a list of tuples
+        """
+        first, last = self.spanStart[index], self.spanStart[index+1]
+        return zip(self.begin[first:last], self.end[first:last])
+
+    def reduceSpans(self, values):
+        """ Returns the indices of elements with a true value for any of their spans
+        """
+        indices = []
+        for j in range(len(values)):
+            if values[j] and (len(indices) == 0 or indices[-1] != self.owner[j]):
+                indices.append(self.owner[j])
+        return indices
+
+    def getOverlapping(self, begin, end):
+        """ Returns the indices of elements overlapping with a range
+        """
+        if len(self.begin) == 0:
+            return []
+        return self.reduceSpans(overlap(self.begin, self.end, begin, end))
+
+    def getContaining(self, begin, end):
+        """ Returns the indices of elements with a span containing a range
+        """
+        if len(self.begin) == 0:
+            return []
+        return self.reduceSpans(contains(self.begin, self.end, begin, end))
+
+    def getContained(self, begin, end):
+        """ Returns the indices of elements with a span contained in a range
+        """
+        if len(self.begin) == 0:
+            return []
+        return self.reduceSpans(contains(begin, end, self.begin, self.end))
+
+def fromSpans(spans):
+    """ An OffsetArray of (begin, end)-tuples, each tuple being its own element
+    """
+    array = OffsetArray()
+    for span in spans:
+        array.add(span, [span])
+    return array
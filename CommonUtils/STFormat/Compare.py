@@ -1,5 +1,9 @@
+import sys, os
+import tarfile
 from collections import defaultdict
 from STTools import *
+sys.path.append(os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import ParseStats
 
 def getCounts(documents):
     counts = defaultdict(int)
@@ -32,18 +36,33 @@ def getCounts(documents):
                 counts["arg"] += 1
     return counts
 
+def loadCounts(input, a2Tag="a2"):
+    """
+    Returns the counts and the number of documents for a directory or a
+    package in the shared task format, or for an interaction XML file (see
+    ParseStats.countAnnotations).
+    """
+    if os.path.isfile(input) and not tarfile.is_tarfile(input):
+        counts = ParseStats.corpusStats(input, ["annotation"])
+        return counts, counts.pop("document", 0)
+    documents = loadSet(input, a2Tag=a2Tag)
+    return getCounts(documents), len(documents)
+
+def getAverage(count, numDocs):
+    if numDocs == 0:
+        return 0.0
+    return count / float(numDocs)
+
 def compare(a, b, a2Tag="a2"):
-    docsA = loadSet(a, a2Tag=a2Tag)
-    docsB = loadSet(b, a2Tag=a2Tag)
-    countsA = getCounts(docsA)
-    countsB = getCounts(docsB)
+    countsA, numDocsA = loadCounts(a, a2Tag)
+    countsB, numDocsB = loadCounts(b, a2Tag)
     allKeys = list(set(countsA.keys() + countsB.keys()))
     allKeys.sort()
     maxKeyLength = max([len(x) for x in allKeys])
     # Sets
     print "Sets"
-    print "A:", a, "(documents: " + str(len(docsA)) + ")"
-    print "B:", b, "(documents: " + str(len(docsB)) + ")"
+    print "A:", a, "(documents: " + str(numDocsA) + ")"
+    print "B:", b, "(documents: " + str(numDocsB) + ")"
     # Make title
     titleLine = "Category"
     while len(titleLine) <= maxKeyLength:
@@ -61,11 +80,11 @@ def compare(a, b, a2Tag="a2"):
         line = key
         while len(line) <= maxKeyLength:
             line += " "
-        valA = (countsA[key] / float(len(docsA)))
+        valA = getAverage(countsA[key], numDocsA)
         line += "%.2f" % valA
         while len(line) <= maxKeyLength + 10:
             line += " "
-        valB = (countsB[key] / float(len(docsB)))
+        valB = getAverage(countsB[key], numDocsB)
         line += "%.2f" % valB
         # Diff
         while len(line) <= maxKeyLength + 20:
@@ -101,8 +120,6 @@ def compare(a, b, a2Tag="a2"):
         print line
 
 if __name__=="__main__":
-    import sys
-    
     from optparse import OptionParser
     # Import Psyco if available
     try:
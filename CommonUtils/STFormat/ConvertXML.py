@@ -246,7 +246,7 @@ def toSTFormat(input, output=None, outputTag="a2", useOrigIds=False, debug=False
             tail = sentence.get("tail")
             if tail != None:
                 stDoc.text += tail
-            sentenceOffset = Range.charOffsetToSingleTuple(sentence.get("charOffset"))
+            sentenceOffset = Range.getElementSingleTuple(sentence)
             sentenceOffsets[sentence.get("id")] = sentenceOffset
             if stDoc.id == None:
                 stDoc.id = sentence.get("origId").rsplit(".", 1)[0]
@@ -256,7 +256,7 @@ def toSTFormat(input, output=None, outputTag="a2", useOrigIds=False, debug=False
             if eType == "neg":
                 continue
             entityElementMap[entity.get("id")] = entity
-            entityOffset = Range.charOffsetToSingleTuple(entity.get("charOffset"))
+            entityOffset = Range.getElementSingleTuple(entity)
             ann = Annotation()
             ann.type = eType
             if useOrigIds:
@@ -339,8 +339,8 @@ def toSTFormat(input, output=None, outputTag="a2", useOrigIds=False, debug=False
                 event = Annotation()
                 event.trigger = None # triggerless event (same as relation)
                 event.type = eventType
-                event.arguments.append([arg1Type, interaction.get("e1"), None])
-                event.arguments.append([arg2Type, interaction.get("e2"), None])
+                event.arguments.append(Argument(arg1Type, interaction.get("e1")))
+                event.arguments.append(Argument(arg2Type, interaction.get("e2")))
                 if event.arguments[0][0] == "SiteArg": # convert back to actual sites
                     event.arguments[0][0] = "Site"
                 if event.arguments[1][0] == "SiteArg": # convert back to actual sites
@@ -365,7 +365,7 @@ def toSTFormat(input, output=None, outputTag="a2", useOrigIds=False, debug=False
                             event = Annotation()
                             event.trigger = tMap[interaction.get("e1")]
                             event.type = event.trigger.type
-                            if hasattr(event.trigger, "eventId"):
+                            if event.trigger.eventId != None:
                                 event.id = event.trigger.eventId 
                             eMap[e1] = event
                             if entityElementMap[e1].get("speculation") == "True":
@@ -376,7 +376,7 @@ def toSTFormat(input, output=None, outputTag="a2", useOrigIds=False, debug=False
                         else:
                             event = None
                     if event != None:
-                        arg = [interaction.get("type"), interaction.get("e2"), None]
+                        arg = Argument(interaction.get("type"), interaction.get("e2"))
                         if arg[0] == "SiteArg": # convert back to actual sites
                             arg[0] = "Site"
                         event.arguments.append(arg)
@@ -387,21 +387,21 @@ def toSTFormat(input, output=None, outputTag="a2", useOrigIds=False, debug=False
                 e2 = interaction.get("e2")
                 #assert rel.type == "Protein-Component" or rel.type == "Subunit-Complex" or rel.type == "Renaming", (rel.type, stDoc.id, interaction.get("id"))
                 if rel.type == "Protein-Component" or rel.type == "Subunit-Complex": 
-                    rel.arguments.append(["Arg1", tMap[e1], None])
-                    rel.arguments.append(["Arg2", tMap[e2], None])
+                    rel.arguments.append(Argument("Arg1", tMap[e1]))
+                    rel.arguments.append(Argument("Arg2", tMap[e2]))
                 elif rel.type == "Renaming":
-                    rel.arguments.append(["Former", tMap[e1], None])
-                    rel.arguments.append(["New", tMap[e2], None])
+                    rel.arguments.append(Argument("Former", tMap[e1]))
+                    rel.arguments.append(Argument("New", tMap[e2]))
                 elif rel.type == "Coref":
-                    rel.arguments.append(["Anaphora", tMap[e1], None])
-                    rel.arguments.append(["Antecedent", tMap[e2], None])
+                    rel.arguments.append(Argument("Anaphora", tMap[e1]))
+                    rel.arguments.append(Argument("Antecedent", tMap[e2]))
                     # Add protein arguments'
                     if corefProtMap.has_key(e2):
                         for prot in corefProtMap[e2]:
-                            rel.arguments.append(["Target", prot, None])
+                            rel.arguments.append(Argument("Target", prot))
                 elif rel.type.startswith("SR-"):
-                    rel.arguments.append(["Arg1", tMap[e1], None])
-                    rel.arguments.append(["Arg2", tMap[e2], None])
+                    rel.arguments.append(Argument("Arg1", tMap[e1]))
+                    rel.arguments.append(Argument("Arg2", tMap[e2]))
                 else:
                     assert False, (rel.type, stDoc.id, interaction.get("id"))
                 stDoc.relations.append(rel)
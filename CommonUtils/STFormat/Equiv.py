@@ -102,7 +102,7 @@ def makeEvent(model, argCombination, count, newEvent = None, finished=False, dup
         if arg[1].id[0] != "E": # not a nested event
             # Non-event arguments never need to be duplicated
             if not finished:
-                newEvent.arguments.append([arg[0], argCombination[0], arg[2]])
+                newEvent.arguments.append(Argument(arg[0], argCombination[0], arg[2]))
             argCombination.pop(0) # pop first (depth-first iteration)
             if debug: print level * " ", "SIMP", model.id, [x[1].id for x in model.arguments], "/", arg[1].id, argCombination, "/", newEvent, newEvent.arguments
         else: # is a nested event
@@ -113,7 +113,7 @@ def makeEvent(model, argCombination, count, newEvent = None, finished=False, dup
                     duplId = arg[1].id + ".d" + str(count)
                     #duplId = arg[1].id.split(".d")[0] + ".d" + str(count)
                     if duplId not in duplDict:
-                        newArg = [arg[0], copy.copy(argCombination[0]), None] # Make a new event
+                        newArg = Argument(arg[0], copy.copy(argCombination[0])) # Make a new event
                         createdEvents.append(newArg[1])
                         argCombination.pop(0) # pop first (depth-first iteration)
                         newArg[1].arguments = [] # reset the argument list of the copy
@@ -123,7 +123,7 @@ def makeEvent(model, argCombination, count, newEvent = None, finished=False, dup
                         if debug: print level * " ", "NEST(new)", model.id, [x[1].id for x in model.arguments], "/", arg[1].id, argCombination, "/", newEvent, newEvent.arguments
                         createdEvents += makeEvent(arg[1], argCombination, count, newArg[1], finished, duplDict, level=level+1, debug=debug) # Continue processing with next level of model and copy
                     else:
-                        newArg = [arg[0], duplDict[duplId], None]
+                        newArg = Argument(arg[0], duplDict[duplId])
                         argCombination.pop(0) # pop first (depth-first iteration)
                         #newEvent.arguments.append(duplDict[duplId]) # add to parent copy
                         newEvent.arguments.append(newArg) # add to parent copy
@@ -17,17 +17,81 @@ import Validate
 #            return 1
 #    return 0 
 
-class Document:
+# Annotations are held by the million in corpus-wide conversions, so
+# the classes use __slots__ instead of a per-instance __dict__. Pickling
+# a class with __slots__ requires __getstate__ and __setstate__.
+def getSlotState(obj):
+    return [getattr(obj, x) for x in obj.__slots__]
+
+def setSlotState(obj, state):
+    for name, value in zip(obj.__slots__, state):
+        setattr(obj, name, value)
+
+class Document(object):
+    __slots__ = ("id", "text", "proteins", "words", "dependencies", "triggers", "events", "relations", "dataSet")
+    
     def __init__(self):
         self.id = None
         self.text = None
         self.proteins = []
+        self.words = []
+        self.dependencies = []
         self.triggers = []
         self.events = []
         self.relations = []
         self.dataSet = None
+    
+    __getstate__ = getSlotState
+    __setstate__ = setSlotState
+
+class Argument(object):
+    """
+    An argument of an event, relation or dependency. The target (and the
+    site) are ids when read, and annotations when linked. An argument can
+    be indexed and assigned to like the [type, target, site] lists it
+    replaces.
+    """
+    __slots__ = ("type", "target", "site")
+    
+    def __init__(self, type, target, site=None):
+        self.type = type
+        self.target = target
+        self.site = site
+    
+    def __getitem__(self, index):
+        return (self.type, self.target, self.site)[index]
+    
+    def __setitem__(self, index, value):
+        setattr(self, self.__slots__[index], value)
+    
+    def __len__(self):
+        return 3
+    
+    def __iter__(self):
+        return iter((self.type, self.target, self.site))
+    
+    def __eq__(self, other):
+        if not isinstance(other, Argument):
+            return False
+        return self.type == other.type and self.target == other.target and self.site == other.site
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    # Arguments are mutable (the loaders link their targets in place), so
+    # they can't be used in sets or as dictionary keys
+    __hash__ = None
+    
+    def __repr__(self):
+        return repr((self.type, self.target, self.site))
+    
+    __getstate__ = getSlotState
+    __setstate__ = setSlotState
 
-class Annotation:
+class Annotation(object):
+    __slots__ = ("id", "type", "text", "charBegin", "charEnd", "alternativeOffsets", "equiv", 
+                 "trigger", "arguments", "sites", "speculation", "negation", "fileType", "eventId")
+    
     def __init__(self, id = None, type = None, text=None, trigger=None, arguments=None):
         self.id = id # protein/word/dependency/trigger/event
         self.type = type # protein/word/dependency/trigger/event
@@ -44,6 +108,10 @@ class Annotation:
         self.speculation = None # event 
         self.negation = None # event
         self.fileType = None # "a1" or "a2"
+        self.eventId = None # trigger of a numbered, but triggerless event
+    
+    __getstate__ = getSlotState
+    __setstate__ = setSlotState
     
     def isNegated(self):
         return self.negation != None
@@ -86,7 +154,11 @@ def readTAnnotation(string):
             skip = not skip
     return ann
 
-def readStarAnnotation(string, proteins):
+def readStarAnnotation(string, proteins, protMap=None):
+    """
+    Keyword arguments:
+    protMap -- (dictionary) the proteins by id. If None, built from proteins.
+    """
     assert string[0] == "*", string
     string = string.strip()
     star, rest = string.split("\t")
@@ -98,9 +170,10 @@ def readStarAnnotation(string, proteins):
         entities = splits[1:] 
         equivs.append( entities )
     if len(equivs) > 0:
-        protMap = {}
-        for protein in proteins:
-            protMap[protein.id] = protein
+        if protMap == None:
+            protMap = {}
+            for protein in proteins:
+                protMap[protein.id] = protein
         for equiv in equivs:
             for member in equiv:
                 for other in equiv:
@@ -132,23 +205,24 @@ def readEvent(string, sitesAreArguments=False):
         # (didn't check), have also actual Sites.
         if sitesAreArguments or argTuple[0].find("Site") == -1 or ann.type == "SiteOf": # not a site or SiteOf-type event
             origArgName = argTuple[0]
-            if argTuple[0].find("Theme") != -1: # multiple themes are numbered
-                argTuple = ["Theme", argTuple[1], None]
+            argument = Argument(argTuple[0], argTuple[1])
+            if argument.type.find("Theme") != -1: # multiple themes are numbered
+                argument.type = "Theme"
             assert origArgName != "" # extra whitespace caused errors with splitting, splitting fixed
-            argMap[origArgName] = argTuple
-            ann.arguments.append( argTuple )
-            if "Site" in argTuple[0]:
-                assert argTuple[0] == "Site"
-                argTuple[0] = "SiteArg"
+            argMap[origArgName] = argument
+            ann.arguments.append( argument )
+            if "Site" in argument.type:
+                assert argument.type == "Site"
+                argument.type = "SiteArg"
     #print argMap
     if len(argMap.keys()) != len(args): # We have sites
         for arg in args:
             argTuple = arg.split(":") + []
             if argTuple[0].find("Site") != -1:
                 if argTuple[0] == "CSite":
-                    argMap["Cause"][2] = argTuple[1]
+                    argMap["Cause"].site = argTuple[1]
                 else:
-                    argMap[ "Theme" + argTuple[0][4:] ][2] = argTuple[1] 
+                    argMap[ "Theme" + argTuple[0][4:] ].site = argTuple[1] 
     return ann
 
 def readRAnnotation(string):
@@ -164,13 +238,13 @@ def readRAnnotation(string):
     for arg in args:
         argTuple = arg.split(":") + [None]
         #assert argTuple[0].find("Arg") != -1, (string, argTuple)
-        ann.arguments.append( (argTuple[0], argTuple[1], None) )
+        ann.arguments.append( Argument(argTuple[0], argTuple[1]) )
     if len(tabSplits) == 3:
         assert ann.type == "Coref"
         assert tabSplits[2][0] == "[" and tabSplits[2][-1] == "]", (string, tabSplits)
         protIds = tabSplits[2][1:-1].split(",")
         for protId in protIds:
-            ann.arguments.append( ("Connected", protId.strip(), None) )
+            ann.arguments.append( Argument("Connected", protId.strip()) )
     return ann
 
 def readDependencyAnnotation(string):
@@ -180,34 +254,45 @@ def readDependencyAnnotation(string):
     ann = Annotation()
     ann.id = id
     ann.type = depType
-    ann.arguments = [("Word", word1), ("Word", word2)]
+    ann.arguments = [Argument("Word", word1), Argument("Word", word2)]
     return ann
 
-def loadA1(filename):
-    f = open(filename)
-    proteins = []
-    words = []
-    dependencies = []
-    lines = f.readlines()
-    count = 0
-    for line in lines:
-        if line[0] == "T":
-            proteins.append(readTAnnotation(line))
-            count += 1
-    for line in lines:
-        if line[0] == "*":
-            readStarAnnotation(line, proteins)
-            count += 1
-    for line in lines:
-        if line[0] == "W":
-            words.append(readTAnnotation(line))
-            count += 1
+def readLines(input, prefixes):
+    """
+    Reads the lines of an annotation file in a single pass into lists by
+    their first character, keeping the file order within each list.
+    
+    Keyword arguments:
+    input -- (string) file name, or (list) the lines of the file
+    prefixes -- (string) the allowed first characters
+    """
+    linesByPrefix = {}
+    for prefix in prefixes:
+        linesByPrefix[prefix] = []
+    if isinstance(input, basestring):
+        f = open(input)
+        lines = f.readlines()
+        f.close()
+    else:
+        lines = input
     for line in lines:
-        if line[0] == "R": # in a1-files, "R" refers to dependencies
-            dependencies.append(readDependencyAnnotation(line))
-            count += 1
-    assert count == len(lines), lines # check that all lines were processed
-    f.close()
+        # check that all lines can be processed
+        assert linesByPrefix.has_key(line[:1]), lines
+        linesByPrefix[line[0]].append(line)
+    return linesByPrefix
+
+def loadA1(filename):
+    linesByPrefix = readLines(filename, "T*WR")
+    proteins = [readTAnnotation(line) for line in linesByPrefix["T"]]
+    if len(linesByPrefix["*"]) > 0:
+        protMap = {}
+        for protein in proteins:
+            protMap[protein.id] = protein
+        for line in linesByPrefix["*"]:
+            readStarAnnotation(line, proteins, protMap)
+    words = [readTAnnotation(line) for line in linesByPrefix["W"]]
+    # in a1-files, "R" refers to dependencies
+    dependencies = [readDependencyAnnotation(line) for line in linesByPrefix["R"]]
     # Mark source file type
     for ann in proteins + words + dependencies:
         ann.fileType = "a1"
@@ -217,52 +302,36 @@ def loadA1(filename):
         for word in words:
             wordMap[word.id] = word
         for dep in dependencies:
-            for i in range(len(dep.arguments)):
-                arg = dep.arguments[i]
-                dep.arguments[i] = (arg[0], wordMap[arg[1]])
+            for arg in dep.arguments:
+                arg.target = wordMap[arg.target]
     return proteins, words, dependencies
 
 def loadRelOrA2(filename, proteins, sitesAreArguments=False):
-    f = open(filename)
+    linesByPrefix = readLines(filename, "TERM*")
     triggers = []
     triggerMap = {}
     for protein in proteins:
         triggerMap[protein.id] = protein
+    for line in linesByPrefix["T"]:
+        triggers.append( readTAnnotation(line) )
+        triggerMap[triggers[-1].id] = triggers[-1]
     events = []
     eventMap = {}
-    relations = []
-    lines = f.readlines()
-    f.close()
-    count = 0
-    for line in lines:
-        if line[0] == "T":
-            triggers.append( readTAnnotation(line) )
-            triggerMap[triggers[-1].id] = triggers[-1]
-            count += 1
-    for line in lines:
-        if line[0] == "E":
-            events.append( readEvent(line, sitesAreArguments) )
-            eventMap[events[-1].id] = events[-1]
-            count += 1
-    for line in lines:
-        if line[0] == "R":
-            relations.append(readRAnnotation(line))
-            count += 1
-    for line in lines:
-        if line[0] == "M":
-            mId, rest = line.split("\t")
-            mType, eventId = rest.split()
-            assert mType in ["Speculation", "Negation"]
-            if mType == "Speculation":
-                eventMap[eventId].speculation = mId
-            elif mType == "Negation":
-                eventMap[eventId].negation = mId
-            count += 1
-    for line in lines:
-        if line[0] == "*":
-            readStarAnnotation(line, proteins + triggers)
-            count += 1
-    assert count == len(lines), lines # check that all lines were processed
+    for line in linesByPrefix["E"]:
+        events.append( readEvent(line, sitesAreArguments) )
+        eventMap[events[-1].id] = events[-1]
+    relations = [readRAnnotation(line) for line in linesByPrefix["R"]]
+    for line in linesByPrefix["M"]:
+        mId, rest = line.split("\t")
+        mType, eventId = rest.split()
+        assert mType in ["Speculation", "Negation"]
+        if mType == "Speculation":
+            eventMap[eventId].speculation = mId
+        elif mType == "Negation":
+            eventMap[eventId].negation = mId
+    for line in linesByPrefix["*"]:
+        # the trigger map has the proteins and the triggers
+        readStarAnnotation(line, None, triggerMap)
     
     # Mark source file type
     for ann in triggers + events + relations:
@@ -272,30 +341,28 @@ def loadRelOrA2(filename, proteins, sitesAreArguments=False):
         #print event.id
         if event.trigger != None:
             event.trigger = triggerMap[event.trigger]
-        for i in range(len(event.arguments)):
-            arg = event.arguments[i]
-            if arg[1][0] == "T":
-                if arg[2] != None:
-                    event.arguments[i] = (arg[0], triggerMap[arg[1]], triggerMap[arg[2]])
-                else:
-                    event.arguments[i] = (arg[0], triggerMap[arg[1]], None)
-            elif arg[1][0] == "E":
-                assert arg[2] == None # no sites on events
-                event.arguments[i] = (arg[0], eventMap[arg[1]], None)
+        for arg in event.arguments:
+            if arg.target[0] == "T":
+                if arg.site != None:
+                    arg.site = triggerMap[arg.site]
+                arg.target = triggerMap[arg.target]
+            elif arg.target[0] == "E":
+                assert arg.site == None # no sites on events
+                arg.target = eventMap[arg.target]
     # Build links
     for relation in relations:
-        for i in range(len(relation.arguments)):
-            arg = relation.arguments[i]
-            if arg[1][0] == "T":
-                if arg[2] != None:
-                    relation.arguments[i] = (arg[0], triggerMap[arg[1]], triggerMap[arg[2]])
+        for arg in relation.arguments:
+            if arg.target[0] == "T":
+                if arg.site != None:
+                    arg.site = triggerMap[arg.site]
+                    arg.target = triggerMap[arg.target]
                 else:
 #                    if not triggerMap.has_key(arg[1]): # NOTE! hack for CO bugs
 #                        relation.arguments = relation.arguments[0:i]
 #                        if len(relation.arguments) == 1: # NOTE! hack
 #                            relations = []
 #                        break
-                    relation.arguments[i] = (arg[0], triggerMap[arg[1]], None)
+                    arg.target = triggerMap[arg.target]
 
     return triggers, events, relations
 
@@ -308,76 +375,342 @@ def loadText(filename):
 def load(id, dir, loadA2=True, sitesAreArguments=False, a2Tag="a2"):
     #print id
     id = str(id)
+    files = {}
     a1Path = os.path.join(dir, id + ".a1")
     if os.path.exists(a1Path):
-        proteins, words, dependencies = loadA1(a1Path)
+        files["a1"] = a1Path
+    if loadA2:
+        a2Path = os.path.join(dir, id + "." + a2Tag)
+        relPath = os.path.join(dir, id + ".rel")
+        if os.path.exists(a2Path):
+            files[a2Tag] = a2Path
+        elif os.path.exists(relPath):
+            files["rel"] = relPath
+    return loadFiles(files, loadA2, sitesAreArguments, a2Tag)
+
+def loadFiles(files, loadA2=True, sitesAreArguments=False, a2Tag="a2"):
+    """
+    Keyword arguments:
+    files -- (dictionary) file name, or the lines of the file, by file extension
+    """
+    if files.has_key("a1"):
+        proteins, words, dependencies = loadA1(files["a1"])
     else:
         proteins = []
         words = []
         dependencies = []
     if not loadA2:
         return proteins, [], [], [], [], []
-    a2Path = os.path.join(dir, id + "." + a2Tag)
-    relPath = os.path.join(dir, id + ".rel")
     triggers = []
     events = []
     relations = []
-    if os.path.exists(a2Path):
-        triggers, events, relations = loadRelOrA2(a2Path, proteins, sitesAreArguments)
-    elif os.path.exists(relPath):
-        triggers, events, relations = loadRelOrA2(relPath, proteins, sitesAreArguments)
+    if files.has_key(a2Tag):
+        triggers, events, relations = loadRelOrA2(files[a2Tag], proteins, sitesAreArguments)
+    elif files.has_key("rel"):
+        triggers, events, relations = loadRelOrA2(files["rel"], proteins, sitesAreArguments)
     return proteins, words, dependencies, triggers, events, relations
 
-def loadSet(dir, setName=None, level="a2", sitesAreArguments=False, a2Tag="a2"):
-    assert level in ["txt", "a1", "a2"]
+class DocumentError(Exception):
+    """
+    Raised when processing some of the documents of a set in a pool of
+    threads fails. With a single worker the original exception of the
+    first failing document is raised instead.
+    
+    Keyword arguments:
+    errors -- (list) (document id, exception) tuples of the failed documents
+    """
+    def __init__(self, message, errors):
+        Exception.__init__(self, message)
+        self.errors = errors
+
+def checkDocumentError(error, documentId, errors, workers):
+    """
+    Handles an error returned by mapDocuments. With a single worker the
+    original exception is re-raised, otherwise the traceback is printed
+    and the error stored so processing can continue with the other documents.
+    """
+    if workers == 1:
+        raise error[0], error[1], error[2]
+    import traceback
+    print >> sys.stderr, "".join(traceback.format_exception(*error))
+    errors.append( (documentId, error[1]) )
+
+def raiseDocumentErrors(errors, action, location):
+    if len(errors) > 0:
+        raise DocumentError("Exception " + action + " " + str(len(errors)) + " documents " + str(location) + ": " + ", ".join([x[0] for x in errors]), errors)
+
+def mapDocuments(func, jobs, workers=1):
+    """
+    Calls func for each job, in a pool of threads if workers > 1. Reading
+    and writing the many small files of a set is bound by the latency of
+    the file system (especially on network file systems), so the threads
+    can overlap it. At most 2 * workers jobs are pending at a time.
+    
+    Keyword arguments:
+    workers -- (int) number of threads. If 0 or None, one per core.
+    
+    Returns:
+    An iterator of (job, result, error) tuples in the order of the jobs,
+    where error is the sys.exc_info() of the exception if func raised one.
+    """
+    if workers == None or workers == 0:
+        from multiprocessing import cpu_count
+        workers = cpu_count()
+    def callFunc(job):
+        try:
+            return func(job), None
+        except Exception:
+            return None, sys.exc_info()
+    if workers <= 1:
+        for job in jobs:
+            result, error = callFunc(job)
+            yield job, result, error
+        return
+    from multiprocessing.pool import ThreadPool
+    from collections import deque
+    pool = ThreadPool(workers)
+    pending = deque()
+    jobs = iter(jobs)
+    try:
+        while True:
+            while len(pending) < 2 * workers:
+                job = next(jobs, None)
+                if job == None:
+                    break
+                pending.append( (job, pool.apply_async(callFunc, (job,))) )
+            if len(pending) == 0:
+                break
+            job, asyncResult = pending.popleft()
+            result, error = asyncResult.get()
+            yield job, result, error
+    finally:
+        pool.close()
+        pool.join()
+
+def getDocumentIds(dir):
     ids = set()
-    documents = []
     for filename in os.listdir(dir):
         if filename.find("tar.gz") != -1:
             continue
         if filename.find(".") != -1:
             splits = filename.split(".")
             ids.add(splits[0])
-    for id in sorted(list(ids)):
-        #print "Loading", id
-        doc = Document()
-        doc.id = id
-        if not level == "txt":
-            try:
-                doc.proteins, doc.words, doc.dependencies, doc.triggers, doc.events, doc.relations = load(str(id), dir, level=="a2", sitesAreArguments, a2Tag=a2Tag)
-            except:
-                print >> sys.stderr, "Exception reading document", dir, id 
-                raise
-        doc.text = loadText( os.path.join(dir, str(id) + ".txt") )
-        doc.dataSet = setName
+    return sorted(list(ids))
+
+def loadDocument(job):
+    id, dir, setName, level, sitesAreArguments, a2Tag = job
+    doc = Document()
+    doc.id = id
+    if not level == "txt":
+        doc.proteins, doc.words, doc.dependencies, doc.triggers, doc.events, doc.relations = load(str(id), dir, level=="a2", sitesAreArguments, a2Tag=a2Tag)
+    doc.text = loadText( os.path.join(dir, str(id) + ".txt") )
+    doc.dataSet = setName
+    return doc
+
+def loadSet(dir, setName=None, level="a2", sitesAreArguments=False, a2Tag="a2", workers=1):
+    """
+    Loads the documents of a shared task format directory, sorted by id.
+    If dir is a file, it is read as a tar package (see loadPackage).
+    
+    Keyword arguments:
+    workers -- (int) number of threads reading the files (see mapDocuments).
+               With more than one, all documents are read and a DocumentError
+               is raised for the ones that failed.
+    """
+    assert level in ["txt", "a1", "a2"]
+    if os.path.isfile(dir):
+        return loadPackage(dir, setName, level, sitesAreArguments, a2Tag)
+    documents = []
+    errors = []
+    jobs = [(id, dir, setName, level, sitesAreArguments, a2Tag) for id in getDocumentIds(dir)]
+    for job, doc, error in mapDocuments(loadDocument, jobs, workers):
+        if error != None:
+            print >> sys.stderr, "Exception reading document", dir, job[0]
+            checkDocumentError(error, job[0], errors, workers)
+            continue
         documents.append(doc)
+    raiseDocumentErrors(errors, "reading", "from " + str(dir))
+    return documents
+
+def splitFileName(filename):
+    """ Returns the document id and the file extension of a file name """
+    filename = os.path.basename(filename)
+    id = filename.split(".")[0]
+    return id, filename[len(id)+1:]
+
+def loadPackage(filename, setName=None, level="a2", sitesAreArguments=False, a2Tag="a2"):
+    """
+    Loads the documents of a tar package (optionally compressed), sorted by
+    id, without extracting it. The members are read in stream order and
+    grouped by document id, and the documents are parsed in memory. The
+    members can be in subdirectories.
+    """
+    import tarfile
+    from StringIO import StringIO
+    assert level in ["txt", "a1", "a2"]
+    print >> sys.stderr, "Loading package", filename
+    extensions = set(["txt", "a1", a2Tag, "rel"])
+    files = {}
+    packageFile = tarfile.open(filename, "r|*")
+    for member in packageFile:
+        if not member.isfile():
+            continue
+        id, extension = splitFileName(member.name)
+        if id == "" or extension not in extensions:
+            continue
+        f = packageFile.extractfile(member)
+        files.setdefault(id, {})[extension] = f.read()
+        f.close()
+    packageFile.close()
+    documents = []
+    for id in sorted(files.keys()):
+        docFiles = files.pop(id)
+        try:
+            doc = Document()
+            doc.id = id
+            if not level == "txt":
+                lines = {}
+                for extension in docFiles:
+                    if extension != "txt":
+                        lines[extension] = StringIO(docFiles[extension]).readlines()
+                doc.proteins, doc.words, doc.dependencies, doc.triggers, doc.events, doc.relations = loadFiles(lines, level=="a2", sitesAreArguments, a2Tag)
+            if not docFiles.has_key("txt"):
+                raise IOError("No text file for document " + str(id))
+            doc.text = docFiles["txt"]
+            doc.dataSet = setName
+            documents.append(doc)
+        except:
+            print >> sys.stderr, "Exception reading document", filename, id
+            raise
     return documents
 
-def writeSet(documents, dir, resultFileTag="a2", makePackage=True, debug=False, task=2, validate=True):
+def writeDocument(job):
+    doc, dir, resultFileTag, debug, task, validate = job
+    from collections import defaultdict
+    counts = defaultdict(int)
+    if validate:
+        Validate.allValidate(doc, counts, task, verbose=debug)
+    #doc.proteins.sort(cmp=compareOffsets)
+    #doc.triggers.sort(cmp=compareOffsets)
+    write(doc.id, dir, doc.proteins, doc.triggers, doc.events, doc.relations, resultFileTag, counts, task=task)
+    # Write text file
+    #out = open(os.path.join(dir, str(doc.id) + ".txt"), "wt")
+    out = codecs.open(os.path.join(dir, str(doc.id) + ".txt"), "wt", "utf-8")
+    out.write(doc.text)
+    out.close()
+    return counts
+
+def writeSet(documents, dir, resultFileTag="a2", makePackage=True, debug=False, task=2, validate=True, workers=1):
+    """
+    Writes the documents into a shared task format directory, replacing it
+    if it exists. The package is written while the documents are, in their
+    original order. If dir ends with ".tar.gz", only a package with all the
+    files is written (see writePackage).
+    
+    Keyword arguments:
+    workers -- (int) number of threads validating and writing the documents
+               (see mapDocuments). With more than one, all documents are
+               written and a DocumentError is raised for the ones that failed.
+    """
+    if dir.endswith(".tar.gz"):
+        return writePackage(documents, dir, resultFileTag, debug, task, validate, workers=workers)
     from collections import defaultdict
     import shutil
     counts = defaultdict(int)
     if os.path.exists(dir):
         shutil.rmtree(dir)
+    os.makedirs(dir)
     if not validate:
         print "Warning! No validation."
-    for doc in documents:
-        if validate:
-            Validate.allValidate(doc, counts, task, verbose=debug)
-        #doc.proteins.sort(cmp=compareOffsets)
-        #doc.triggers.sort(cmp=compareOffsets)
-        write(doc.id, dir, doc.proteins, doc.triggers, doc.events, doc.relations, resultFileTag, counts, task=task)
-        # Write text file
-        #out = open(os.path.join(dir, str(doc.id) + ".txt"), "wt")
-        out = codecs.open(os.path.join(dir, str(doc.id) + ".txt"), "wt", "utf-8")
-        out.write(doc.text)
-        out.close()
+    packageFile = None
     if makePackage:
         while dir.endswith("/"):
             dir = dir[:-1]
-        package(dir, dir + ".tar.gz", [resultFileTag])
+        packageFile = openPackage(dir + ".tar.gz")
+    errors = []
+    jobs = [(doc, dir, resultFileTag, debug, task, validate) for doc in documents]
+    try:
+        for job, docCounts, error in mapDocuments(writeDocument, jobs, workers):
+            if error != None:
+                print >> sys.stderr, "Exception writing document", dir, job[0].id
+                checkDocumentError(error, str(job[0].id), errors, workers)
+                continue
+            for key in docCounts:
+                counts[key] += docCounts[key]
+            if packageFile != None:
+                addToPackage(packageFile, dir, [str(job[0].id) + "." + resultFileTag])
+    except:
+        if packageFile != None:
+            packageFile.close()
+        raise
+    if packageFile != None:
+        closePackage(packageFile, dir + ".tar.gz")
+    raiseDocumentErrors(errors, "writing", "to " + str(dir))
+    print counts
+
+def writeDocumentFiles(job):
+    doc, resultFileTag, debug, task, validate, includeTags = job
+    from collections import defaultdict
+    from StringIO import StringIO
+    counts = defaultdict(int)
+    if validate:
+        Validate.allValidate(doc, counts, task, verbose=debug)
+    if debug:
+        print doc.id
+    files = []
+    # The a1-file is formatted even if it's not included, as it renumbers the proteins
+    a1File = codecs.getwriter("utf-8")(StringIO())
+    if doc.proteins != None:
+        writeTAnnotation(doc.proteins, a1File)
+        files.append( ("a1", a1File.getvalue()) )
+    resultFile = codecs.getwriter("utf-8")(StringIO())
+    writeResult(resultFile, doc.proteins, doc.triggers, doc.events, doc.relations, counts, task)
+    files.append( (resultFileTag, resultFile.getvalue()) )
+    text = doc.text
+    if isinstance(text, unicode):
+        text = text.encode("utf-8")
+    files.append( ("txt", text) )
+    return counts, [(str(doc.id) + "." + x[0], x[1]) for x in files if x[0] in includeTags]
+
+def writePackage(documents, outputFile, resultFileTag="a2", debug=False, task=2, validate=True, includeTags=None, workers=1):
+    """
+    Writes the documents directly into a tar.gz package, without writing
+    them into a directory first.
+    
+    Keyword arguments:
+    includeTags -- (list) extensions of the files to include. By default
+                   the text, a1 and result files.
+    workers -- (int) number of threads validating and formatting the
+               documents (see mapDocuments and writeSet)
+    """
+    from collections import defaultdict
+    counts = defaultdict(int)
+    if includeTags == None:
+        includeTags = ["txt", "a1", resultFileTag]
+    if not validate:
+        print "Warning! No validation."
+    outputDir = os.path.dirname(outputFile)
+    if outputDir != "" and not os.path.exists(outputDir):
+        os.makedirs(outputDir)
+    packageFile = openPackage(outputFile)
+    errors = []
+    jobs = [(doc, resultFileTag, debug, task, validate, includeTags) for doc in documents]
+    try:
+        for job, result, error in mapDocuments(writeDocumentFiles, jobs, workers):
+            if error != None:
+                print >> sys.stderr, "Exception writing document", outputFile, job[0].id
+                checkDocumentError(error, str(job[0].id), errors, workers)
+                continue
+            for key in result[0]:
+                counts[key] += result[0][key]
+            for filename, data in result[1]:
+                addStringToPackage(packageFile, filename, data)
+    except:
+        packageFile.close()
+        raise
+    closePackage(packageFile, outputFile)
+    raiseDocumentErrors(errors, "writing", "to " + str(outputFile))
     print counts
-        
 
 def getMaxId(annotations):
     nums = [0]
@@ -570,15 +903,39 @@ def write(id, dir, proteins, triggers, events, relations, resultFileTag="a2", co
         writeTAnnotation(proteins, out)
         out.close()
     resultFile = codecs.open(os.path.join(dir, id + "." + resultFileTag), "wt", "utf-8")
-    writeTAnnotation(triggers, resultFile, getMaxId(proteins) + 1)
+    writeResult(resultFile, proteins, triggers, events, relations, counts, task)
+    resultFile.close()
+
+def writeResult(out, proteins, triggers, events, relations, counts=None, task=2):
+    """ Writes the contents of an a2-file. The proteins must have been written first. """
+    writeTAnnotation(triggers, out, getMaxId(proteins) + 1)
     if events != None:
-        writeEvents(events, resultFile, counts, task)
+        writeEvents(events, out, counts, task)
     if relations != None:
-        writeEvents(relations, resultFile, counts, task)
-    resultFile.close()
+        writeEvents(relations, out, counts, task)
 
-def package(sourceDir, outputFile, includeTags=["a2"]):
+def openPackage(outputFile):
     import tarfile
+    return tarfile.open(outputFile, "w:gz")
+
+def addToPackage(packageFile, sourceDir, filenames):
+    for filename in filenames:
+        packageFile.add(os.path.join(sourceDir, filename), filename)#, exclude = lambda x: x == submissionFileName)
+
+def addStringToPackage(packageFile, filename, data):
+    import tarfile, time
+    from StringIO import StringIO
+    info = tarfile.TarInfo(filename)
+    info.size = len(data)
+    info.mtime = time.time()
+    packageFile.addfile(info, StringIO(data))
+
+def closePackage(packageFile, outputFile):
+    if "final" in outputFile:
+        packageFile.add("/home/jari/data/BioNLP11SharedTask/resources/questionnaire.txt", "questionnaire.txt")
+    packageFile.close()
+
+def package(sourceDir, outputFile, includeTags=["a2"]):
     allFiles = os.listdir(sourceDir)
     tarFiles = []
     for file in allFiles:
@@ -586,16 +943,133 @@ def package(sourceDir, outputFile, includeTags=["a2"]):
             if file.endswith(tag):
                 tarFiles.append(file)
                 break
-    packageFile = tarfile.open(outputFile, "w:gz")
-    tempCwd = os.getcwd()
-    os.chdir(sourceDir)
-    for file in tarFiles:
-        packageFile.add(file)#, exclude = lambda x: x == submissionFileName)
-    if "final" in outputFile:
-        packageFile.add("/home/jari/data/BioNLP11SharedTask/resources/questionnaire.txt", "questionnaire.txt")
-    os.chdir(tempCwd)
-    packageFile.close()
+    packageFile = openPackage(outputFile)
+    addToPackage(packageFile, sourceDir, tarFiles)
+    closePackage(packageFile, outputFile)
         
+def benchmarkLoad(dir, repeats=5, level="a2", a2Tag="a2", workers=1):
+    """
+    Times loadSet on a shared task format directory. Returns the best time
+    in seconds.
+    """
+    import time
+    times = []
+    for i in range(repeats):
+        startTime = time.time()
+        documents = loadSet(dir, level=level, a2Tag=a2Tag, workers=workers)
+        times.append(time.time() - startTime)
+    counts = {"proteins":0, "triggers":0, "events":0, "relations":0}
+    for doc in documents:
+        for key in counts:
+            counts[key] += len(getattr(doc, key))
+    print >> sys.stderr, "Loaded", len(documents), "documents", counts, "from", dir, "with", workers, "workers"
+    print >> sys.stderr, "Best of", repeats, "loads: %.3f s" % min(times), "(mean %.3f s)" % (sum(times) / len(times))
+    return min(times)
+
+def getMemoryUsage(obj):
+    """
+    The approximate size in bytes of an object and all the objects it
+    refers to (sys.getsizeof), counting shared objects once.
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while len(stack) > 0:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, basestring):
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for name in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, name):
+                    stack.append(getattr(obj, name))
+    return total
+
+class DictDocument:
+    """ Document as it was before __slots__, see toDictClasses """
+    pass
+
+class DictAnnotation:
+    """ Annotation as it was before __slots__, see toDictClasses """
+    pass
+
+def toDictClasses(documents):
+    """
+    Copies the documents into DictDocument and DictAnnotation instances,
+    which have a per-instance __dict__ like the classes had before
+    __slots__. The arguments are lists (events), 3-tuples (relations) and
+    2-tuples (dependencies) as before the Argument records. The copies are
+    only for comparing the memory use of the old and the current classes
+    on the same data (see benchmarkMemory).
+    """
+    names = ["proteins", "words", "dependencies", "triggers", "events", "relations"]
+    copies = []
+    for doc in documents:
+        docCopy = DictDocument()
+        for name in Document.__slots__:
+            setattr(docCopy, name, getattr(doc, name))
+        copyById = {}
+        for name in names:
+            setattr(docCopy, name, [])
+            for ann in getattr(doc, name):
+                annCopy = DictAnnotation()
+                for slot in Annotation.__slots__:
+                    if slot != "eventId" or ann.eventId != None: # was set only when needed
+                        setattr(annCopy, slot, getattr(ann, slot))
+                copyById[id(ann)] = annCopy
+                getattr(docCopy, name).append(annCopy)
+        getCopy = lambda x: copyById.get(id(x), x) # unlinked targets are ids
+        for name in names:
+            for ann, annCopy in zip(getattr(doc, name), getattr(docCopy, name)):
+                annCopy.trigger = getCopy(ann.trigger)
+                annCopy.equiv = [getCopy(x) for x in ann.equiv]
+                annCopy.sites = [getCopy(x) for x in ann.sites]
+                if name == "dependencies":
+                    annCopy.arguments = [(x.type, getCopy(x.target)) for x in ann.arguments]
+                elif name == "relations":
+                    annCopy.arguments = [(x.type, getCopy(x.target), getCopy(x.site)) for x in ann.arguments]
+                else:
+                    annCopy.arguments = [[x.type, getCopy(x.target), getCopy(x.site)] for x in ann.arguments]
+        copies.append(docCopy)
+    return copies
+
+def benchmarkMemory(dir, level="a2", a2Tag="a2", compareOld=False):
+    """
+    Measures the memory used by the documents of a shared task format
+    directory. Returns the size in bytes.
+    
+    Keyword arguments:
+    compareOld -- (boolean) also measure the documents copied into the
+                  classes as they were before __slots__ (see toDictClasses)
+    """
+    documents = loadSet(dir, level=level, a2Tag=a2Tag)
+    numAnnotations = 0
+    numArguments = 0
+    for doc in documents:
+        for annotations in [doc.proteins, doc.words, doc.dependencies, doc.triggers, doc.events, doc.relations]:
+            numAnnotations += len(annotations)
+            for ann in annotations:
+                numArguments += len(ann.arguments)
+    print >> sys.stderr, "Loaded", len(documents), "documents with", numAnnotations, "annotations and", numArguments, "arguments from", dir
+    textSize = getMemoryUsage([doc.text for doc in documents])
+    measurements = [("Memory used", documents)]
+    if compareOld:
+        measurements.append( ("Memory used by the old classes", toDictClasses(documents)) )
+    sizes = []
+    for title, measured in measurements:
+        sizes.append(getMemoryUsage(measured))
+        print >> sys.stderr, title + ": %.1f MB" % (sizes[-1] / 1048576.0), "(%.1f MB without the texts," % ((sizes[-1] - textSize) / 1048576.0), 
+        print >> sys.stderr, "%.0f bytes per annotation)" % (float(sizes[-1] - textSize) / max(numAnnotations, 1))
+    return sizes[0]
+
 if __name__=="__main__":
     # Import Psyco if available
     try:
@@ -605,12 +1079,28 @@ if __name__=="__main__":
     except ImportError:
         print >> sys.stderr, "Psyco not installed"
     
+    from optparse import OptionParser
+    optparser = OptionParser(usage="%prog [options]\nLoad (and write) a shared task format directory.")
+    optparser.add_option("-i", "--input", default="/home/jari/data/BioNLP09SharedTask/bionlp09_shared_task_development_data_rev1", dest="input", help="Shared task format directory")
+    optparser.add_option("-o", "--output", default=None, dest="output", help="Output directory")
+    optparser.add_option("-w", "--workers", default=1, type="int", dest="workers", help="Number of threads reading and writing the files (0 for one per core)")
+    optparser.add_option("-m", "--memory", default=False, action="store_true", dest="memory", help="Measure the memory used by the loaded input")
+    optparser.add_option("-c", "--compareOld", default=False, action="store_true", dest="compareOld", help="With -m, also measure the memory used by the classes before __slots__")
+    optparser.add_option("-b", "--benchmark", default=0, type="int", dest="benchmark", help="Time loading the input this many times")
+    (options, args) = optparser.parse_args()
+    
     #proteins, triggers, events = load(1335418, "/home/jari/biotext/tools/TurkuEventExtractionSystem-1.0/data/evaluation-data/evaluation-tools-devel-gold")
     #write(1335418, "/home/jari/data/temp", proteins, triggers, events )
     
-    p = "/home/jari/data/BioNLP09SharedTask/bionlp09_shared_task_development_data_rev1"
-    documents = loadSet(p)
-    writeSet(documents, "/home/jari/data/temp/testSTTools")
+    if options.memory:
+        benchmarkMemory(options.input, compareOld=options.compareOld)
+    elif options.benchmark > 0:
+        benchmarkLoad(options.input, options.benchmark, workers=options.workers)
+    else:
+        documents = loadSet(options.input, workers=options.workers)
+        if options.output == None:
+            options.output = "/home/jari/data/temp/testSTTools"
+        writeSet(documents, options.output, workers=options.workers)
     
 
 
@@ -16,49 +16,53 @@ def compareEvents(e1, e2):
         return False
 
 def removeDuplicates(events):
-    numRemoved = 1
-    totalRemoved = 0
-    # Since removed events cause nesting events' arguments to be remapped, 
-    # some of these nesting events may in turn become duplicates. Loop until
-    # all such duplicates are removed.
-    while(numRemoved > 0):
-        # Group duplicate events
-        duplGroups = {}
-        isDuplicate = {}
-        for i in range(len(events)-1):
-            e1 = events[i]
-            duplGroups[e1] = [] # "same as e1"
-            # Check all other events against e1
-            for j in range(i+1, len(events)):
-                e2 = events[j]
-                if compareEvents(e1, e2):
-                    if e2 not in isDuplicate: # else already added to a duplGroup
-                        isDuplicate[e2] = True
-                        duplGroups[e1].append(e2)
-        # Mark events for keeping or removal
-        replaceWith = {}
-        toRemove = set()
-        for mainEvent, duplGroup in duplGroups.iteritems():
-            if len(duplGroup) == 0:
-                continue
-            # Mark for removal or preservation
-            for event in duplGroup:
-                assert event not in replaceWith
-                replaceWith[event] = mainEvent
-                toRemove.add(event)    
-        # Remove events and remap arguments
-        kept = []
-        for event in events:
-            if event not in toRemove:
-                for arg in event.arguments:
-                    if arg[1] in replaceWith:
-                        assert arg[2] == None
-                        arg[1] = replaceWith[arg[1]]
-                kept.append(event)
-        numRemoved = len(events) - len(kept)
-        totalRemoved += numRemoved
-        events = kept
-    return events
+    """
+    Removes events with the same type, trigger and arguments (see
+    compareEvents) as an earlier event, and remaps the arguments of the
+    remaining events from the removed ones to the kept ones.
+    
+    Since removed events cause nesting events' arguments to be remapped,
+    some of these nesting events may in turn become duplicates. Instead of
+    comparing all event pairs until no more duplicates are found, each
+    event gets a key, where its nested event arguments are replaced by the
+    keys of their groups of duplicates. The keys are computed bottom-up over
+    the nesting, so each event is processed once.
+    """
+    eventSet = set(events)
+    groupIds = {} # event to the id of its group of duplicates
+    groupIdsByKey = {}
+    def getGroupId(event, inProgress):
+        if groupIds.has_key(event):
+            return groupIds[event]
+        inProgress.add(event)
+        argKeys = []
+        for arg in event.arguments:
+            argTarget = arg[1]
+            if argTarget in eventSet and argTarget not in inProgress: # nested event (not in a cycle)
+                argTarget = ("group", getGroupId(argTarget, inProgress))
+            argKeys.append( (arg[0], argTarget, arg[2]) )
+        inProgress.remove(event)
+        key = (event.type, event.trigger, tuple(argKeys))
+        if not groupIdsByKey.has_key(key):
+            groupIdsByKey[key] = len(groupIdsByKey)
+        groupIds[event] = groupIdsByKey[key]
+        return groupIds[event]
+    # Keep the first event of each group
+    keptByGroupId = {}
+    for event in events:
+        groupId = getGroupId(event, set())
+        if not keptByGroupId.has_key(groupId):
+            keptByGroupId[groupId] = event
+    # Remove events and remap arguments
+    kept = []
+    for event in events:
+        if keptByGroupId[groupIds[event]] == event:
+            for arg in event.arguments:
+                if arg[1] in eventSet and keptByGroupId[groupIds[arg[1]]] != arg[1]:
+                    assert arg[2] == None
+                    arg[1] = keptByGroupId[groupIds[arg[1]]]
+            kept.append(event)
+    return kept
 
 def getBISuperType(eType):
     if eType in ["GeneProduct", "Protein", "ProteinFamily", "PolymeraseComplex"]:
@@ -0,0 +1,156 @@
+"""
+Interval index for character offsets.
+"""
+__version__ = "$Revision: 1.1 $"
+
+import bisect
+import Range
+
+class SpanIndex:
+    """
+    An index of character spans, each with an associated value (f.e. the
+    element the span belongs to). Spans are inclusive (begin, end) tuples,
+    as in Range.py.
+
+    The spans are kept sorted by their beginning as an implicit balanced
+    binary tree, where each node stores the largest end of its subtree.
+    Overlap queries visit only subtrees that can contain matches, so they
+    take O(log n + k) time for k matches. Spans starting or ending at a
+    given position are found through dictionaries.
+
+    Items are numbered in the order they were added, and all queries
+    return matches in this order.
+    """
+    def __init__(self, spans=None, values=None):
+        self.spans = []
+        self.values = []
+        self.built = False
+        if spans != None:
+            for i in range(len(spans)):
+                if values != None:
+                    self.add(spans[i], values[i])
+                else:
+                    self.add(spans[i])
+
+    def __len__(self):
+        return len(self.spans)
+
+    def add(self, span, value=None):
+        """ Adds a span to the index and returns its item number
+
+        Keyword arguments:
+        span -- a tuple of two integers where span[0] <= span[1]
+        value -- returned by the get-methods for this span
+        """
+        assert span[0] <= span[1], span
+        self.spans.append( (span[0], span[1]) )
+        self.values.append(value)
+        self.built = False
+        return len(self.spans) - 1
+
+    def addElement(self, element, attribute="charOffset"):
+        """ Adds all spans of an element with the element as the value.
+        Elements without the offset attribute are skipped.
+        """
+        if element.get(attribute) == None:
+            return
+        for span in Range.getElementTuples(element, attribute):
+            self.add(span, element)
+
+    def build(self):
+        self.order = range(len(self.spans))
+        self.order.sort(key=lambda x: self.spans[x])
+        self.begins = [self.spans[x][0] for x in self.order]
+        self.ends = [self.spans[x][1] for x in self.order]
+        self.maxEnds = [None] * len(self.order)
+        self.buildNode(0, len(self.order))
+        self.beginMap = {}
+        self.endMap = {}
+        for i in range(len(self.spans)):
+            self.beginMap.setdefault(self.spans[i][0], []).append(i)
+            self.endMap.setdefault(self.spans[i][1], []).append(i)
+        self.built = True
+
+    def buildNode(self, lo, hi):
+        # The node for sorted positions [lo, hi) is in the middle position
+        if lo >= hi:
+            return None
+        mid = (lo + hi) / 2
+        maxEnd = self.ends[mid]
+        for child in (self.buildNode(lo, mid), self.buildNode(mid + 1, hi)):
+            if child != None and child > maxEnd:
+                maxEnd = child
+        self.maxEnds[mid] = maxEnd
+        return maxEnd
+
+    ###########################################################################
+    # Queries returning item numbers
+    ###########################################################################
+
+    def findOverlapping(self, span):
+        """ Item numbers of spans overlapping with span (see Range.overlap) """
+        if not self.built:
+            self.build()
+        begin, end = span
+        matches = []
+        stack = [(0, len(self.order))]
+        while len(stack) > 0:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) / 2
+            if self.maxEnds[mid] < begin: # nothing in this subtree reaches the span
+                continue
+            stack.append( (lo, mid) )
+            if self.begins[mid] <= end: # otherwise everything to the right begins after the span
+                if self.ends[mid] >= begin:
+                    matches.append(self.order[mid])
+                stack.append( (mid + 1, hi) )
+        matches.sort()
+        return matches
+
+    def findContaining(self, span):
+        """ Item numbers of spans that contain span (see Range.contains) """
+        return [x for x in self.findOverlapping(span) if Range.contains(self.spans[x], span)]
+
+    def findContained(self, span):
+        """ Item numbers of spans that are contained in span """
+        if not self.built:
+            self.build()
+        # Contained spans begin within the span, so only those are checked
+        first = bisect.bisect_left(self.begins, span[0])
+        last = bisect.bisect_right(self.begins, span[1])
+        matches = [self.order[i] for i in range(first, last) if self.ends[i] <= span[1]]
+        matches.sort()
+        return matches
+
+    def findBeginningAt(self, position):
+        """ Item numbers of spans beginning at position """
+        if not self.built:
+            self.build()
+        return self.beginMap.get(position, [])
+
+    def findEndingAt(self, position):
+        """ Item numbers of spans ending at position """
+        if not self.built:
+            self.build()
+        return self.endMap.get(position, [])
+
+    ###########################################################################
+    # Queries returning values
+    ###########################################################################
+
+    def getOverlapping(self, span):
+        return [self.values[x] for x in self.findOverlapping(span)]
+
+    def getContaining(self, span):
+        return [self.values[x] for x in self.findContaining(span)]
+
+    def getContained(self, span):
+        return [self.values[x] for x in self.findContained(span)]
+
+    def getBeginningAt(self, position):
+        return [self.values[x] for x in self.findBeginningAt(position)]
+
+    def getEndingAt(self, position):
+        return [self.values[x] for x in self.findEndingAt(position)]
@@ -0,0 +1,129 @@
+"""
+Small pseudorandom interaction XML corpora and shared task format
+documents for the tests. Import after adding CommonUtils to the path.
+"""
+import os
+import random
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+import cElementTreeUtils as ETUtils
+
+words = ["IL-2", "binds", "to", "STAT5", "and", "regulates", "the", "expression", "of", "NF-kappaB", "in", "cells"]
+proteins = set(["IL-2", "STAT5", "NF-kappaB"])
+triggers = {"binds":"Binding", "regulates":"Regulation", "expression":"Gene_expression"}
+
+def makeSentence(document, sentenceId, rand):
+    tokens = [rand.choice(words) for i in range(rand.randint(3, 12))]
+    offsets = []
+    offset = 0
+    for token in tokens:
+        offsets.append( (offset, offset + len(token) - 1) )
+        offset += len(token) + 1
+    sentence = ET.SubElement(document, "sentence", {"id":sentenceId, "text":" ".join(tokens),
+                                                    "origId":sentenceId.replace(".", "_")})
+    entities = []
+    for i in range(len(tokens)):
+        if tokens[i] in proteins or tokens[i] in triggers:
+            entity = ET.SubElement(sentence, "entity", {"id":sentenceId + ".e" + str(len(entities)),
+                                                        "charOffset":"%d-%d" % offsets[i], "headOffset":"%d-%d" % offsets[i],
+                                                        "text":tokens[i], "isName":str(tokens[i] in proteins),
+                                                        "type":triggers.get(tokens[i], "Protein")})
+            entities.append(entity)
+    interactionCount = 0
+    for entity in entities:
+        if entity.get("isName") == "False":
+            for other in entities:
+                if other is not entity and rand.random() < 0.5:
+                    ET.SubElement(sentence, "interaction", {"id":sentenceId + ".i" + str(interactionCount),
+                                                            "e1":entity.get("id"), "e2":other.get("id"),
+                                                            "type":rand.choice(["Theme", "Cause"])})
+                    interactionCount += 1
+    analyses = ET.SubElement(sentence, "sentenceanalyses")
+    tokenization = ET.SubElement(ET.SubElement(analyses, "tokenizations"), "tokenization", {"tokenizer":"split"})
+    for i in range(len(tokens)):
+        ET.SubElement(tokenization, "token", {"id":"st_" + str(i+1), "charOffset":"%d-%d" % offsets[i],
+                                              "text":tokens[i], "POS":"NN"})
+    parse = ET.SubElement(ET.SubElement(analyses, "parses"), "parse", {"parser":"split", "tokenizer":"split"})
+    for i in range(1, len(tokens)):
+        ET.SubElement(parse, "dependency", {"id":"sd_" + str(i), "t1":"st_" + str(i), "t2":"st_" + str(i+1), "type":"dep"})
+    return sentence
+
+def makeCorpus(numDocuments=10, source="TEST", seed=0):
+    """ Returns the root element of a corpus with entities, interactions,
+    tokens and a parse of dependencies between consecutive tokens
+    """
+    rand = random.Random(seed)
+    corpus = ET.Element("corpus", {"source":source})
+    for i in range(numDocuments):
+        documentId = source + ".d" + str(i)
+        document = ET.SubElement(corpus, "document", {"id":documentId, "origId":str(i)})
+        for j in range(rand.randint(1, 4)):
+            makeSentence(document, documentId + ".s" + str(j), rand)
+    return corpus
+
+def writeCorpus(filename, numDocuments=10, source="TEST", seed=0):
+    corpus = makeCorpus(numDocuments, source, seed)
+    ETUtils.write(corpus, filename)
+    return corpus
+
+def treeToStrings(root, tag="document"):
+    """ Serialized elements, ignoring whitespace differences """
+    strings = []
+    for element in root.getiterator(tag):
+        for e in element.getiterator():
+            if e.text != None and e.text.strip() == "":
+                e.text = None
+            if e.tail != None and e.tail.strip() == "":
+                e.tail = None
+        strings.append(ET.tostring(element))
+    return strings
+
+def writeSTDocument(dir, id, rand, relations=False):
+    """ Writes the txt, a1 and a2 files of a random shared task format document.
+    With relations=True, the document also has a triggerless event and a
+    Coref relation.
+    """
+    words = ["word%d" % i for i in range(60)]
+    offsets = []
+    offset = 0
+    for word in words:
+        offsets.append( (offset, offset + len(word)) )
+        offset += len(word) + 1
+    open(os.path.join(dir, id + ".txt"), "wt").write(" ".join(words))
+    numProteins = rand.randint(2, 8)
+    a1 = []
+    for i in range(numProteins):
+        a1.append("T%d\tProtein %d %d\t%s\n" % (i+1, offsets[i][0], offsets[i][1], words[i]))
+    open(os.path.join(dir, id + ".a1"), "wt").write("".join(a1))
+    numTriggers = rand.randint(1, 5)
+    a2 = []
+    for i in range(numTriggers):
+        word = numProteins + i
+        a2.append("T%d\tGene_expression %d %d\t%s\n" % (numProteins+i+1, offsets[word][0], offsets[word][1], words[word]))
+    numEvents = rand.randint(1, 8)
+    for i in range(numEvents):
+        trigger = rand.randint(numProteins+1, numProteins+numTriggers)
+        if i == 0 or rand.random() < 0.6:
+            theme = "T%d" % rand.randint(1, numProteins)
+        else:
+            theme = "E%d" % rand.randint(1, i)
+        event = "E%d\tGene_expression:T%d Theme:%s" % (i+1, trigger, theme)
+        if rand.random() < 0.3:
+            event += " Cause:T%d" % rand.randint(1, numProteins)
+        a2.append(event + "\n")
+    for i in range(rand.randint(0, 2)):
+        a2.append("M%d\t%s E%d\n" % (i+1, rand.choice(["Negation", "Speculation"]), rand.randint(1, numEvents)))
+    if relations:
+        a2.append("E%d\tInteraction Agent:T1 Target:T%d\n" % (numEvents+1, numProteins))
+        anaphora = numProteins + numTriggers + 1
+        for i in range(2):
+            word = anaphora + i - 1
+            a2.append("T%d\tExp %d %d\t%s\n" % (anaphora+i, offsets[word][0], offsets[word][1], words[word]))
+        relation = "R1\tCoref Anaphora:T%d Antecedent:T%d" % (anaphora, anaphora+1)
+        numConnected = rand.randint(0, numProteins)
+        if numConnected > 0:
+            relation += "\t[" + ", ".join(["T%d" % (x+1) for x in range(numConnected)]) + "]"
+        a2.append(relation + "\n")
+    open(os.path.join(dir, id + ".a2"), "wt").write("".join(a2))
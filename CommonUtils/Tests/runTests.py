@@ -0,0 +1,19 @@
+"""
+Run the tests of CommonUtils.
+
+  Usage: python runTests.py [-v]
+  
+  Runs all test*.py modules in this directory. The tests use only the
+  standard library and temporary files.
+"""
+import sys, os
+import unittest
+
+if __name__=="__main__":
+    verbosity = 1
+    if "-v" in sys.argv:
+        verbosity = 2
+    testDir = os.path.dirname(os.path.abspath(__file__))
+    suite = unittest.TestLoader().discover(testDir, pattern="test*.py")
+    result = unittest.TextTestRunner(verbosity=verbosity).run(suite)
+    sys.exit(not result.wasSuccessful())
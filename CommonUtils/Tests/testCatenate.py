@@ -0,0 +1,56 @@
+"""
+Tests for catenating and routing corpora (Catenate and RouteDocuments).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import Catenate
+import RouteDocuments
+
+class CatenateTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.inputs = []
+        for i in range(3):
+            self.inputs.append(os.path.join(self.tempDir, "input%d.xml" % i))
+            TestCorpus.writeCorpus(self.inputs[-1], 4 + i, "TEST" + str(i), i)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+    
+    def testCatenate(self):
+        output = os.path.join(self.tempDir, "output.xml")
+        tree = Catenate.catenate(self.inputs[0], self.inputs[1], output)
+        documents = tree.getroot().findall("document")
+        self.assertEqual(len(documents), 9)
+        self.assertEqual(documents[4].get("id"), "TEST1.d4")
+        self.assertEqual(documents[4].find("sentence/entity").get("id").split(".")[:3], ["TEST1", "d4", "s0"])
+        self.assertEqual(TestCorpus.treeToStrings(ETUtils.ETFromObj(output).getroot()), TestCorpus.treeToStrings(tree.getroot()))
+        self.assertEqual(Catenate.catenate(self.inputs[0], self.inputs[1], None).getroot().get("source"), "TEST0")
+    
+    def testCatenateFiles(self):
+        output = os.path.join(self.tempDir, "output.xml")
+        expected = Catenate.catenate(self.inputs[0], self.inputs[1], None)
+        self.assertEqual(Catenate.catenateFiles(self.inputs[:2], output), 9)
+        self.assertEqual(TestCorpus.treeToStrings(ETUtils.ETFromObj(output).getroot()), TestCorpus.treeToStrings(expected.getroot()))
+        self.assertEqual(Catenate.catenateFiles(self.inputs, output + ".gz"), 15)
+        self.assertEqual(ETUtils.ETFromObj(output + ".gz").getroot().findall("document")[-1].get("id"), "TEST2.d14")
+    
+    def testRoute(self):
+        outputs = {"even":os.path.join(self.tempDir, "even.xml"), "all":os.path.join(self.tempDir, "all.xml")}
+        def route(document, inputIndex):
+            if int(document.get("origId")) % 2 == 0:
+                return ["even", "all"]
+            return ["all"]
+        counts = RouteDocuments.routeDocuments(self.inputs, route, outputs)
+        self.assertEqual(counts, {"even":8, "all":15})
+        even = ETUtils.ETFromObj(outputs["even"]).getroot()
+        self.assertEqual(even.get("source"), "TEST0")
+        self.assertEqual([x.get("id") for x in even.findall("document")][:3], ["TEST0.d0", "TEST0.d2", "TEST1.d0"])
+
+if __name__ == "__main__":
+    unittest.main()
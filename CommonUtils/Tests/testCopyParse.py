@@ -0,0 +1,58 @@
+"""
+Tests for copying parses from a source corpus by sentence text (CopyParse),
+comparing the streaming version against the one loading both corpora.
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import gzip
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import CopyParse
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+class CopyParseTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.source = TestCorpus.makeCorpus(20)
+        target = TestCorpus.makeCorpus(20)
+        for sentence in target.getiterator("sentence"):
+            sentence.remove(sentence.find("sentenceanalyses"))
+        ET.SubElement(target.find("document"), "sentence", {"id":"TEST.d0.s9", "text":"no source"})
+        self.target = self.write("target.xml", target)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def write(self, name, root):
+        filename = os.path.join(self.tempDir, name)
+        if name.endswith(".plain.gz"): # an ordinary single member gzip file
+            out = gzip.open(filename, "wb")
+            ET.ElementTree(root).write(out, "utf-8")
+            out.close()
+        else:
+            ETUtils.write(root, filename)
+        return filename
+
+    def testStreaming(self):
+        source = self.write("source.xml", self.source)
+        expected = CopyParse.copyParse(self.target, source, None, "split", "split").getroot()
+        self.assertEqual(len(expected.findall("document/sentence/sentenceanalyses/parses/parse")),
+                         len(self.source.findall("document/sentence")))
+        expected = TestCorpus.treeToStrings(expected)
+        for name in ["source.xml", "source.xml.gz", "source.xml.bz2", "source.plain.gz"]:
+            source = self.write(name, self.source)
+            output = os.path.join(self.tempDir, "output.xml")
+            self.assertEqual(CopyParse.copyParse(self.target, source, output, "split", "split", stream=True), None)
+            self.assertEqual(TestCorpus.treeToStrings(ETUtils.ETFromObj(output).getroot()), expected)
+            # sources that can't be read by offset are not indexed
+            indexed = [x for x in os.listdir(self.tempDir) if x.startswith(name) and x.endswith(".index")]
+            self.assertEqual(len(indexed), int(ETUtils.canReadByOffset(source)))
+
+if __name__ == "__main__":
+    unittest.main()
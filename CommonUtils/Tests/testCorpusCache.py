@@ -0,0 +1,135 @@
+"""
+Tests for the binary corpus cache (CorpusCache), compared against
+the corpus parsed from its XML source.
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import cElementTreeUtils as ETUtils
+import Range
+import TestCorpus
+import CorpusCache
+import CorpusElements
+import CorpusIndex
+import SentenceIndex
+
+class CorpusCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.input = os.path.join(self.tempDir, "corpus.xml")
+        TestCorpus.writeCorpus(self.input, 10)
+        self.caches = []
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        shutil.rmtree(self.tempDir)
+
+    def openCache(self):
+        cache = CorpusCache.CachedCorpus(CorpusCache.getCachePath(self.input))
+        self.caches.append(cache)
+        return cache
+
+    def assertSameTree(self, cached, parsed):
+        self.assertEqual(cached.tag, parsed.tag)
+        self.assertEqual(sorted(cached.items()), sorted(parsed.items()))
+        if parsed.text != None and parsed.text.strip() != "":
+            self.assertEqual(cached.text, parsed.text)
+        else: # whitespace is not cached
+            self.assertEqual(cached.text, None)
+        self.assertEqual(len(cached), len(parsed.getchildren()))
+        for cachedChild, parsedChild in zip(cached.getchildren(), parsed.getchildren()):
+            self.assertSameTree(cachedChild, parsedChild)
+
+    def testTree(self):
+        self.assertEqual(CorpusCache.compileCorpus(self.input), CorpusCache.getCachePath(self.input))
+        root = self.openCache().getroot()
+        parsed = ETUtils.ETFromObj(self.input).getroot()
+        self.assertSameTree(root, parsed)
+        for path in ["document", "document/sentence/entity", "document/*/interaction", "document/sentence/sentenceanalyses/parses/parse/dependency"]:
+            self.assertEqual([x.get("id") for x in root.findall(path)], [x.get("id") for x in parsed.findall(path)])
+        self.assertEqual([x.get("id") for x in root.getiterator("token")], [x.get("id") for x in parsed.getiterator("token")])
+        self.assertEqual(root.find("document/nothing"), None)
+        # set() changes the memoized element view
+        root.find("document").set("mark", "1")
+        self.assertEqual(root.find("document").get("mark"), "1")
+
+    def testOffsetsAndEndpoints(self):
+        CorpusCache.compileCorpus(self.input)
+        root = self.openCache().getroot()
+        for sentence in root.findall("document/sentence"):
+            entitiesById = {}
+            for entity in sentence.findall("entity"):
+                self.assertEqual(entity.getCharOffsets(), Range.charOffsetToTuples(entity.get("charOffset")))
+                entitiesById[entity.get("id")] = entity
+            for interaction in sentence.findall("interaction"):
+                e1, e2 = interaction.getEndpoints()
+                self.assert_(e1 is entitiesById[interaction.get("e1")])
+                self.assert_(e2 is entitiesById[interaction.get("e2")])
+            tokensById = dict([(x.get("id"), x) for x in sentence.getiterator("token")])
+            for dependency in sentence.getiterator("dependency"):
+                t1, t2 = dependency.getEndpoints()
+                self.assert_(t1 is tokensById[dependency.get("t1")])
+                self.assert_(t2 is tokensById[dependency.get("t2")])
+
+    def testCacheValidity(self):
+        self.assert_(not CorpusCache.isCacheValid(self.input))
+        CorpusCache.compileCorpus(self.input)
+        self.assert_(CorpusCache.isCacheValid(self.input))
+        # a new modification time with the same content is accepted by its hash
+        os.utime(self.input, (time.time() + 10, time.time() + 10))
+        self.assert_(CorpusCache.isCacheValid(self.input))
+        # changed content
+        TestCorpus.writeCorpus(self.input, 10, "NEW")
+        os.utime(self.input, (time.time() + 20, time.time() + 20))
+        self.assert_(not CorpusCache.isCacheValid(self.input))
+        # a broken cache file
+        open(CorpusCache.getCachePath(self.input), "wb").write("not a cache")
+        self.assert_(not CorpusCache.isCacheValid(self.input))
+
+    def testLoadCorpus(self):
+        expected = CorpusElements.loadCorpus(self.input, "split", "split")
+        for i in range(2): # compiled on the first load, reused on the second
+            corpus = CorpusCache.loadCorpus(self.input, "split", "split")
+            self.caches.append(corpus.tree)
+            self.assert_(CorpusCache.isCacheValid(self.input))
+            self.assertEqual(len(corpus.sentences), len(expected.sentences))
+            self.assertEqual(sorted(corpus.documentsById.keys()), sorted(expected.documentsById.keys()))
+            for sentence, expectedSentence in zip(corpus.sentences, expected.sentences):
+                self.assertEqual(sentence.sentence.get("id"), expectedSentence.sentence.get("id"))
+                for name in ["entities", "interactions", "pairs", "tokens", "dependencies"]:
+                    self.assertEqual([x.get("id") for x in getattr(sentence, name)], [x.get("id") for x in getattr(expectedSentence, name)])
+                self.assertEqual(sorted(sentence.entitiesById.keys()), sorted(expectedSentence.entitiesById.keys()))
+
+    def testTempFiles(self):
+        # a file left by an earlier build under the old fixed temporary name is not used
+        for path in [CorpusCache.getCachePath(self.input), CorpusIndex.getIndexPath(self.input),
+                     SentenceIndex.getIndexPath(self.input, ["id"])]:
+            open(path + ".tmp", "wt").write("partial")
+            os.chmod(path + ".tmp", 0400)
+        CorpusCache.compileCorpus(self.input)
+        CorpusIndex.buildIndex(self.input)
+        SentenceIndex.buildIndex(self.input, ["id"])
+        self.assert_(CorpusCache.isCacheValid(self.input))
+        self.assert_(CorpusIndex.isIndexValid(self.input, CorpusIndex.getIndexPath(self.input)))
+        self.assert_(SentenceIndex.isIndexValid(self.input, SentenceIndex.getIndexPath(self.input, ["id"]), ["id"]))
+        self.assertEqual(len(os.listdir(self.tempDir)), 7)
+        # the permissions follow the umask, like files created with open
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(os.stat(CorpusCache.getCachePath(self.input)).st_mode & 0777, 0666 & ~umask)
+        # a failed write leaves the existing file
+        filename = os.path.join(self.tempDir, "file")
+        open(filename, "wt").write("old")
+        def fail(out):
+            out.write("new")
+            raise ValueError()
+        self.assertRaises(ValueError, CorpusCache.writeFile, filename, fail)
+        self.assertEqual(open(filename).read(), "old")
+        self.assertEqual(len(os.listdir(self.tempDir)), 8)
+
+if __name__ == "__main__":
+    unittest.main()
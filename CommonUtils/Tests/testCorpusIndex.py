@@ -0,0 +1,124 @@
+"""
+Tests for reading documents and sentences by id through a corpus
+index (CorpusIndex).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import time
+import gzip
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import CorpusIndex
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+class CorpusIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.corpus = TestCorpus.makeCorpus(20)
+        self.indexes = []
+
+    def tearDown(self):
+        for index in self.indexes:
+            index.close()
+        shutil.rmtree(self.tempDir)
+
+    def writeCorpus(self, name, root=None):
+        filename = os.path.join(self.tempDir, name)
+        if root == None:
+            root = self.corpus
+        ETUtils.write(root, filename)
+        return filename
+
+    def openIndex(self, filename, sentences=False):
+        index = CorpusIndex.CorpusIndex(filename, sentences)
+        self.indexes.append(index)
+        return index
+
+    def testBuildIndex(self):
+        filename = self.writeCorpus("corpus.xml")
+        indexPath = CorpusIndex.buildIndex(filename, sentences=True)
+        self.assertEqual(indexPath, CorpusIndex.getIndexPath(filename))
+        self.assert_(CorpusIndex.isIndexValid(filename, indexPath, True))
+        # a document index is used without rebuilding it
+        mtime = os.path.getmtime(indexPath)
+        self.openIndex(filename)
+        self.assertEqual(os.path.getmtime(indexPath), mtime)
+
+    def testLookup(self):
+        documents = self.corpus.findall("document")
+        sentences = self.corpus.findall("document/sentence")
+        for name in ["corpus.xml", "corpus.xml.gz"]:
+            index = self.openIndex(self.writeCorpus(name), sentences=True)
+            self.assertEqual(index.root.tag, "corpus")
+            self.assertEqual(index.root.get("source"), "TEST")
+            self.assertEqual(index.getIds(), [x.get("id") for x in documents])
+            self.assertEqual(index.getIds("sentence"), [x.get("id") for x in sentences])
+            self.assertEqual([TestCorpus.treeToStrings(index.getDocument(x.get("id")))[0] for x in documents],
+                             TestCorpus.treeToStrings(self.corpus))
+            self.assertEqual([TestCorpus.treeToStrings(index.getSentence(x.get("id")), "sentence")[0] for x in sentences],
+                             TestCorpus.treeToStrings(self.corpus, "sentence"))
+            for document in documents:
+                for sentence in document.findall("sentence"):
+                    self.assertEqual(index.getDocumentId(sentence.get("id")), document.get("id"))
+            self.assertEqual(index.getDocument("none"), None)
+            self.assertEqual(index.getDocumentId("none"), None)
+            self.assert_(index.has_key("TEST.d3") and not index.has_key("none"))
+            # in corpus order, skipping missing ids
+            self.assertEqual([x.get("id") for x in index.getElements(["TEST.d7", "none", "TEST.d2"])], ["TEST.d2", "TEST.d7"])
+
+    def testNoSentences(self):
+        filename = self.writeCorpus("corpus.xml")
+        index = self.openIndex(filename)
+        self.assertRaises(KeyError, index.getSentence, "TEST.d0.s0")
+        self.assertRaises(KeyError, index.getDocumentId, "TEST.d0.s0")
+        # the index is rebuilt with the sentences when they are needed
+        self.assert_(not CorpusIndex.isIndexValid(filename, CorpusIndex.getIndexPath(filename), True))
+        index = self.openIndex(filename, True)
+        self.assertEqual(index.getSentence("TEST.d0.s0").get("id"), "TEST.d0.s0")
+
+    def testInvalidation(self):
+        filename = self.writeCorpus("corpus.xml")
+        indexPath = CorpusIndex.getIndexPath(filename)
+        self.openIndex(filename)
+        self.assert_(CorpusIndex.isIndexValid(filename, indexPath))
+        # a new modification time with the same content
+        os.utime(filename, (time.time() + 10, time.time() + 10))
+        self.assert_(CorpusIndex.isIndexValid(filename, indexPath))
+        # changed content
+        newCorpus = TestCorpus.makeCorpus(5, "NEW")
+        self.writeCorpus("corpus.xml", newCorpus)
+        os.utime(filename, (time.time() + 20, time.time() + 20))
+        self.assert_(not CorpusIndex.isIndexValid(filename, indexPath))
+        index = self.openIndex(filename)
+        self.assertEqual(index.getIds(), [x.get("id") for x in newCorpus.findall("document")])
+        self.assertEqual(index.getDocument("NEW.d4").get("id"), "NEW.d4")
+        # a broken index file
+        open(indexPath, "wb").write("not an index")
+        self.assert_(not CorpusIndex.isIndexValid(filename, indexPath))
+
+    def testOtherFormats(self):
+        out = gzip.open(os.path.join(self.tempDir, "corpus.plain.gz"), "wb") # an ordinary single member gzip file
+        ET.ElementTree(self.corpus).write(out, "utf-8")
+        out.close()
+        self.writeCorpus("corpus.xml.bz2")
+        for name in ["corpus.xml.bz2", "corpus.plain.gz"]:
+            filename = os.path.join(self.tempDir, name)
+            self.assertRaises(IOError, CorpusIndex.CorpusIndex, filename)
+            self.assert_(not os.path.exists(CorpusIndex.getIndexPath(filename)))
+
+    def testExtract(self):
+        filename = self.writeCorpus("corpus.xml.gz")
+        output = os.path.join(self.tempDir, "output.xml")
+        CorpusIndex.extract(filename, output, ["TEST.d9", "none"], ["TEST.d1.s0"])
+        root = ETUtils.ETFromObj(output).getroot()
+        self.assertEqual(root.get("source"), "TEST")
+        self.assertEqual([x.get("id") for x in root.findall("document")], ["TEST.d1", "TEST.d9"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for deleting elements with compiled rules (DeleteElements.RuleSet),
+compared against applying the rules one at a time as before.
+"""
+import sys, os
+import unittest
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import DeleteElements
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+# The previous implementation, applying each rule in a separate traversal
+
+def oldRemoveElements(parent, elementName, attributes, countsByType):
+    toRemove = []
+    for element in parent.getchildren():
+        if element.tag == elementName:
+            remove = True
+            for k,v in attributes.iteritems():
+                if element.get(k) != v:
+                    remove = False
+            if remove:
+                toRemove.append(element)
+        else:
+            oldRemoveElements(element, elementName, attributes, countsByType)
+    for element in toRemove:
+        parent.remove(element)
+        countsByType[elementName] += 1
+
+def oldProcessSentence(sentence, rules, countsByType):
+    for key in sorted(rules.keys()):
+        oldRemoveElements(sentence, key, rules[key], countsByType)
+
+tags = ["entity", "interaction", "pair", "token"]
+
+def makeTree(rand, parent, depth):
+    for i in range(rand.randint(0, 4)):
+        element = ET.SubElement(parent, rand.choice(tags), {"type":rand.choice(["A", "B"])})
+        if rand.random() < 0.5:
+            element.set("isName", rand.choice(["True", "False"]))
+        if depth < 4:
+            makeTree(rand, element, depth + 1)
+
+def makeRules(rand):
+    rules = {}
+    for tag in rand.sample(tags, rand.randint(1, len(tags))):
+        rules[tag] = {}
+        if rand.random() < 0.5:
+            rules[tag]["type"] = rand.choice(["A", "B"])
+        if rand.random() < 0.3:
+            rules[tag]["isName"] = rand.choice(["True", "False"])
+    return rules
+
+class RuleSetTest(unittest.TestCase):
+    def testSameAsOld(self):
+        rand = random.Random(5)
+        for i in range(300):
+            sentence = ET.Element("sentence")
+            makeTree(rand, sentence, 0)
+            rules = makeRules(rand)
+            oldSentence = ET.fromstring(ET.tostring(sentence))
+            oldCounts = dict([(x, 0) for x in rules])
+            oldProcessSentence(oldSentence, rules, oldCounts)
+            counts = dict([(x, 0) for x in rules])
+            DeleteElements.processSentence(sentence, DeleteElements.RuleSet(rules), counts)
+            self.assertEqual(counts, oldCounts)
+            self.assertEqual(ET.tostring(sentence), ET.tostring(oldSentence))
+
+    def testProcessDocument(self):
+        document = ET.fromstring("<document><sentence><entity isName='True'/><entity isName='False'/><pair/></sentence>"
+                                 "<sentence><pair><pair/></pair></sentence></document>")
+        counts = DeleteElements.processDocument(document, {"pair":{}, "entity":{"isName":"False"}, "interaction":{}})
+        self.assertEqual(counts, {"pair":2, "entity":1, "interaction":0})
+        self.assertEqual(ET.tostring(document), "<document><sentence><entity isName=\"True\" /></sentence><sentence /></document>")
+
+    def testParseRules(self):
+        self.assertEqual(DeleteElements.parseRules('{"pair":{}, "entity":{"isName":"False"}}'), {"pair":{}, "entity":{"isName":"False"}})
+        self.assertRaises(ValueError, DeleteElements.parseRules, '{"pair":open("x")}')
+        self.assertRaises(AssertionError, DeleteElements.parseRules, '{"pair":1}')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests for the attribute index of element trees (cElementTreeUtils.ElementIndex),
+compared against getElementByAttrib.
+"""
+import sys, os
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+import cElementTreeUtils as ETUtils
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+def makeTree():
+    root = ET.Element("corpus")
+    for i in range(5):
+        document = ET.SubElement(root, "document", {"id":"d"+str(i), "origId":str(i % 2)})
+        for j in range(3):
+            ET.SubElement(document, "sentence", {"id":"d"+str(i)+".s"+str(j), "text":"text " + str(j)})
+    return root
+
+class ElementIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.root = makeTree()
+        self.index = ETUtils.ElementIndex([("sentence", ("text", "id")), ("document", ("origId",))], self.root)
+
+    def assertSameAsScan(self, tag, attDict):
+        self.assert_(self.index.find(tag, attDict) is ETUtils.getElementByAttrib(self.root, tag, attDict))
+
+    def testGet(self):
+        self.assertEqual(self.index.get("sentence", ("text", "id"), ("text 1", "d2.s1")).get("id"), "d2.s1")
+        self.assertEqual(self.index.get("sentence", ("text", "id"), ("text 1", "d2.s2")), None)
+        self.assertEqual([x.get("id") for x in self.index.getAll("document", ("origId",), ("0",))], ["d0", "d2", "d4"])
+
+    def testFindUnsortedIndex(self):
+        # the index is defined as ("text", "id"), not in alphabetical order
+        self.assertSameAsScan("sentence", {"id":"d3.s0", "text":"text 0"})
+        self.assertSameAsScan("sentence", {"id":"d3.s0", "text":"text 1"})
+        self.assertRaises(KeyError, self.index.find, "sentence", {"id":"d3.s0"})
+
+    def testModification(self):
+        document = self.root.find("document")
+        sentence = ET.Element("sentence", {"id":"d0.s9", "text":"new"})
+        self.index.append(document, sentence)
+        self.assertSameAsScan("sentence", {"id":"d0.s9", "text":"new"})
+        self.index.set(sentence, "text", "changed")
+        self.assertEqual(self.index.find("sentence", {"id":"d0.s9", "text":"new"}), None)
+        self.assertSameAsScan("sentence", {"id":"d0.s9", "text":"changed"})
+        self.index.remove(document, sentence)
+        self.assertEqual(self.index.find("sentence", {"id":"d0.s9", "text":"changed"}), None)
+        # removing a subtree removes its descendants
+        self.index.remove(self.root, document)
+        self.assertEqual(self.index.find("sentence", {"id":"d0.s0", "text":"text 0"}), None)
+        self.assertEqual([x.get("id") for x in self.index.getAll("document", ("origId",), ("0",))], ["d2", "d4"])
+
+    def testDirectChange(self):
+        document = self.root.findall("document")[1]
+        sentence = document.find("sentence")
+        sentence.set("text", "direct")
+        # the element can still be removed after its attribute was changed
+        self.index.remove(document, sentence)
+        self.assertEqual(self.index.find("sentence", {"id":"d1.s0", "text":"text 0"}), None)
+        self.assertEqual(len(self.index.getKeys("sentence", ("text", "id"))), 14)
+        self.index.unindexElement(ET.Element("sentence", {"id":"x", "text":"y"}))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Tests for reading and writing corpora one element at a time
+(cElementTreeUtils.ElementStream and ElementWriter).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+from StringIO import StringIO
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+import cElementTreeUtils as ETUtils
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+def makeCorpus(numDocuments=5):
+    corpus = ET.Element("corpus", {"source":"TEST"})
+    for i in range(numDocuments):
+        document = ET.SubElement(corpus, "document", {"id":"TEST.d" + str(i)})
+        for j in range(3):
+            sentence = ET.SubElement(document, "sentence", {"id":"TEST.d%d.s%d" % (i, j), "text":u"Text \u00e4 %d" % j})
+            ET.SubElement(sentence, "entity", {"id":"TEST.d%d.s%d.e0" % (i, j), "charOffset":"0-3"})
+    return corpus
+
+def readFile(filename):
+    """ Returns the uncompressed content of a file """
+    f = ETUtils.openInput(filename)
+    content = "".join(iter(lambda: f.read(65536), ""))
+    f.close()
+    return content
+
+class ElementStreamTest(unittest.TestCase):
+    def testRoot(self):
+        stream = ETUtils.ElementStream(StringIO(ET.tostring(makeCorpus())), "document")
+        self.assertEqual(stream.root.tag, "corpus")
+        self.assertEqual(stream.root.get("source"), "TEST")
+        stream.close()
+    
+    def testDocumentsAreDetached(self):
+        stream = ETUtils.ElementStream(StringIO(ET.tostring(makeCorpus())), "document")
+        ids = []
+        previous = None
+        for document in stream:
+            ids.append(document.get("id"))
+            self.assertEqual(len(document.findall("sentence")), 3)
+            self.assertTrue(previous not in list(stream.root))
+            previous = document
+        self.assertEqual(ids, ["TEST.d" + str(i) for i in range(5)])
+        self.assertEqual(len(stream.root), 0)
+    
+    def testLimit(self):
+        stream = ETUtils.ElementStream(StringIO(ET.tostring(makeCorpus())), "document", limit=2)
+        self.assertEqual(len(list(stream)), 2)
+    
+    def testMovedElements(self):
+        # The consumer may detach the yielded element or move it to another tree
+        stream = ETUtils.ElementStream(StringIO(ET.tostring(makeCorpus())), "document")
+        other = ET.Element("corpus")
+        for document in stream:
+            stream.root.remove(document)
+            other.append(document)
+        self.assertEqual([x.get("id") for x in other], ["TEST.d" + str(i) for i in range(5)])
+
+class ElementWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+    
+    def writeStreaming(self, filename, compact=False):
+        corpus = makeCorpus()
+        writer = ETUtils.ElementWriter(filename, corpus, compact)
+        for document in list(corpus):
+            writer.write(document)
+        writer.close()
+        return writer
+    
+    def testSameAsWrite(self):
+        for compact in [False, True]:
+            for suffix in [".xml", ".xml.gz"]:
+                filename = os.path.join(self.tempDir, "stream" + suffix)
+                self.writeStreaming(filename, compact)
+                treeFilename = os.path.join(self.tempDir, "tree" + suffix)
+                ETUtils.write(makeCorpus(), treeFilename, compact)
+                self.assertEqual(readFile(filename), readFile(treeFilename))
+    
+    def testRoundTrip(self):
+        for suffix in [".xml", ".xml.gz", ".xml.bz2"]:
+            filename = os.path.join(self.tempDir, "corpus" + suffix)
+            writer = self.writeStreaming(filename)
+            self.assertEqual(writer.count, 5)
+            stream = ETUtils.ElementStream(filename, "document")
+            self.assertEqual(stream.root.get("source"), "TEST")
+            read = [ET.tostring(x) for x in stream]
+            expected = makeCorpus()
+            ETUtils.indent(expected)
+            self.assertEqual([x.strip() for x in read], [ET.tostring(x).strip() for x in expected])
+            self.assertEqual(ETUtils.ETFromObj(filename).getroot().findall("document/sentence")[-1].get("text"), u"Text \u00e4 2")
+    
+    def testSameInputAndOutput(self):
+        for suffix in [".xml", ".xml.gz", ".xml.bz2"]:
+            filename = os.path.join(self.tempDir, "corpus" + suffix)
+            ETUtils.write(makeCorpus(200), filename)
+            os.chmod(filename, 0640)
+            stream = ETUtils.ElementStream(filename, "document")
+            writer = ETUtils.ElementWriter(filename, stream.root)
+            for document in stream:
+                document.set("processed", "True")
+                writer.write(document)
+            writer.close()
+            documents = ETUtils.ETFromObj(filename).getroot().findall("document")
+            self.assertEqual(len(documents), 200)
+            self.assertEqual([x.get("processed") for x in documents], ["True"] * 200)
+            self.assertEqual(os.stat(filename).st_mode & 0777, 0640)
+            self.assertEqual(os.listdir(self.tempDir), ["corpus" + suffix])
+            os.remove(filename)
+
+    def testAbort(self):
+        for suffix in [".xml", ".xml.gz", ".xml.bz2"]:
+            filename = os.path.join(self.tempDir, "corpus" + suffix)
+            corpus = makeCorpus()
+            # a new file is removed
+            writer = ETUtils.ElementWriter(filename, corpus)
+            writer.write(corpus.find("document"))
+            writer.abort()
+            self.assertEqual(os.listdir(self.tempDir), [])
+            # an existing file is left as it was
+            ETUtils.write(makeCorpus(2), filename)
+            content = readFile(filename)
+            writer = ETUtils.ElementWriter(filename, corpus)
+            writer.write(corpus.find("document"))
+            writer.abort()
+            self.assertEqual(readFile(filename), content)
+            self.assertEqual(os.listdir(self.tempDir), ["corpus" + suffix])
+            os.remove(filename)
+        # an open stream is left open
+        out = StringIO()
+        writer = ETUtils.ElementWriter(out, makeCorpus())
+        writer.abort()
+        self.assert_(not out.closed)
+
+    def testSerialized(self):
+        filename = os.path.join(self.tempDir, "serialized.xml")
+        corpus = makeCorpus()
+        writer = ETUtils.ElementWriter(filename, corpus)
+        for document in list(corpus):
+            writer.writeSerialized(ETUtils.serializeElement(document))
+        writer.close()
+        self.writeStreaming(os.path.join(self.tempDir, "direct.xml"))
+        self.assertEqual(open(filename).read(), open(os.path.join(self.tempDir, "direct.xml")).read())
+
+if __name__=="__main__":
+    unittest.main()
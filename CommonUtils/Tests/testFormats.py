@@ -0,0 +1,87 @@
+"""
+Tests for the registry of xml-file container formats (cElementTreeUtils
+registerFormat, detectFormat, openInput and openOutput).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import gzip, bz2
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+import cElementTreeUtils as ETUtils
+
+content = '<?xml version="1.0" encoding="UTF-8"?>\n<corpus source="TEST"><document id="TEST.d0" /></corpus>'
+
+class FormatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def write(self, name, writer):
+        filename = os.path.join(self.tempDir, name)
+        out = writer(filename)
+        out.write(content)
+        out.close()
+        return filename
+
+    def read(self, filename):
+        f = ETUtils.openInput(filename)
+        data = "".join(iter(lambda: f.read(1000), ""))
+        f.close()
+        return data
+
+    def testDetectByContent(self):
+        # the format is detected from the magic bytes, not the file name
+        for name, writer, format in [("gzip.data", lambda x: gzip.open(x, "wb"), "gzip"),
+                                     ("bz2.xml", lambda x: bz2.BZ2File(x, "w"), "bz2"),
+                                     ("plain.gz.txt", lambda x: open(x, "wb"), "plain")]:
+            filename = self.write(name, writer)
+            self.assertEqual(ETUtils.detectFormat(filename), format)
+            self.assertEqual(self.read(filename), content)
+            self.assertEqual(ETUtils.ETFromObj(filename).getroot().get("source"), "TEST")
+
+    def testOutputFormat(self):
+        self.assertEqual(ETUtils.getOutputFormat("a.xml.gz"), "gzip")
+        self.assertEqual(ETUtils.getOutputFormat("a.xml.bz2"), "bz2")
+        self.assertEqual(ETUtils.getOutputFormat("a.xml"), "plain")
+        self.assertEqual(ETUtils.getOutputFormat("a"), "plain")
+        for name, format in [("a.xml.gz", "gzip"), ("a.xml.bz2", "bz2"), ("a.xml", "plain")]:
+            filename = self.write(name, ETUtils.openOutput)
+            self.assertEqual(ETUtils.detectFormat(filename), format)
+            self.assertEqual(self.read(filename), content)
+        # the format can be given explicitly
+        filename = self.write("explicit.xml", lambda x: ETUtils.openOutput(x, "bz2"))
+        self.assertEqual(ETUtils.detectFormat(filename), "bz2")
+
+    def testUnknownFormat(self):
+        filename = os.path.join(self.tempDir, "unknown.bin")
+        open(filename, "wb").write("\x00\x01 not xml")
+        self.assertEqual(ETUtils.detectFormat(filename), None)
+        self.assertRaises(ValueError, ETUtils.openInput, filename)
+
+    def testRegisterFormat(self):
+        # a format storing the content reversed, marked with "REV"
+        class ReversedOutput:
+            def __init__(self, filename):
+                self.filename = filename
+                self.data = []
+            def write(self, data):
+                self.data.append(data)
+            def close(self):
+                open(self.filename, "wb").write("REV" + "".join(self.data)[::-1])
+        def reader(filename):
+            from StringIO import StringIO
+            return StringIO(open(filename, "rb").read()[3:][::-1])
+        ETUtils.registerFormat("reversed", "REV", [".rev"], reader, ReversedOutput)
+        try:
+            filename = self.write("corpus.xml.rev", ETUtils.openOutput)
+            self.assert_(open(filename, "rb").read().startswith("REV>suproc/<"))
+            self.assertEqual(ETUtils.detectFormat(filename), "reversed")
+            self.assertEqual(self.read(filename), content)
+        finally:
+            del ETUtils.formats["reversed"]
+            ETUtils.formatNames.remove("reversed")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for applying a function to the documents of a corpus in a process
+pool (MapCorpus).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import MapCorpus
+import RemoveUnconnectedEntities
+
+# Mapped functions must be defined at the top level to be picklable
+
+def markDocument(document, value):
+    document.set("mark", value)
+    entities = len(document.findall("sentence/entity"))
+    return {"documents":1, "entities":entities, "list":[1, entities]}
+
+def indexDocument(document, docIndex, corpusName):
+    document.set("index", corpusName + str(docIndex))
+
+def failDocument(document):
+    if document.get("origId") == "7":
+        raise ValueError("test error")
+
+class MapCorpusTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.input = os.path.join(self.tempDir, "input.xml")
+        self.corpus = TestCorpus.writeCorpus(self.input, 20)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def getExpected(self):
+        expected = TestCorpus.makeCorpus(20)
+        counts = {}
+        for document in expected.findall("document"):
+            MapCorpus.addCounts(counts, markDocument(document, "x"))
+        return expected, counts
+
+    def testWorkers(self):
+        expected, expectedCounts = self.getExpected()
+        for workers in [1, 3]:
+            output = os.path.join(self.tempDir, "output%d.xml" % workers)
+            counts = MapCorpus.mapCorpus(self.input, output, markDocument, ("x",), workers=workers, chunkSize=3)
+            self.assertEqual(counts, expectedCounts)
+            self.assertEqual(counts["documents"], 20)
+            self.assertEqual(TestCorpus.treeToStrings(ETUtils.ETFromObj(output).getroot()), TestCorpus.treeToStrings(expected))
+
+    def testNoOutput(self):
+        expected, expectedCounts = self.getExpected()
+        self.assertEqual(MapCorpus.mapCorpus(self.input, None, markDocument, ("x",), workers=2, chunkSize=4), expectedCounts)
+
+    def testPassIndex(self):
+        output = os.path.join(self.tempDir, "output.xml")
+        MapCorpus.mapCorpus(self.input, output, indexDocument, workers=2, chunkSize=3, passIndex=True)
+        documents = ETUtils.ETFromObj(output).getroot().findall("document")
+        self.assertEqual([x.get("index") for x in documents], ["TEST" + str(i) for i in range(20)])
+
+    def testError(self):
+        for workers in [1, 2]:
+            # an existing output file is not replaced
+            output = os.path.join(self.tempDir, "output%d.xml" % workers)
+            open(output, "wt").write("old")
+            self.assertRaises(ValueError, MapCorpus.mapCorpus, self.input, output, failDocument, workers=workers, chunkSize=2)
+            self.assertEqual(open(output).read(), "old")
+        self.assertEqual(sorted(os.listdir(self.tempDir)), ["input.xml", "output1.xml", "output2.xml"])
+
+    def testTool(self):
+        output = os.path.join(self.tempDir, "output.xml")
+        self.assertEqual(RemoveUnconnectedEntities.removeUnconnectedEntities(self.input, output, workers=2), None)
+        expected = RemoveUnconnectedEntities.removeUnconnectedEntities(self.input)
+        self.assertEqual(TestCorpus.treeToStrings(ETUtils.ETFromObj(output).getroot()), TestCorpus.treeToStrings(expected.getroot()))
+        # without an output file, the tree is processed in memory and returned
+        tree = RemoveUnconnectedEntities.removeUnconnectedEntities(self.input, None, workers=2)
+        self.assertEqual(TestCorpus.treeToStrings(tree.getroot()), TestCorpus.treeToStrings(expected.getroot()))
+
+if __name__ == "__main__":
+    unittest.main()
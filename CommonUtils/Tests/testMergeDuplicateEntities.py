@@ -0,0 +1,68 @@
+"""
+Tests for merging duplicate entities and interactions (MergeDuplicateEntities).
+"""
+import sys, os
+import unittest
+from StringIO import StringIO
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import MergeDuplicateEntities
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+def makeEntity(id, offset, type):
+    return ET.Element("entity", {"id":id, "charOffset":offset, "type":type, "text":"x" + offset})
+
+def makeDocument():
+    document = ET.fromstring("<document id='d0'><sentence id='d0.s0'/><sentence id='d0.s1'/></document>")
+    s0, s1 = document.findall("sentence")
+    for args in [("d0.s0.e0", "0-2", "Protein"), ("d0.s0.e1", "0-2", "Protein"), ("d0.s0.e2", "4-6", "Binding"),
+                 ("d0.s0.e3", "0-2", "Gene"), ("d0.s0.e4", "4-6", "Binding")]:
+        s0.append(makeEntity(*args))
+    s1.append(makeEntity("d0.s1.e0", "10-12", "Protein"))
+    for id, e1, e2 in [("d0.s0.i0", "d0.s0.e2", "d0.s0.e0"), ("d0.s0.i1", "d0.s0.e4", "d0.s0.e1"), ("d0.s0.i2", "d0.s0.e2", "d0.s0.e3")]:
+        ET.SubElement(s0, "interaction", {"id":id, "e1":e1, "e2":e2, "type":"Theme", "interaction":"True"})
+    # an intersentence interaction and one referring to another document
+    ET.SubElement(s1, "interaction", {"id":"d0.s1.i0", "e1":"d0.s0.e4", "e2":"d0.s1.e0", "type":"Theme", "interaction":"True"})
+    ET.SubElement(s1, "pair", {"id":"d0.s1.p0", "e1":"d0.s1.e0", "e2":"d1.s0.e0", "type":"neg", "interaction":"False"})
+    return document
+
+class MergeDuplicatesTest(unittest.TestCase):
+    def testMarkDuplicates(self):
+        elements = [makeEntity("e0", "0-2", "A"), makeEntity("e1", "0-2", "B"), makeEntity("e2", "0-2", "A"),
+                    makeEntity("e3", "3-4", "A"), makeEntity("e4", "0-2", "A"), makeEntity("e5", "3-4", "A")]
+        isDuplicateOf = {}
+        MergeDuplicateEntities.markDuplicates(elements, MergeDuplicateEntities.getEntityKey,
+                                              MergeDuplicateEntities.compareEntities, isDuplicateOf)
+        # each duplicate refers to the first element with its key, not to the previous duplicate
+        self.assertEqual(isDuplicateOf, {"e2":"e0", "e4":"e0", "e5":"e3"})
+        # elements with the same key must have the same text
+        elements.append(ET.Element("entity", {"id":"e6", "charOffset":"3-4", "type":"A", "text":"other"}))
+        self.assertRaises(AssertionError, MergeDuplicateEntities.markDuplicates, elements, MergeDuplicateEntities.getEntityKey,
+                          MergeDuplicateEntities.compareEntities, {})
+
+    def testProcessDocument(self):
+        document = makeDocument()
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            counts = MergeDuplicateEntities.processDocument(document)
+            warnings = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(counts, {"entity Protein":[1, 3], "entity Binding":[1, 2], "entity Gene":[0, 1],
+                                  "interaction Theme":[1, 4], "interaction neg":[0, 1]})
+        s0, s1 = document.findall("sentence")
+        self.assertEqual([x.get("id") for x in s0.findall("entity")], ["d0.s0.e0", "d0.s0.e2", "d0.s0.e3"])
+        # the interactions of the removed entities are remapped, and i1 is then a duplicate of i0
+        self.assertEqual([(x.get("id"), x.get("e1"), x.get("e2")) for x in s0.findall("interaction")],
+                         [("d0.s0.i0", "d0.s0.e2", "d0.s0.e0"), ("d0.s0.i2", "d0.s0.e2", "d0.s0.e3")])
+        self.assertEqual(s1.find("interaction").get("e1"), "d0.s0.e2")
+        # the entity outside the document is kept as it is
+        self.assertEqual(s1.find("pair").get("e2"), "d1.s0.e0")
+        self.assert_("d1.s0.e0" in warnings)
+
+if __name__ == "__main__":
+    unittest.main()
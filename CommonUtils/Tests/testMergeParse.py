@@ -0,0 +1,61 @@
+"""
+Tests for combining the dependencies of two parses (MergeParse).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import MergeParse
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+class MergeParseTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.corpus = TestCorpus.makeCorpus(20)
+        # a second parse of the same tokenization, with the dependencies reversed
+        for parses in self.corpus.getiterator("parses"):
+            parse = ET.SubElement(parses, "parse", {"parser":"reversed", "tokenizer":"split"})
+            for dependency in parses.find("parse").findall("dependency"):
+                ET.SubElement(parse, "dependency", {"id":"r" + dependency.get("id"), "t1":dependency.get("t2"),
+                                                    "t2":dependency.get("t1"), "type":"rev"})
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def testMergeParse(self):
+        for name in ["corpus.xml", "corpus.xml.gz"]:
+            input = os.path.join(self.tempDir, name)
+            ETUtils.write(self.corpus, input)
+            for output in [os.path.join(self.tempDir, "output-" + name), input]:
+                MergeParse.mergeParse(input, output, "split", "reversed", "merged")
+                root = ETUtils.ETFromObj(output).getroot()
+                sentences = root.findall("document/sentence")
+                self.assertEqual(len(sentences), len(self.corpus.findall("document/sentence")))
+                for sentence in sentences:
+                    parses = dict([(x.get("parser"), x) for x in sentence.findall("sentenceanalyses/parses/parse")])
+                    self.assertEqual(sorted(parses.keys()), ["merged", "reversed", "split"])
+                    self.assertEqual(parses["merged"].get("tokenizer"), "split")
+                    self.assertEqual([x.get("id") for x in parses["merged"].findall("dependency")],
+                                     [x.get("id") for x in parses["split"].findall("dependency") + parses["reversed"].findall("dependency")])
+
+    def testMissingParse(self):
+        # an existing output is left as it was
+        input = os.path.join(self.tempDir, "corpus.xml")
+        ETUtils.write(self.corpus, input)
+        data = open(input, "rb").read()
+        self.assertRaises(AssertionError, MergeParse.mergeParse, input, input, "split", "none", "merged")
+        self.assertEqual(open(input, "rb").read(), data)
+        self.assertEqual(os.listdir(self.tempDir), ["corpus.xml"])
+        # a new output is removed
+        output = os.path.join(self.tempDir, "output.xml")
+        self.assertRaises(AssertionError, MergeParse.mergeParse, input, output, "split", "none", "merged")
+        self.assertEqual(os.listdir(self.tempDir), ["corpus.xml"])
+
+if __name__ == "__main__":
+    unittest.main()
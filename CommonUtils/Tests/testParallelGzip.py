@@ -0,0 +1,148 @@
+"""
+Tests for block-parallel gzip compression and decompression (ParallelGzip).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import random
+import threading
+import gzip
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+import ParallelGzip
+import cElementTreeUtils as ETUtils
+
+def makeData(size, seed=1):
+    rand = random.Random(seed)
+    words = ["protein", "binds", "to", "the", "promoter", "of", "gene", "\n"]
+    chunks = []
+    length = 0
+    while length < size:
+        chunks.append(rand.choice(words) + str(rand.randint(0, 1000)) + " ")
+        length += len(chunks[-1])
+    return "".join(chunks)[:size]
+
+class ParallelGzipTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.data = makeData(5 * ParallelGzip.BLOCK_SIZE + 123)
+        self.filename = os.path.join(self.tempDir, "data.gz")
+        out = ParallelGzip.openGzip(self.filename, "wb", 3)
+        # write in uneven pieces to cross the block borders
+        for i in range(0, len(self.data), 10007):
+            out.write(self.data[i:i+10007])
+        out.close()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+    
+    def testRoundTrip(self):
+        self.assertTrue(ParallelGzip.isBlockGzip(self.filename))
+        f = ParallelGzip.openGzip(self.filename, "rb", 3)
+        self.assertEqual(f.read(), self.data)
+        f.close()
+        # reading in small pieces
+        f = ParallelGzip.openGzip(self.filename, "rb", 2)
+        chunks = list(iter(lambda: f.read(777), ""))
+        f.close()
+        self.assertEqual("".join(chunks), self.data)
+    
+    def testStandardGzip(self):
+        # The output is a standard multi-member gzip file
+        f = gzip.GzipFile(self.filename, "rb")
+        self.assertEqual(f.read(), self.data)
+        f.close()
+        # and ordinary gzip files can be read
+        filename = os.path.join(self.tempDir, "ordinary.gz")
+        f = gzip.GzipFile(filename, "wb")
+        f.write(self.data)
+        f.close()
+        self.assertFalse(ParallelGzip.isBlockGzip(filename))
+        f = ParallelGzip.openGzip(filename, "rb")
+        self.assertEqual(f.read(), self.data)
+        f.close()
+    
+    def testAppendedGzip(self):
+        # an ordinary gzip member after the block gzip members, and more block members after it
+        filename = os.path.join(self.tempDir, "appended.gz")
+        f = gzip.GzipFile(filename, "wb")
+        f.write("ordinary\n")
+        f.close()
+        out = open(self.filename, "ab")
+        out.write(open(filename, "rb").read())
+        out.close()
+        out = ParallelGzip.openGzip(filename, "wb", 2)
+        out.write(self.data)
+        out.close()
+        out = open(self.filename, "ab")
+        out.write(open(filename, "rb").read())
+        out.close()
+        self.assertTrue(ParallelGzip.isBlockGzip(self.filename))
+        numThreads = threading.active_count()
+        for size in [-1, 1000]:
+            f = ParallelGzip.openGzip(self.filename, "rb", 3)
+            self.assertEqual("".join(iter(lambda: f.read(size), "")), self.data + "ordinary\n" + self.data)
+            f.close()
+        self.assertEqual(threading.active_count(), numThreads)
+    
+    def testWriterErrors(self):
+        numThreads = threading.active_count()
+        # an exception in a compression thread stops the threads and closes the file
+        out = ParallelGzip.openGzip(os.path.join(self.tempDir, "error.gz"), "wb", 3)
+        out.write(u"\u00e4" * ParallelGzip.BLOCK_SIZE)
+        self.assertRaises(UnicodeEncodeError, out.close)
+        self.assertTrue(out.file.closed)
+        self.assertEqual(threading.active_count(), numThreads)
+        # a writer that is not closed
+        for i in range(5):
+            out = ParallelGzip.openGzip(os.path.join(self.tempDir, "unclosed.gz"), "wb", 3)
+            out.write(self.data)
+            del out
+        self.assertEqual(threading.active_count(), numThreads)
+    
+    def testWorkerCount(self):
+        self.assertTrue(1 <= ParallelGzip.getWorkerCount(None) <= ParallelGzip.MAX_DEFAULT_WORKERS)
+        self.assertEqual(ParallelGzip.getWorkerCount(20), 20)
+    
+    def testEmpty(self):
+        filename = os.path.join(self.tempDir, "empty.gz")
+        ParallelGzip.openGzip(filename, "wb", 2).close()
+        f = ParallelGzip.openGzip(filename, "rb", 2)
+        self.assertEqual(f.read(), "")
+        f.close()
+    
+    def testRangeReads(self):
+        compressed, uncompressed = ParallelGzip.readMemberTable(self.filename)
+        self.assertEqual(uncompressed[-1], len(self.data))
+        self.assertEqual(compressed[-1], os.path.getsize(self.filename))
+        reader = ParallelGzip.BlockGzipRangeReader(self.filename)
+        rand = random.Random(2)
+        ranges = [(0, 10), (0, len(self.data)), (ParallelGzip.BLOCK_SIZE - 5, ParallelGzip.BLOCK_SIZE + 5), 
+                  (len(self.data) - 3, len(self.data) + 100)]
+        for i in range(200):
+            begin = rand.randint(0, len(self.data))
+            ranges.append( (begin, begin + rand.randint(0, 3 * ParallelGzip.BLOCK_SIZE)) )
+        for begin, end in ranges:
+            self.assertEqual(reader.read(begin, end), self.data[begin:end])
+        reader.close()
+    
+    def testThreadsAreStopped(self):
+        numThreads = threading.active_count()
+        for i in range(5):
+            f = ParallelGzip.openGzip(self.filename, "rb", 3)
+            f.read()
+            f.close()
+            f = ParallelGzip.openGzip(self.filename, "rb", 3)
+            f.read(100) # stopped when closed
+            f.close()
+        self.assertEqual(threading.active_count(), numThreads)
+        
+    def testThreadsAreStoppedByParsing(self):
+        numThreads = threading.active_count()
+        filename = os.path.join(self.tempDir, "corpus.xml.gz")
+        ETUtils.write(ETUtils.ElementTree.Element("corpus"), filename)
+        for i in range(5):
+            ETUtils.ETFromObj(filename)
+        self.assertEqual(threading.active_count(), numThreads)
+
+if __name__=="__main__":
+    unittest.main()
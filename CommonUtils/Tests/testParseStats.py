@@ -0,0 +1,113 @@
+"""
+Tests for counting corpus statistics (ParseStats), comparing the
+annotation counts of interaction XML against STFormat.Compare.getCounts.
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import random
+from StringIO import StringIO
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../STFormat")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import ParseStats
+import STTools
+import ConvertXML
+import Compare
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+class ParseStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def makeSet(self, name, relations=False):
+        """ A shared task format directory and its conversion to interaction XML """
+        dir = os.path.join(self.tempDir, name)
+        os.makedirs(dir)
+        rand = random.Random(11)
+        for i in range(15):
+            TestCorpus.writeSTDocument(dir, str(100 + i), rand, relations)
+        xml = os.path.join(self.tempDir, name + ".xml")
+        ConvertXML.toInteractionXML(STTools.loadSet(dir), "TEST", xml)
+        return dir, xml
+
+    def testAnnotationCounts(self):
+        dir, xml = self.makeSet("events")
+        expected = Compare.getCounts(STTools.loadSet(dir))
+        self.assert_(expected["event"] > 0 and expected["task3(spec)"] + expected["task3(neg)"] > 0)
+        for workers in [1, 2]:
+            counts = ParseStats.corpusStats(xml, ["annotation"], workers)
+            self.assertEqual(counts.pop("document"), 15)
+            self.assertEqual(dict(counts), dict(expected))
+
+    def testRelationCounts(self):
+        dir, xml = self.makeSet("relations", True)
+        counts = ParseStats.corpusStats(xml, ["annotation"])
+        counts.pop("document")
+        # the counts of the shared task annotation the XML is converted back into
+        self.assertEqual(dict(counts), dict(Compare.getCounts(ConvertXML.toSTFormat(xml))))
+        # the coref proteins, "Connected" in the shared task files, are "Target" arguments in the XML
+        expected = Compare.getCounts(STTools.loadSet(dir))
+        self.assert_(expected["relation(Coref)"] > 0 and expected["event(Interaction)"] > 0 and expected["arg(Connected)"] > 0)
+        expected["arg(Target)"] += expected.pop("arg(Connected)")
+        self.assertEqual(dict(counts), dict(expected))
+
+    def testParseCounts(self):
+        input = os.path.join(self.tempDir, "corpus.xml")
+        corpus = TestCorpus.makeCorpus(10)
+        sentences = corpus.findall("document/sentence")
+        sentences[0].find("sentenceanalyses").remove(sentences[0].find("sentenceanalyses/parses"))
+        parse = sentences[1].find("sentenceanalyses/parses/parse")
+        for dependency in parse.findall("dependency"):
+            parse.remove(dependency)
+        ETUtils.write(corpus, input)
+        counts = ParseStats.parseStats(input)
+        self.assertEqual(counts["sentence"], len(sentences))
+        self.assertEqual(counts["sentence-no-parses"], 1)
+        self.assertEqual(counts["parse:split"], len(sentences) - 1)
+        self.assertEqual(counts["parse:split(no dependencies)"], 1)
+        self.assertEqual(counts["parse:split(no phrases)"], len(sentences) - 1)
+        self.assertEqual(counts["tokenization:split"], len(sentences) - 1)
+        self.assert_(not counts.has_key("document"))
+
+    def testUnknownCounter(self):
+        self.assertRaises(Exception, ParseStats.corpusStats, "none.xml", ["none"])
+
+    def testCompare(self):
+        dir, xml = self.makeSet("events")
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            Compare.compare(xml, dir)
+            lines = sys.stdout.getvalue().split("\n")
+        finally:
+            sys.stdout = stdout
+        rows = [x.split() for x in lines[lines.index([x for x in lines if x.startswith("Category")][0]) + 1:] if x != ""]
+        self.assert_(len(rows) > 5)
+        for row in rows:
+            self.assertEqual(row[1], row[2], row)
+        # a shared task package is read like a directory
+        package = os.path.join(self.tempDir, "events.tar.gz")
+        STTools.writeSet(STTools.loadSet(dir), package, validate=False)
+        self.assertEqual(Compare.loadCounts(package), Compare.loadCounts(dir))
+        # an empty corpus has no documents to average over
+        empty = os.path.join(self.tempDir, "empty.xml")
+        ETUtils.write(ET.Element("corpus"), empty)
+        counts, numDocs = Compare.loadCounts(empty)
+        self.assertEqual((dict(counts), numDocs), ({}, 0))
+        sys.stdout = StringIO()
+        try:
+            Compare.compare(empty, dir)
+        finally:
+            sys.stdout = stdout
+
+if __name__ == "__main__":
+    unittest.main()
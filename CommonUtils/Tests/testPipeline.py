@@ -0,0 +1,78 @@
+"""
+Tests for running InteractionXML tools as pipeline stages (Pipeline).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import Pipeline
+import DeleteElements
+import RemoveUnconnectedEntities
+import RecalculateIds
+
+def countSentences(document, increment):
+    return {"sentences":len(document.findall("sentence")) * increment}
+
+Pipeline.registerStage("countSentences", "testPipeline", "countSentences")
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.input = os.path.join(self.tempDir, "input.xml")
+        self.corpus = TestCorpus.writeCorpus(self.input, 15)
+        self.stages = ['deleteElements {"interaction":{"type":"Cause"}}', "removeUnconnected", "recalculateIds"]
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def getExpected(self):
+        """ The result of running the tools one at a time """
+        tree = DeleteElements.processCorpus(self.input, None, {"interaction":{"type":"Cause"}})
+        tree = RemoveUnconnectedEntities.removeUnconnectedEntities(tree)
+        return RecalculateIds.recalculateIds(tree)
+
+    def testParseStage(self):
+        self.assertEqual(Pipeline.parseStage("recalculateIds"), ("recalculateIds", ()))
+        self.assertEqual(Pipeline.parseStage(' deleteElements {"pair":{}}'), ("deleteElements", ({"pair":{}},)))
+        self.assertEqual(Pipeline.parseStage("extendTriggers (['Bacterium'], True)"), ("extendTriggers", (["Bacterium"], True)))
+        self.assertEqual(Pipeline.parseStage(("splitMerged", ())), ("splitMerged", ()))
+        # only literals are accepted
+        self.assertRaises(ValueError, Pipeline.parseStage, "deleteElements __import__('os').getcwd()")
+
+    def testRunPipeline(self):
+        expected = TestCorpus.treeToStrings(self.getExpected().getroot())
+        for workers in [1, 2]:
+            output = os.path.join(self.tempDir, "output%d.xml" % workers)
+            counts = Pipeline.runPipeline(self.input, output, self.stages, workers, chunkSize=4)
+            self.assertEqual(TestCorpus.treeToStrings(ETUtils.ETFromObj(output).getroot()), expected)
+            self.assertEqual(counts["removeUnconnected: removed"] + counts["removeUnconnected: preserved"],
+                             len(self.corpus.findall("document/sentence/entity[@isName='False']")))
+
+    def testRepeatedStage(self):
+        output = os.path.join(self.tempDir, "output.xml")
+        counts = Pipeline.runPipeline(self.input, output, ["countSentences 1", "countSentences 10"])
+        self.assertEqual(counts, {"countSentences: sentences":11 * len(self.corpus.findall("document/sentence"))})
+
+    def testUnknownStage(self):
+        self.assertRaises(Exception, Pipeline.runPipeline, self.input, None, ["noSuchStage"])
+
+    def testProcessCorpus(self):
+        output = os.path.join(self.tempDir, "output.xml")
+        tree, counts = Pipeline.processCorpus(self.input, None, "removeUnconnected")
+        streamed, streamedCounts = Pipeline.processCorpus(self.input, output, "removeUnconnected", workers=2)
+        self.assertEqual(streamed, None)
+        self.assertEqual(streamedCounts, counts)
+        self.assertEqual(TestCorpus.treeToStrings(ETUtils.ETFromObj(output).getroot()), TestCorpus.treeToStrings(tree.getroot()))
+
+    def testTools(self):
+        output = os.path.join(self.tempDir, "output.xml")
+        expected = DeleteElements.processCorpus(self.input, None, {"interaction":{"type":"Cause"}, "pair":{}})
+        self.assertEqual(len(expected.getroot().findall("document/sentence/interaction[@type='Cause']")), 0)
+        self.assertEqual(DeleteElements.processCorpus(self.input, output, {"interaction":{"type":"Cause"}, "pair":{}}, stream=True), None)
+        self.assertEqual(TestCorpus.treeToStrings(ETUtils.ETFromObj(output).getroot()), TestCorpus.treeToStrings(expected.getroot()))
+
+if __name__ == "__main__":
+    unittest.main()
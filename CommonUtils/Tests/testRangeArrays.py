@@ -0,0 +1,83 @@
+"""
+Tests for comparing many character offsets at once (RangeArrays),
+compared against the functions for single ranges in Range.py.
+"""
+import sys, os
+import unittest
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+import Range
+import RangeArrays
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+def makeRange(rand):
+    begin = rand.randint(0, 40)
+    return (begin, begin + rand.randint(0, 10))
+
+def makeElements(rand, count):
+    elements = []
+    for i in range(count):
+        spans = [makeRange(rand) for j in range(rand.choice([1, 1, 1, 2, 3]))]
+        elements.append(ET.Element("entity", {"id":"e" + str(i), "charOffset":Range.tuplesToCharOffset(spans)}))
+    return elements
+
+class RangeArraysTest(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(7)
+        self.ranges1 = [makeRange(self.rand) for i in range(2000)]
+        self.ranges2 = [makeRange(self.rand) for i in range(2000)]
+
+    def getColumns(self, ranges):
+        return [x[0] for x in ranges], [x[1] for x in ranges]
+
+    def testSameAsRange(self):
+        begin1, end1 = self.getColumns(self.ranges1)
+        begin2, end2 = self.getColumns(self.ranges2)
+        pairs = zip(self.ranges1, self.ranges2)
+        self.assertEqual(RangeArrays.overlap(begin1, end1, begin2, end2), [Range.overlap(a, b) for a, b in pairs])
+        self.assertEqual(RangeArrays.contains(begin1, end1, begin2, end2), [Range.contains(a, b) for a, b in pairs])
+        self.assertEqual(RangeArrays.mismatch(begin1, end1, begin2, end2), [Range.mismatch(a, b) for a, b in pairs])
+        merged = RangeArrays.merge(begin1, end1, begin2, end2)
+        for i in range(len(pairs)):
+            if Range.overlap(*pairs[i]):
+                self.assertEqual((merged[0][i], merged[1][i]), Range.merge(*pairs[i]))
+        self.assert_(True in RangeArrays.contains(begin1, end1, begin2, end2)) # the ranges have enough variety
+        self.assert_(False in RangeArrays.overlap(begin1, end1, begin2, end2))
+
+    def testSingleRange(self):
+        begin1, end1 = self.getColumns(self.ranges1)
+        for other in self.ranges2[:20]:
+            self.assertEqual(RangeArrays.overlap(begin1, end1, other[0], other[1]), [Range.overlap(x, other) for x in self.ranges1])
+            self.assertEqual(RangeArrays.contains(other[0], other[1], begin1, end1), [Range.contains(other, x) for x in self.ranges1])
+            self.assertEqual(RangeArrays.mismatch(other[0], other[1], begin1, end1), [Range.mismatch(other, x) for x in self.ranges1])
+        self.assertEqual(RangeArrays.overlap([], [], 1, 2), [])
+        self.assertRaises(AssertionError, RangeArrays.overlap, 1, 2, 3, 4)
+        self.assertRaises(AssertionError, RangeArrays.overlap, [1], [2], [1, 2], [3, 4])
+
+    def testOffsetArray(self):
+        elements = makeElements(self.rand, 300)
+        array = RangeArrays.OffsetArray(elements)
+        self.assertEqual(len(array), len(elements))
+        for i in range(len(elements)):
+            self.assertEqual(array.getSpans(i), Range.charOffsetToTuples(elements[i].get("charOffset")))
+        for other in self.ranges2[:50]:
+            spans = [Range.charOffsetToTuples(x.get("charOffset")) for x in elements]
+            self.assertEqual(array.getOverlapping(other[0], other[1]),
+                             [i for i in range(len(spans)) if True in [Range.overlap(x, other) for x in spans[i]]])
+            self.assertEqual(array.getContaining(other[0], other[1]),
+                             [i for i in range(len(spans)) if True in [Range.contains(x, other) for x in spans[i]]])
+            self.assertEqual(array.getContained(other[0], other[1]),
+                             [i for i in range(len(spans)) if True in [Range.contains(other, x) for x in spans[i]]])
+        self.assertEqual(RangeArrays.OffsetArray([]).getOverlapping(0, 10), [])
+
+    def testFromSpans(self):
+        array = RangeArrays.fromSpans(self.ranges1[:10])
+        self.assertEqual(array.elements, self.ranges1[:10])
+        self.assertEqual(zip(array.begin, array.end), self.ranges1[:10])
+        self.assertEqual(array.getOverlapping(5, 6), [i for i in range(10) if Range.overlap(self.ranges1[i], (5, 6))])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Tests for recalculating the ids of a corpus one document at a time
+(RecalculateIds.recalculateIdsStreaming), compared against the whole
+corpus in memory.
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import RecalculateIds
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+class RecalculateIdsTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.input = os.path.join(self.tempDir, "input.xml")
+        TestCorpus.writeCorpus(self.input, 10, "OLD")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def testSameAsInMemory(self):
+        for onlyWithinSentence in [False, True]:
+            expected = RecalculateIds.recalculateIds(self.input, None, onlyWithinSentence, 5).getroot()
+            output = os.path.join(self.tempDir, "output.xml")
+            self.assertEqual(RecalculateIds.recalculateIdsStreaming(self.input, output, onlyWithinSentence, 5, "NEW"), 10)
+            root = ETUtils.ETFromObj(output).getroot()
+            if not onlyWithinSentence:
+                self.assertEqual(root.find("document").get("id"), "NEW.d5")
+                for element in expected.getiterator():
+                    for key in ["id", "e1", "e2"]:
+                        if element.get(key) != None:
+                            element.set(key, element.get(key).replace("OLD.", "NEW."))
+            self.assertEqual(TestCorpus.treeToStrings(root), TestCorpus.treeToStrings(expected))
+
+    def testError(self):
+        # an interaction referring to an entity in another document
+        corpus = TestCorpus.makeCorpus(10, "OLD")
+        documents = corpus.findall("document")
+        failing = [i for i in range(1, 10) if documents[i].find("sentence/interaction") != None][0]
+        interaction = documents[failing].find("sentence/interaction")
+        interaction.set("e1", corpus.find("document/sentence/entity").get("id"))
+        ETUtils.write(corpus, self.input)
+        output = os.path.join(self.tempDir, "output.xml")
+        # a new output file is removed
+        self.assertRaises(KeyError, RecalculateIds.recalculateIdsStreaming, self.input, output)
+        self.assertEqual(os.listdir(self.tempDir), ["input.xml"])
+        # an existing output file is left as it was
+        open(output, "wt").write("old")
+        self.assertRaises(KeyError, RecalculateIds.recalculateIdsStreaming, self.input, output)
+        self.assertEqual(open(output).read(), "old")
+        self.assertEqual(sorted(os.listdir(self.tempDir)), ["input.xml", "output.xml"])
+        # the documents are added to an open writer, which is not aborted
+        writer = ETUtils.ElementWriter(os.path.join(self.tempDir, "writer.xml"), corpus)
+        self.assertRaises(KeyError, RecalculateIds.recalculateIdsStreaming, self.input, writer)
+        self.assertEqual(writer.count, failing)
+        writer.close()
+
+if __name__ == "__main__":
+    unittest.main()
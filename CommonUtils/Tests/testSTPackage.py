@@ -0,0 +1,98 @@
+"""
+Tests for reading and writing shared task sets as tar packages
+(STTools loadPackage and writePackage), compared against reading and
+writing them as directories.
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import random
+import tarfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../STFormat")
+import STTools
+import TestCorpus
+
+def getAnnotationState(annotation):
+    if annotation == None:
+        return None
+    return (annotation.id, annotation.type, annotation.charBegin, annotation.charEnd, annotation.text)
+
+def getState(documents):
+    state = []
+    for doc in documents:
+        events = []
+        for event in doc.events:
+            events.append( (event.id, event.type, getAnnotationState(event.trigger),
+                            [(x.type, x.target.id, x.site and x.site.id) for x in event.arguments],
+                            event.negation != None, event.speculation != None) )
+        state.append( (doc.id, doc.text, [getAnnotationState(x) for x in doc.proteins],
+                       [getAnnotationState(x) for x in doc.triggers], events) )
+    return state
+
+def readPackage(filename):
+    """ The contents of the package members by file name """
+    contents = {}
+    packageFile = tarfile.open(filename, "r:gz")
+    for member in packageFile.getmembers():
+        contents[member.name] = packageFile.extractfile(member).read()
+    packageFile.close()
+    return contents
+
+def readDir(dir, extensions):
+    contents = {}
+    for filename in os.listdir(dir):
+        if STTools.splitFileName(filename)[1] in extensions:
+            contents[filename] = open(os.path.join(dir, filename), "rb").read()
+    return contents
+
+class PackageTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.input = os.path.join(self.tempDir, "input")
+        os.makedirs(self.input)
+        rand = random.Random(3)
+        for i in range(20):
+            TestCorpus.writeSTDocument(self.input, str(1000 + i), rand)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def makePackage(self, name, mode, arcDir=""):
+        """ A package of the input files, as made with tar """
+        filename = os.path.join(self.tempDir, name)
+        packageFile = tarfile.open(filename, mode)
+        for file in sorted(os.listdir(self.input), reverse=True): # not grouped by document
+            packageFile.add(os.path.join(self.input, file), os.path.join(arcDir, file))
+        packageFile.close()
+        return filename
+
+    def testLoadPackage(self):
+        expected = getState(STTools.loadSet(self.input))
+        for name, mode, arcDir in [("input.tar.gz", "w:gz", ""), ("input.tar", "w", "input/"), ("input.tar.bz2", "w:bz2", "a/b")]:
+            filename = self.makePackage(name, mode, arcDir)
+            self.assertEqual(getState(STTools.loadPackage(filename)), expected)
+            self.assertEqual(getState(STTools.loadSet(filename)), expected)
+        # only the text
+        documents = STTools.loadSet(filename, level="txt")
+        self.assertEqual([(x.id, x.text, x.proteins, x.events) for x in documents], [(x[0], x[1], [], []) for x in expected])
+
+    def testMissingText(self):
+        os.remove(os.path.join(self.input, "1005.txt"))
+        filename = self.makePackage("input.tar.gz", "w:gz")
+        self.assertRaises(Exception, STTools.loadPackage, filename)
+
+    def testWritePackage(self):
+        output = os.path.join(self.tempDir, "output")
+        STTools.writeSet(STTools.loadSet(self.input), output, makePackage=False)
+        packageFilename = os.path.join(self.tempDir, "output-package.tar.gz")
+        STTools.writeSet(STTools.loadSet(self.input), packageFilename)
+        self.assertEqual(readPackage(packageFilename), readDir(output, ["txt", "a1", "a2"]))
+        self.assertEqual(getState(STTools.loadSet(packageFilename)), getState(STTools.loadSet(output)))
+        # only the result files
+        packageFilename = os.path.join(self.tempDir, "output-a2.tar.gz")
+        STTools.writePackage(STTools.loadSet(self.input), packageFilename, includeTags=["a2"], workers=2)
+        self.assertEqual(readPackage(packageFilename), readDir(output, ["a2"]))
+
+if __name__ == "__main__":
+    unittest.main()
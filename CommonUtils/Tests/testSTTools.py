@@ -0,0 +1,136 @@
+"""
+Tests for reading and writing shared task sets with a pool of threads
+(STTools loadSet and writeSet workers), compared against a single worker,
+and for the memory used by the annotation classes.
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import random
+import tarfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../STFormat")
+import STTools
+import TestCorpus
+from testSTPackage import getState, readPackage, readDir
+
+def getMemberNames(filename):
+    packageFile = tarfile.open(filename, "r:gz")
+    names = packageFile.getnames()
+    packageFile.close()
+    return names
+
+class WorkersTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.input = os.path.join(self.tempDir, "input")
+        os.makedirs(self.input)
+        rand = random.Random(5)
+        for i in range(30):
+            TestCorpus.writeSTDocument(self.input, str(2000 + i), rand, i % 3 == 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def testLoadOrder(self):
+        expected = getState(STTools.loadSet(self.input))
+        self.assertEqual([x[0] for x in expected], sorted([x[0] for x in expected]))
+        for workers in [2, 4, 0]:
+            self.assertEqual(getState(STTools.loadSet(self.input, workers=workers)), expected)
+
+    def testWriteSet(self):
+        outputs = []
+        for workers in [1, 3]:
+            output = os.path.join(self.tempDir, "output" + str(workers))
+            STTools.writeSet(STTools.loadSet(self.input), output, workers=workers)
+            outputs.append(output)
+        self.assertEqual(readDir(outputs[0], ["txt", "a1", "a2"]), readDir(outputs[1], ["txt", "a1", "a2"]))
+        # the package members are in the order of the documents
+        self.assertEqual(getMemberNames(outputs[1] + ".tar.gz"), getMemberNames(outputs[0] + ".tar.gz"))
+        self.assertEqual(readPackage(outputs[1] + ".tar.gz"), readPackage(outputs[0] + ".tar.gz"))
+        packages = []
+        for workers in [1, 3]:
+            packages.append(os.path.join(self.tempDir, "package" + str(workers) + ".tar.gz"))
+            STTools.writeSet(STTools.loadSet(self.input), packages[-1], workers=workers)
+        self.assertEqual(getMemberNames(packages[1]), getMemberNames(packages[0]))
+        self.assertEqual(readPackage(packages[1]), readPackage(packages[0]))
+        self.assertEqual(readPackage(packages[0]), readDir(outputs[0], ["txt", "a1", "a2"]))
+
+    def testLoadErrors(self):
+        for id in ["2004", "2011"]: # an argument referring to a missing protein
+            open(os.path.join(self.input, id + ".a2"), "at").write("E99\tGene_expression:T99 Theme:T98\n")
+        # a single worker raises the original exception at the first failure
+        self.assertRaises(KeyError, STTools.loadSet, self.input)
+        try:
+            STTools.loadSet(self.input, workers=3)
+            self.fail("No exception")
+        except STTools.DocumentError, e:
+            self.assertEqual([x[0] for x in e.errors], ["2004", "2011"])
+            self.assert_(isinstance(e.errors[0][1], KeyError))
+
+    def testWriteErrors(self):
+        for workers in [1, 3]:
+            documents = STTools.loadSet(self.input)
+            for doc in documents[5], documents[20]:
+                doc.events = None
+            output = os.path.join(self.tempDir, "output" + str(workers))
+            if workers == 1:
+                self.assertRaises(TypeError, STTools.writeSet, documents, output, workers=workers)
+                continue
+            try:
+                STTools.writeSet(documents, output, workers=workers)
+                self.fail("No exception")
+            except STTools.DocumentError, e:
+                self.assertEqual([x[0] for x in e.errors], [documents[5].id, documents[20].id])
+            # the other documents are written
+            self.assertEqual(len(readDir(output, ["txt"])), len(documents) - 2)
+            self.assertEqual(len(readPackage(output + ".tar.gz")), len(documents) - 2)
+
+class MemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        rand = random.Random(6)
+        for i in range(20):
+            TestCorpus.writeSTDocument(self.tempDir, str(3000 + i), rand, i % 2 == 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def testArgument(self):
+        arg = STTools.Argument("Theme", "T1")
+        self.assertEqual(arg, STTools.Argument("Theme", "T1", None))
+        self.assertEqual(list(arg), ["Theme", "T1", None])
+        arg[1] = "T2"
+        self.assertEqual(arg.target, "T2")
+        # mutable, so not hashable
+        self.assertRaises(TypeError, hash, arg)
+        self.assertRaises(TypeError, set, [arg])
+
+    def testDictClasses(self):
+        documents = STTools.loadSet(self.tempDir)
+        copies = STTools.toDictClasses(documents)
+        self.assert_(hasattr(copies[0], "__dict__") and hasattr(copies[0].events[0], "__dict__"))
+        state = getState(documents)
+        for docCopy in copies:
+            for event in docCopy.events:
+                # the arguments are lists of the copied annotations
+                for arg in event.arguments:
+                    self.assert_(isinstance(arg, list) and isinstance(arg[1], STTools.DictAnnotation))
+                # getState reads the arguments by name
+                event.arguments = [STTools.Argument(*x) for x in event.arguments]
+        self.assertEqual(getState(copies), state)
+        self.assert_(len([x for x in copies if len(x.relations) > 0]) > 0)
+        for docCopy in copies:
+            for relation in docCopy.relations:
+                self.assert_(isinstance(relation.arguments[0], tuple))
+        self.assert_(STTools.getMemoryUsage(STTools.toDictClasses(documents)) > STTools.getMemoryUsage(documents))
+        stderr = sys.stderr
+        sys.stderr = open(os.devnull, "wt")
+        try:
+            self.assertEqual(STTools.benchmarkMemory(self.tempDir, compareOld=True), STTools.getMemoryUsage(STTools.loadSet(self.tempDir)))
+        finally:
+            sys.stderr.close()
+            sys.stderr = stderr
+
+if __name__ == "__main__":
+    unittest.main()
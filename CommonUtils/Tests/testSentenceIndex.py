@@ -0,0 +1,129 @@
+"""
+Tests for reading elements by byte offset (cElementTreeUtils.OffsetReader),
+the persistent sentence index (SentenceIndex) and copying elements through
+it (CopyElements).
+"""
+import sys, os
+import unittest
+import tempfile, shutil
+import time
+import gzip
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML/Tools")
+import cElementTreeUtils as ETUtils
+import TestCorpus
+import SentenceIndex
+import CopyElements
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+class SentenceIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.corpus = TestCorpus.makeCorpus(30)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def writeCorpus(self, name, root=None):
+        filename = os.path.join(self.tempDir, name)
+        if root == None:
+            root = self.corpus
+        if name.endswith(".plain.gz"): # an ordinary single member gzip file
+            out = gzip.open(filename, "wb")
+            ET.ElementTree(root).write(out, "utf-8")
+            out.close()
+        else:
+            ETUtils.write(root, filename)
+        return filename
+
+    def testOffsetReader(self):
+        expected = TestCorpus.treeToStrings(self.corpus, "sentence")
+        for name in ["corpus.xml", "corpus.xml.gz"]:
+            filename = self.writeCorpus(name)
+            self.assert_(ETUtils.canReadByOffset(filename))
+            offsets = []
+            ETUtils.scanElements(filename, ["sentence"], lambda t,a,b,e: offsets.append((a["id"],b,e)), chunkSize=1000)
+            reader = ETUtils.OffsetReader(filename)
+            sentences = [reader.readElement(b, e) for id, b, e in offsets]
+            reader.close()
+            self.assertEqual([x.get("id") for x in sentences], [x[0] for x in offsets])
+            self.assertEqual([TestCorpus.treeToStrings(x, "sentence")[0] for x in sentences], expected)
+
+    def testOtherFormats(self):
+        for name in ["corpus.xml.bz2", "corpus.plain.gz"]:
+            filename = self.writeCorpus(name)
+            self.assert_(not ETUtils.canReadByOffset(filename))
+            self.assertRaises(IOError, ETUtils.OffsetReader, filename)
+            # the index is not built before failing
+            self.assertRaises(IOError, SentenceIndex.SentenceIndex, filename, ("text",))
+            self.assert_(not os.path.exists(SentenceIndex.getIndexPath(filename, ("text",))))
+
+    def testIndex(self):
+        filename = self.writeCorpus("corpus.xml.gz")
+        index = SentenceIndex.SentenceIndex(filename, ("id", "text"))
+        sentences = self.corpus.findall("document/sentence")
+        self.assertEqual(len(index), len(sentences))
+        for sentence in sentences:
+            self.assert_(index.has_key(sentence))
+            self.assertEqual(ET.tostring(index.get(sentence)).split(">")[0], ET.tostring(sentence).split(">")[0])
+            self.assertEqual(len(index.getAll(sentence)), 1)
+        self.assertEqual(index.get(ET.Element("sentence", {"id":"none", "text":""})), None)
+        index.close()
+        # sentences with the same text share a key
+        index = SentenceIndex.SentenceIndex(filename, ("text",))
+        texts = [x.get("text") for x in sentences]
+        self.assertEqual(len(index.getAll(sentences[0])), texts.count(sentences[0].get("text")))
+        index.close()
+
+    def testIndexReuse(self):
+        filename = self.writeCorpus("corpus.xml")
+        SentenceIndex.SentenceIndex(filename, ("id",)).close()
+        indexPath = SentenceIndex.getIndexPath(filename, ("id",))
+        self.assert_(SentenceIndex.isIndexValid(filename, indexPath, ("id",)))
+        self.assert_(not SentenceIndex.isIndexValid(filename, indexPath, ("text",)))
+        mtime = os.path.getmtime(indexPath)
+        SentenceIndex.SentenceIndex(filename, ("id",)).close()
+        self.assertEqual(os.path.getmtime(indexPath), mtime)
+        # a changed corpus is indexed again
+        self.writeCorpus("corpus.xml", TestCorpus.makeCorpus(3, "NEW"))
+        os.utime(filename, (time.time() + 10, time.time() + 10))
+        self.assert_(not SentenceIndex.isIndexValid(filename, indexPath, ("id",)))
+        index = SentenceIndex.SentenceIndex(filename, ("id",))
+        self.assertEqual(len(index), len(TestCorpus.makeCorpus(3, "NEW").findall("document/sentence")))
+        index.close()
+
+    def testCopyElements(self):
+        target = TestCorpus.makeCorpus(30)
+        for parses in target.getiterator("parses"):
+            parses.remove(parses.find("parse"))
+        extra = ET.SubElement(target.find("document"), "sentence", {"id":"TEST.d0.s9", "text":"no source"})
+        ET.SubElement(ET.SubElement(extra, "sentenceanalyses"), "parses")
+        targetFilename = self.writeCorpus("target.xml", target)
+        for name in ["source.xml", "source.xml.gz", "source.xml.bz2", "source.plain.gz"]:
+            source = self.writeCorpus(name)
+            output = os.path.join(self.tempDir, "output.xml")
+            copied, skipped = CopyElements.copyElementsStreaming(source, targetFilename, output, "document/sentence", ["id", "text"],
+                                                                 "sentenceanalyses/parses/parse", {"parser":"split"})
+            self.assertEqual((copied, skipped), (len(self.corpus.findall("document/sentence")), 1))
+            outputRoot = ETUtils.ETFromObj(output).getroot()
+            self.assertEqual(outputRoot.find("document").findall("sentence")[-1].find("sentenceanalyses/parses").getchildren(), [])
+            self.assertEqual(TestCorpus.treeToStrings(outputRoot, "parse"), TestCorpus.treeToStrings(self.corpus, "parse"))
+
+    def testCopyToTarget(self):
+        # the output can replace the target it is read from
+        target = TestCorpus.makeCorpus(5)
+        for parses in target.getiterator("parses"):
+            parses.remove(parses.find("parse"))
+        targetFilename = self.writeCorpus("target.xml.gz", target)
+        source = self.writeCorpus("source.xml")
+        CopyElements.copyElementsStreaming(source, targetFilename, targetFilename, "document/sentence", ["id"],
+                                           "sentenceanalyses/parses/parse", {})
+        self.assertEqual(len(ETUtils.ETFromObj(targetFilename).getroot().findall("document/sentence/sentenceanalyses/parses/parse")),
+                         len(TestCorpus.makeCorpus(5).findall("document/sentence")))
+
+if __name__ == "__main__":
+    unittest.main()
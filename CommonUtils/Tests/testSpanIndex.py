@@ -0,0 +1,119 @@
+"""
+Tests for the interval index of character offsets (SpanIndex), compared
+against a brute force search with Range.py.
+"""
+import sys, os
+import unittest
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../InteractionXML")
+import Range
+from SpanIndex import SpanIndex
+from SentenceElements import SentenceElements
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import cElementTree as ET
+
+def makeSpans(count, seed):
+    rand = random.Random(seed)
+    spans = []
+    for i in range(count):
+        begin = rand.randint(0, 200)
+        spans.append( (begin, begin + rand.randint(0, 15)) )
+    return spans
+
+def bruteForce(spans, test):
+    return [i for i in range(len(spans)) if test(spans[i])]
+
+class SpanIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.spans = makeSpans(300, 1)
+        self.index = SpanIndex(self.spans, ["v" + str(i) for i in range(len(self.spans))])
+        self.queries = makeSpans(200, 2) + [(0, 0), (215, 300), (-5, -1)]
+
+    def testOverlapping(self):
+        for query in self.queries:
+            self.assertEqual(self.index.findOverlapping(query),
+                             bruteForce(self.spans, lambda x: Range.overlap(x, query)))
+
+    def testContaining(self):
+        for query in self.queries:
+            self.assertEqual(self.index.findContaining(query),
+                             bruteForce(self.spans, lambda x: Range.contains(x, query)))
+
+    def testContained(self):
+        for query in self.queries:
+            self.assertEqual(self.index.findContained(query),
+                             bruteForce(self.spans, lambda x: Range.contains(query, x)))
+
+    def testBeginningAndEndingAt(self):
+        for position in range(-1, 220):
+            self.assertEqual(self.index.findBeginningAt(position),
+                             bruteForce(self.spans, lambda x: x[0] == position))
+            self.assertEqual(self.index.findEndingAt(position),
+                             bruteForce(self.spans, lambda x: x[1] == position))
+
+    def testValues(self):
+        query = self.queries[0]
+        self.assertEqual(self.index.getOverlapping(query),
+                         ["v" + str(i) for i in self.index.findOverlapping(query)])
+
+    def testAddAfterQuery(self):
+        index = SpanIndex(self.spans[:100])
+        index.findOverlapping((0, 10))
+        for span in self.spans[100:]:
+            index.add(span)
+        for query in self.queries:
+            self.assertEqual(index.findOverlapping(query),
+                             bruteForce(self.spans, lambda x: Range.overlap(x, query)))
+
+    def testEmpty(self):
+        index = SpanIndex()
+        self.assertEqual(index.findOverlapping((0, 10)), [])
+        self.assertEqual(index.findContained((0, 10)), [])
+        self.assertEqual(index.findBeginningAt(0), [])
+
+    def testElements(self):
+        element = ET.Element("entity", {"charOffset":"0-3,10-12"})
+        index = SpanIndex()
+        index.addElement(element)
+        index.addElement(ET.Element("entity")) # no offset, skipped
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.getOverlapping((11, 11)), [element])
+
+class SentenceElementsTest(unittest.TestCase):
+    def setUp(self):
+        sentence = ET.fromstring(
+            "<sentence id='d0.s0' text='IL-2 binds STAT5'>"
+            "<entity id='d0.s0.e0' charOffset='0-3' type='Protein' isName='True'/>"
+            "<entity id='d0.s0.e1' charOffset='11-15' type='Protein' isName='True'/>"
+            "<sentenceanalyses><tokenizations><tokenization tokenizer='split'>"
+            "<token id='t1' charOffset='0-3' text='IL-2'/>"
+            "<token id='t2' charOffset='5-9' text='binds'/>"
+            "<token id='t3' charOffset='11-15' text='STAT5'/>"
+            "</tokenization></tokenizations>"
+            "<parses><parse parser='split' tokenizer='split'/></parses>"
+            "</sentenceanalyses></sentence>")
+        self.elements = SentenceElements(sentence, parse="split")
+
+    def testEntityTokens(self):
+        entityTokens = self.elements.getEntityTokens()
+        self.assertEqual(entityTokens["d0.s0.e0"], ["t1"])
+        self.assertEqual(entityTokens["d0.s0.e1"], ["t3"])
+        self.assertEqual(entityTokens[None], ["t2"])
+
+    def testReplacedList(self):
+        self.assertEqual(self.elements.getEntity((5, 9)), None)
+        self.elements.entities = self.elements.entities + [ET.Element("entity", {"id":"d0.s0.e2", "charOffset":"5-9"})]
+        self.assertEqual(self.elements.getEntity((5, 9)), "d0.s0.e2")
+
+    def testInvalidate(self):
+        self.assertEqual(self.elements.getEntity((0, 3)), "d0.s0.e0")
+        # same length, changed in place
+        self.elements.entities[0] = ET.Element("entity", {"id":"d0.s0.e2", "charOffset":"0-3"})
+        self.elements.invalidateSpanIndices()
+        self.assertEqual(self.elements.getEntity((0, 3)), "d0.s0.e2")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Tests for removing duplicate shared task events (STFormat/Validate.py),
+compared against the previous implementation, which compared all event
+pairs until no more duplicates were found.
+"""
+import sys, os
+import unittest
+import random
+import imp
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/../STFormat")
+import Validate
+from STTools import Annotation, Argument
+
+# The previous implementation
+
+def oldRemoveDuplicates(events):
+    numRemoved = 1
+    totalRemoved = 0
+    while(numRemoved > 0):
+        # Group duplicate events
+        duplGroups = {}
+        isDuplicate = {}
+        for i in range(len(events)-1):
+            e1 = events[i]
+            duplGroups[e1] = [] # "same as e1"
+            for j in range(i+1, len(events)):
+                e2 = events[j]
+                if Validate.compareEvents(e1, e2):
+                    if e2 not in isDuplicate: # else already added to a duplGroup
+                        isDuplicate[e2] = True
+                        duplGroups[e1].append(e2)
+        # Mark events for keeping or removal
+        replaceWith = {}
+        toRemove = set()
+        for mainEvent, duplGroup in duplGroups.iteritems():
+            for event in duplGroup:
+                assert event not in replaceWith
+                replaceWith[event] = mainEvent
+                toRemove.add(event)
+        # Remove events and remap arguments
+        kept = []
+        for event in events:
+            if event not in toRemove:
+                for arg in event.arguments:
+                    if arg[1] in replaceWith:
+                        assert arg[2] == None
+                        arg[1] = replaceWith[arg[1]]
+                kept.append(event)
+        numRemoved = len(events) - len(kept)
+        totalRemoved += numRemoved
+        events = kept
+    return events
+
+def makeEvents(seed):
+    """ Events nesting earlier events, so that removing a duplicate can make
+    the events nesting it duplicates too
+    """
+    rand = random.Random(seed)
+    proteins = [Annotation("T%d" % i, "Protein") for i in range(rand.randint(1, 4))]
+    triggers = [Annotation("T%d" % (i + 10), "Regulation") for i in range(rand.randint(1, 3))]
+    sites = [None, None, None, Annotation("T99", "Entity")]
+    events = []
+    for i in range(rand.randint(1, 25)):
+        event = Annotation("E%d" % i, rand.choice(["Regulation", "Binding"]), trigger=rand.choice(triggers))
+        for j in range(rand.randint(1, 2)):
+            if len(events) > 0 and rand.random() < 0.6:
+                event.arguments.append(Argument(rand.choice(["Theme", "Cause"]), rand.choice(events)))
+            else:
+                event.arguments.append(Argument(rand.choice(["Theme", "Cause"]), rand.choice(proteins), rand.choice(sites)))
+        events.append(event)
+    if rand.random() < 0.5:
+        rand.shuffle(events)
+    return events
+
+def getState(events):
+    return [(e.id, [(a[0], a[1].id, a[2] and a[2].id) for a in e.arguments]) for e in events]
+
+class RemoveDuplicatesTest(unittest.TestCase):
+    def testSameAsOld(self):
+        removed = 0
+        for seed in range(2000):
+            expected = oldRemoveDuplicates(makeEvents(seed))
+            events = makeEvents(seed)
+            self.assertEqual(getState(Validate.removeDuplicates(events)), getState(expected))
+            removed += len(events) - len(expected)
+        self.assert_(removed > 500) # the events have enough duplicates
+
+    def testNested(self):
+        protein = Annotation("T1", "Protein")
+        trigger = Annotation("T2", "Regulation")
+        e1 = Annotation("E1", "Regulation", trigger=trigger, arguments=[Argument("Theme", protein)])
+        e2 = Annotation("E2", "Regulation", trigger=trigger, arguments=[Argument("Theme", protein)])
+        e3 = Annotation("E3", "Regulation", trigger=trigger, arguments=[Argument("Theme", e1)])
+        e4 = Annotation("E4", "Regulation", trigger=trigger, arguments=[Argument("Theme", e2)])
+        self.assertEqual([x.id for x in Validate.removeDuplicates([e1, e2, e3, e4])], ["E1", "E3"])
+
+    def testCommonUtilsModule(self):
+        # CommonUtils/Validate.py uses the same functions
+        module = imp.load_source("CommonUtilsValidate", os.path.dirname(os.path.abspath(__file__))+"/../Validate.py")
+        self.assertEqual(module.removeDuplicates.__module__, "STFormat.Validate")
+        self.assertEqual(getState(module.removeDuplicates(makeEvents(3))), getState(oldRemoveDuplicates(makeEvents(3))))
+
+if __name__ == "__main__":
+    unittest.main()
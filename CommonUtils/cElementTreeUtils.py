@@ -19,7 +19,27 @@ try:
 except ImportError:
     import xml.etree.cElementTree as ElementTree
 
+import os
+import re
+import mmap
+import shutil
+import tempfile
+from xml.parsers import expat
+import bz2
 from gzip import GzipFile
+import ParallelGzip
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+# Number of threads used to compress and decompress .gz files. If None,
+# one thread per core is used, at most ParallelGzip.MAX_DEFAULT_WORKERS.
+# If 0, files are written as a single gzip member with GzipFile, as before.
+gzipWorkers = None
 
 def removeAll(element):
     for child in list(element):
@@ -27,11 +47,182 @@ def removeAll(element):
     for child in list(element):
         element.remove(child)
 
+###############################################################################
+# File container formats
+###############################################################################
+
+# Registered container formats by name, in order of registration
+formats = {}
+formatNames = []
+# File name extensions of uncompressed xml-files
+xmlSuffixes = [".xml", ".svg", ".nxml", ".csml"]
+
+def registerFormat(name, magic, suffixes, reader, writer):
+    """ Register a container format for xml-files
+    
+    When reading, the format is detected from the first bytes of the
+    file. When writing, it is chosen by the file name extension.
+    
+    Keyword arguments:
+    name -- (string) name of the format
+    magic -- (string) the bytes all files in this format start with,
+             or None if the format can't be detected by its content
+    suffixes -- (list) file name extensions of the format, e.g. [".gz"]
+    reader -- (function) called with a file name, returns an open
+              file-like object with the uncompressed content
+    writer -- (function) called with a file name, returns a file-like
+              object that stores what is written to it in this format
+    """
+    if name not in formats:
+        formatNames.append(name)
+    formats[name] = (magic, suffixes, reader, writer)
+
+def detectFormat(filename):
+    """ Returns the name of the format of an existing file, or None
+    
+    The format is determined by the magic bytes at the start of the
+    file. Files with no magic bytes are "plain" if they have one of
+    the xmlSuffixes or start like an xml-file.
+    """
+    f = open(filename, "rb")
+    head = f.read(16)
+    f.close()
+    for name in formatNames:
+        magic = formats[name][0]
+        if magic != None and head.startswith(magic):
+            return name
+    for name in formatNames:
+        for suffix in formats[name][1]:
+            if filename.endswith(suffix):
+                return name
+    if os.path.splitext(filename)[1] in xmlSuffixes or head.lstrip("\xef\xbb\xbf \t\r\n").startswith("<"):
+        return "plain"
+    return None
+
+def getOutputFormat(filename):
+    """ Returns the name of the format used for writing a file """
+    for name in formatNames:
+        for suffix in formats[name][1]:
+            if filename.endswith(suffix):
+                return name
+    return "plain"
+
+def openPlainInput(filename):
+    f = open(filename, "rb")
+    if os.fstat(f.fileno()).st_size == 0: # empty files can't be mapped
+        return f
+    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.close()
+    return mapped
+
+def openGzipInput(filename):
+    if gzipWorkers == 0:
+        return GzipFile(filename,"rt")
+    return ParallelGzip.openGzip(filename,"rt",gzipWorkers)
+
+def openGzipOutput(filename):
+    if gzipWorkers == 0:
+        return GzipFile(filename,"wt")
+    return ParallelGzip.openGzip(filename,"wt",gzipWorkers)
+
+registerFormat("gzip", "\x1f\x8b", [".gz"], openGzipInput, openGzipOutput)
+registerFormat("bz2", "BZh", [".bz2"], lambda x: bz2.BZ2File(x, "r"), lambda x: bz2.BZ2File(x, "w"))
+if lzma != None:
+    registerFormat("xz", "\xfd7zXZ\x00", [".xz"], lambda x: lzma.LZMAFile(x, "r"), lambda x: lzma.LZMAFile(x, "w"))
+registerFormat("plain", None, [], openPlainInput, lambda x: open(x, "wt"))
+
+def openInput(filename, format=None):
+    """ Open an xml-file for reading
+    
+    Compressed files are decompressed on the fly. Gzip-files written
+    by openOutput are decompressed in parallel (see gzipWorkers), and
+    uncompressed files are memory mapped.
+    
+    Keyword arguments:
+    filename -- (string) path of the file
+    format -- (string) name of a registered format. If None, the format
+              is detected from the file content (see detectFormat).
+    """
+    if format == None:
+        format = detectFormat(filename)
+        if format == None:
+            compressed = [x for x in formatNames if x != "plain"]
+            raise ValueError("%s: File format not recognized (expected xml, or xml compressed with %s)"%(filename, ", ".join(compressed)))
+    return formats[format][2](filename)
+
+class ElementStream:
+    """ Iterate over the elements of one name in a large xml-file
+    
+    The file is parsed incrementally and each matching element is
+    yielded once it has been fully parsed, together with all of its
+    subelements. When iteration proceeds to the next element, the
+    previous one is detached from its parent, so that only the
+    element currently being processed is kept in memory (unless the
+    caller keeps a reference to it). The caller may also detach the
+    element or move it into another tree.
+    
+    The root element is read when the stream is created and is
+    available as the attribute "root", so that f.e. the attributes
+    of a corpus-element can be used before any documents are read.
+    Processed elements are not kept in the root.
+    
+    Example:
+    stream = ElementStream("corpus.xml.gz", "document")
+    print stream.root.get("source")
+    for document in stream:
+        ...
+    """
+    def __init__(self, input, elementName, limit=-1):
+        """
+        Keyword arguments:
+        input -- (string) file name or (file) file-like object to parse
+        elementName -- (string) matching elements are yielded
+        limit -- (int) stop after reading "limit" elements. If -1, read
+                 until end of file.
+        """
+        self.ownsStream = isinstance(input,str) or isinstance(input,unicode)
+        if self.ownsStream:
+            self.stream = openInput(input)
+        else:
+            self.stream = input
+        self.elementName = elementName
+        self.limit = limit
+        self.context = iter(ElementTree.iterparse(self.stream, events=("start", "end")))
+        event, self.root = self.context.next() # the first element is root
+        self.stack = [self.root]
+    
+    def __iter__(self):
+        limit = self.limit
+        stack = self.stack
+        try:
+            for event, elem in self.context:
+                if event == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if elem.tag == self.elementName and len(stack) > 0:
+                    if limit == 0:
+                        break
+                    yield elem
+                    try:
+                        stack[-1].remove(elem)
+                    except ValueError: # the caller has already detached or moved the element
+                        pass
+                    if limit != -1:
+                        limit -= 1
+        finally: # also when the caller stops iterating
+            self.close()
+    
+    def close(self):
+        if self.ownsStream:
+            self.stream.close()
+
 def iterparse(file, elementName, callback, limit = -1):
     """ Parse iteratively xml-files
     
     This function offers a simple way to use the cElementTree
-    iterparse-function the way it is often used.
+    iterparse-function the way it is often used. For a generator
+    interface, use ElementStream.
     
     Keyword arguments:
     file -- (file) file or file-like object to parse 
@@ -42,21 +233,115 @@ def iterparse(file, elementName, callback, limit = -1):
              until end of file. This is mostly useful when debugging
              programs that parse large files.
     """
-    context = ElementTree.iterparse(file, events=("start", "end"))
-    root = None
+    for elem in ElementStream(file, elementName, limit):
+        callback(elem)
+
+###############################################################################
+# Random access by byte offset
+###############################################################################
+
+# Matches a start tag, group 1 is "/" for an empty element
+startTagPattern = re.compile(r"""<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*(/?)>""")
 
-    for event, elem in context:
-        if limit == 0:
+def scanElements(input, tags, callback, chunkSize=1<<20):
+    """ Find the byte offsets of elements without building a tree
+    
+    The file is parsed with expat, and for each element with one of the
+    tags the callback is called with the tag, the attributes and the
+    offsets of the element in the uncompressed file. The offsets cover
+    the element from the start of its start tag to the end of its end
+    tag, so the element can later be read with an OffsetReader.
+    Elements are reported in the order they end.
+    
+    Keyword arguments:
+    input -- (string) file name
+    tags -- (list) names of the elements to find
+    callback -- (function) called with (tag, attribute dictionary,
+                begin offset, end offset) for each matching element
+    chunkSize -- (int) number of bytes parsed at a time
+    """
+    tags = set(tags)
+    stream = openInput(input)
+    parser = expat.ParserCreate()
+    # The data since the last element event is kept, as the tags of the
+    # following events start after it
+    state = {"window":"", "windowStart":0, "last":0}
+    openElements = []
+    def startElement(name, attrs):
+        begin = state["last"] = parser.CurrentByteIndex
+        if name not in tags:
+            return
+        match = startTagPattern.match(state["window"], begin - state["windowStart"])
+        assert match != None, (name, begin)
+        if match.group(1) == "/": # empty element, no end tag
+            callback(name, attrs, begin, begin + len(match.group(0)))
+            openElements.append(None)
+        else:
+            openElements.append( (attrs, begin) )
+    def endElement(name):
+        position = state["last"] = parser.CurrentByteIndex
+        if name not in tags:
+            return
+        element = openElements.pop()
+        if element == None:
             return
+        end = state["window"].index(">", position - state["windowStart"]) + 1 + state["windowStart"]
+        callback(name, element[0], element[1], end)
+    parser.StartElementHandler = startElement
+    parser.EndElementHandler = endElement
+    while True:
+        data = stream.read(chunkSize)
+        state["window"] += data
+        parser.Parse(data, len(data) == 0)
+        if len(data) == 0:
+            break
+        cut = state["last"] - state["windowStart"]
+        if cut > 0:
+            state["window"] = state["window"][cut:]
+            state["windowStart"] += cut
+    stream.close()
 
-        if event == "start" and root is None:
-            root = elem     # the first element is root
-        if event == "end" and elem.tag == elementName: #elem.tag == "record":
-            #... process record elements ...
-            callback(elem)
-            root.clear()
-            if limit != -1:
-                limit -= 1
+def canReadByOffset(filename):
+    """ True if the file can be read with an OffsetReader """
+    format = detectFormat(filename)
+    return format == "plain" or (format == "gzip" and ParallelGzip.isBlockGzip(filename))
+
+class OffsetReader:
+    """ Read elements from an xml-file by their byte offsets
+    
+    Uncompressed files are memory mapped, and gzip-files written by
+    openOutput (see ParallelGzip) are read by decompressing only the
+    blocks that contain the requested bytes. Other formats can't be
+    read by offset.
+    
+    Example:
+    offsets = []
+    scanElements("corpus.xml.gz", ["sentence"], lambda t,a,b,e: offsets.append((b,e)))
+    reader = OffsetReader("corpus.xml.gz")
+    sentence = reader.readElement(*offsets[10])
+    """
+    def __init__(self, filename):
+        if not canReadByOffset(filename):
+            raise IOError("%s: Only uncompressed and block gzip compressed files can be read by offset"%filename)
+        if detectFormat(filename) == "plain":
+            self.file = openPlainInput(filename)
+            self.readRange = lambda begin, end: self.file[begin:end]
+        else:
+            self.file = ParallelGzip.BlockGzipRangeReader(filename)
+            self.readRange = self.file.read
+    
+    def read(self, begin, end):
+        return self.readRange(begin, end)
+    
+    def readElement(self, begin, end):
+        """ Parse the element between the offsets """
+        return ElementTree.fromstring(self.readRange(begin, end))
+    
+    def close(self):
+        self.file.close()
+
+# Indentation strings by level, extended by indent() when needed
+indentStrings = ["\n"]
 
 def indent(elem, level=0):
     """ indent-function as defined in cElementTree-documentation
@@ -66,35 +351,50 @@ def indent(elem, level=0):
     indents the xml-tree, so that it is more readable when written
     out. 
     
+    The tree is walked with an explicit stack instead of recursion,
+    so deep trees can't exceed the recursion limit, and the indentation
+    strings are shared from a table instead of being built for every
+    element.
+    
     Keyword arguments:
     elem -- (Element) root of the tree to indent 
     level -- (int) starting level of indentation
     """
-    i = "\n" + level*"  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        for e in elem:
-            indent(e, level+1)
-        if not e.tail or not e.tail.strip():
-            e.tail = i
+    strings = indentStrings
+    while len(strings) <= level + 1:
+        strings.append(strings[-1] + "  ")
     if level and (not elem.tail or not elem.tail.strip()):
-        elem.tail = i
+        elem.tail = strings[level]
+    stack = [(elem, level)]
+    while len(stack) > 0:
+        elem, level = stack.pop()
+        if len(elem):
+            if len(strings) <= level + 2:
+                strings.append(strings[-1] + "  ")
+            i = strings[level + 1]
+            if not elem.text or not elem.text.strip():
+                elem.text = i
+            for e in elem:
+                if not e.tail or not e.tail.strip():
+                    e.tail = i
+                if len(e):
+                    stack.append((e, level + 1))
+            if not e.tail.strip():
+                e.tail = strings[level]
 
 def ETFromObj(obj):
     """obj can be
     1) a string that ends with .xml -> the file is parsed and the resulting ElementTree returned
-    2) a string that ends with .xml.gz -> the file is unzipped, parsed, and the resulting ElementTree is returned
+    2) a string naming a compressed file (gzip, bz2 or any registered format, detected from
+       the file content) -> the file is uncompressed, parsed, and the resulting ElementTree is returned
     3) an open input stream -> the input is parsed and the resulting ElementTree is returned
     4) an ElementTree or an Element -> obj is returned as-is, nothing is done"""
     if isinstance(obj,str) or isinstance(obj,unicode):
-        if obj.endswith(".xml.gz"):
-            fStream=GzipFile(obj,"rt")
-        elif obj.endswith(".xml") or obj.endswith(".svg") or obj.endswith(".nxml") or obj.endswith(".csml"):
-            fStream=open(obj,"rt")
-        else:
-            raise ValueError("%s: File format not recognized (expected .xml or .xml.gz)"%obj)
-        return ElementTree.parse(fStream)
+        stream = openInput(obj)
+        try:
+            return ElementTree.parse(stream)
+        finally:
+            stream.close()
     elif isinstance(obj,ElementTree.ElementTree) or ElementTree.iselement(obj):
         return obj
     else:
@@ -102,25 +402,83 @@ def ETFromObj(obj):
         #let's parse it
         return ElementTree.parse(obj)
 
-def write(rootElement, filename):
+class ReplacingOutput:
+    """ Writes to a temporary file in the directory of an existing file,
+    and replaces the file with it when closed. The old file stays readable
+    (f.e. memory mapped as the input of the same program) until then.
+    """
+    def __init__(self, filename, writer):
+        fd, self.tempName = tempfile.mkstemp(prefix="." + os.path.basename(filename) + ".",
+                                             dir=os.path.dirname(os.path.abspath(filename)))
+        os.close(fd)
+        shutil.copymode(filename, self.tempName)
+        self.filename = filename
+        self.file = writer(self.tempName)
+        self.closed = False
+    
+    def write(self, data):
+        self.file.write(data)
+    
+    def flush(self):
+        self.file.flush()
+    
+    def close(self):
+        if self.closed:
+            return
+        self.file.close()
+        os.rename(self.tempName, self.filename)
+        self.closed = True
+    
+    def discard(self):
+        """ Close the output keeping the existing file """
+        if self.closed:
+            return
+        self.file.close()
+        os.remove(self.tempName)
+        self.closed = True
+
+def openOutput(filename, format=None):
+    """ Open a file for writing xml
+    
+    If the file exists, it is replaced only when the output is closed,
+    so a program can write to the file it is reading from.
+    
+    Keyword arguments:
+    filename -- (string) path of the file
+    format -- (string) name of a registered format. If None, the format
+              is chosen by the file name extension (f.e. files ending
+              with .gz are compressed with gzip, by gzipWorkers parallel
+              threads), and other files are not compressed.
+    """
+    if format == None:
+        format = getOutputFormat(filename)
+    if os.path.isfile(filename):
+        return ReplacingOutput(filename, formats[format][3])
+    return formats[format][3](filename)
+
+def write(rootElement, filename, compact=False):
+    """ Write an xml-tree to a file
+    
+    Keyword arguments:
+    rootElement -- (Element or ElementTree) the tree to write
+    filename -- (string) output file, compressed if it ends with .gz
+    compact -- (boolean) if True, the tree is not indented. Useful for
+               intermediate files no one will read.
+    """
     if isinstance(rootElement,ElementTree.ElementTree):
         rootElement = rootElement.getroot()
-    indent(rootElement)
-    if filename.endswith(".gz"):
-        out=GzipFile(filename,"wt")
-    else:
-        out=open(filename,"wt")
+    if not compact:
+        indent(rootElement)
+    out=openOutput(filename)
     print >> out, '<?xml version="1.0" encoding="UTF-8"?>'
     ElementTree.ElementTree(rootElement).write(out,"utf-8")
     out.close()
 
-def writeUTF8(rootElement,out):
-    indent(rootElement)
+def writeUTF8(rootElement,out,compact=False):
+    if not compact:
+        indent(rootElement)
     if isinstance(out,str):
-        if out.endswith(".gz"):
-            f=GzipFile(out,"wt")
-        else:
-            f=open(out,"wt")
+        f=openOutput(out)
         print >> f, '<?xml version="1.0" encoding="UTF-8"?>'
         ElementTree.ElementTree(rootElement).write(f,"utf-8")
         f.close()
@@ -128,6 +486,92 @@ def writeUTF8(rootElement,out):
         print >> out, '<?xml version="1.0" encoding="UTF-8"?>'
         ElementTree.ElementTree(rootElement).write(out,"utf-8")
 
+class ElementWriter:
+    """ Write a large xml-file one element at a time
+    
+    The counterpart of ElementStream. The start tag of the root element
+    is written when the writer is created, each element passed to write()
+    is indented and serialized immediately, and the root element is
+    closed by close(). Only the element being written needs to be kept
+    in memory. The output is identical to that of write() for the same
+    tree. With compact=True elements are written as they are, without
+    indentation.
+    
+    Example:
+    stream = ElementStream("input.xml.gz", "document")
+    writer = ElementWriter("output.xml.gz", stream.root)
+    for document in stream:
+        ...
+        writer.write(document)
+    writer.close()
+    """
+    def __init__(self, out, rootElement, compact=False):
+        """
+        Keyword arguments:
+        out -- (string) file name (compressed if it ends with .gz) or an
+               open output stream
+        rootElement -- (Element) the tag and attributes of this element
+                       are used for the root, its subelements are ignored
+        compact -- (boolean) if True, elements are not indented
+        """
+        if isinstance(rootElement,ElementTree.ElementTree):
+            rootElement = rootElement.getroot()
+        self.ownsStream = isinstance(out,str) or isinstance(out,unicode)
+        if self.ownsStream:
+            self.filename = out
+            self.out = openOutput(out)
+        else:
+            self.out = out
+        self.rootTag = rootElement.tag
+        self.compact = compact
+        emptyRoot = ElementTree.Element(rootElement.tag, dict(rootElement.attrib))
+        print >> self.out, '<?xml version="1.0" encoding="UTF-8"?>'
+        # serialize the empty root as "<tag ... />" and reopen it
+        self.out.write(ElementTree.tostring(emptyRoot, "utf-8")[:-2].rstrip() + ">")
+        self.count = 0
+    
+    def write(self, element):
+        if not self.compact:
+            indent(element, 1)
+            element.tail = None
+            self.out.write("\n  ")
+        ElementTree.ElementTree(element).write(self.out,"utf-8")
+        self.count += 1
+    
+    def writeSerialized(self, text):
+        """ Write an element serialized with serializeElement """
+        self.out.write(text)
+        self.count += 1
+    
+    def close(self):
+        if not self.compact:
+            self.out.write("\n")
+        self.out.write("</" + self.rootTag + ">")
+        if self.ownsStream:
+            self.out.close()
+    
+    def abort(self):
+        """ Close the output without ending the root element, f.e. after an
+        error. An existing output file is left as it was, and a new output
+        file is removed. An output stream given to the writer is left open.
+        """
+        if self.ownsStream:
+            if isinstance(self.out, ReplacingOutput):
+                self.out.discard()
+            else:
+                self.out.close()
+                if os.path.exists(self.filename):
+                    os.remove(self.filename)
+
+def serializeElement(element, compact=False):
+    """ Returns the text ElementWriter.write writes for an element, so
+    that elements can be serialized f.e. in another process
+    """
+    if compact:
+        return ElementTree.tostring(element, "utf-8")
+    indent(element, 1)
+    element.tail = None
+    return "\n  " + ElementTree.tostring(element, "utf-8")
 
 def makePath(element,tagList):
     #taglist is a list of tag names
@@ -174,6 +618,10 @@ def toStr(element, recursive=True, removePreTag=True):
     return s
 
 def getElementByAttrib(parent, tag, attDict):
+    """ Returns the first element under parent with the tag and attributes,
+    or None. Each call scans the whole subtree, so for repeated lookups
+    use an ElementIndex.
+    """
     for element in parent.getiterator():
         if element.tag == tag:
             found = True
@@ -184,6 +632,138 @@ def getElementByAttrib(parent, tag, attDict):
                 return element
     return None
 
+class ElementIndex:
+    """
+    Maps elements by their tag and the values of a tuple of attributes.
+
+    An index is defined by a tag and a tuple of attribute names, f.e.
+    ("sentence", ("origId",)) or ("sentence", ("id","text")). The indexed
+    trees are read in a single pass, and for each indexed element the values
+    of the attributes (None for missing attributes) are used as the key.
+    Elements with the same key are kept in the order they were indexed,
+    which for a single tree is the document order. Elements added,
+    removed or changed through the methods of the index keep it consistent.
+    If an indexed attribute is changed directly on the element, lookups
+    with the new value will not find it until it is reindexed, but it can
+    still be removed or set through the index.
+
+    Keyword arguments:
+    indexes -- (list) of (tag, attribute name tuple) pairs
+    root -- (element) optional tree to index
+    """
+    def __init__(self, indexes, root=None):
+        self.maps = {}
+        self.attributesByTag = {}
+        self.attributesBySortedNames = {}
+        for tag, attributes in indexes:
+            self.addIndex(tag, attributes)
+        if root != None:
+            self.indexTree(root)
+
+    def addIndex(self, tag, attributes):
+        """ Defines an index. Elements already indexed are not added to it. """
+        attributes = tuple(attributes)
+        if not self.maps.has_key( (tag, attributes) ):
+            self.maps[(tag, attributes)] = {}
+            self.attributesByTag.setdefault(tag, []).append(attributes)
+            self.attributesBySortedNames.setdefault( (tag, tuple(sorted(attributes))), attributes )
+
+    def getKey(self, element, attributes):
+        return tuple([element.get(x) for x in attributes])
+
+    def indexElement(self, element):
+        if not self.attributesByTag.has_key(element.tag):
+            return
+        for attributes in self.attributesByTag[element.tag]:
+            self.maps[(element.tag, attributes)].setdefault(self.getKey(element, attributes), []).append(element)
+
+    def unindexElement(self, element):
+        if not self.attributesByTag.has_key(element.tag):
+            return
+        for attributes in self.attributesByTag[element.tag]:
+            elementMap = self.maps[(element.tag, attributes)]
+            key = self.getKey(element, attributes)
+            if not self.removeFromKey(elementMap, key, element):
+                # The attributes were changed directly on the element, so
+                # it is under an older key. Not indexed elements are ignored.
+                for oldKey in elementMap.keys():
+                    if self.removeFromKey(elementMap, oldKey, element):
+                        break
+
+    def removeFromKey(self, elementMap, key, element):
+        elements = elementMap.get(key, [])
+        for i in range(len(elements)):
+            if elements[i] is element:
+                del elements[i]
+                if len(elements) == 0:
+                    del elementMap[key]
+                return True
+        return False
+
+    def indexTree(self, root):
+        for element in root.getiterator():
+            self.indexElement(element)
+
+    def unindexTree(self, root):
+        for element in root.getiterator():
+            self.unindexElement(element)
+
+    ###########################################################################
+    # Lookup
+    ###########################################################################
+
+    def getAll(self, tag, attributes, values):
+        """ Returns all elements matching the values, in index order
+
+        Keyword arguments:
+        tag -- (string) element tag
+        attributes -- (tuple) attribute names of a defined index
+        values -- (tuple) values of these attributes
+        """
+        return list(self.maps[(tag, tuple(attributes))].get(tuple(values), []))
+
+    def get(self, tag, attributes, values):
+        """ Returns the first element matching the values, or None """
+        elements = self.maps[(tag, tuple(attributes))].get(tuple(values))
+        if elements == None:
+            return None
+        return elements[0]
+
+    def find(self, tag, attDict):
+        """ Like getElementByAttrib, for an index on the keys of attDict
+        defined in any order
+        """
+        sortedNames = tuple(sorted(attDict.keys()))
+        if not self.attributesBySortedNames.has_key( (tag, sortedNames) ):
+            raise KeyError("No index for " + str(tag) + " " + str(sortedNames))
+        attributes = self.attributesBySortedNames[(tag, sortedNames)]
+        return self.get(tag, attributes, [attDict[x] for x in attributes])
+
+    def getKeys(self, tag, attributes):
+        return self.maps[(tag, tuple(attributes))].keys()
+
+    ###########################################################################
+    # Modification
+    ###########################################################################
+
+    def append(self, parent, element):
+        parent.append(element)
+        self.indexTree(element)
+
+    def insert(self, parent, index, element):
+        parent.insert(index, element)
+        self.indexTree(element)
+
+    def remove(self, parent, element):
+        parent.remove(element)
+        self.unindexTree(element)
+
+    def set(self, element, name, value):
+        """ Sets an attribute of an indexed element """
+        self.unindexElement(element)
+        element.set(name, value)
+        self.indexElement(element)
+
 def setDefaultElement(parent, name):
     element = parent.find(name)
     if element == None: